@@ -4,26 +4,45 @@ Flask 应用主入口
 """
 import os
 import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 
 # 导入自定义服务模块
 from services.file_processor import FileProcessor
+from services.partition_sandbox import PartitionSandbox
+from services.upload_stream import MAX_UPLOAD_REQUEST_BYTES, UnsupportedUploadType, make_upload_request_class
+from services.resumable_upload import ResumableUploadError, ResumableUploadManager
+from services.archive_ingest import is_archive
+from services.ingest_pipeline import StreamingPipeline, build_ingest_stages
 from services.file_chunk import FileChunkProcessor
 from services.file_embedding import EmbeddingClass
+from services.chunk_dedup import DEFAULT_MAX_DISTANCE
 from services.file_vector import VectorFileProcessor
 from services.logger import setup_logger
+from services.profiling import RequestProfiler
+from services.json_response import init_app as init_json_response
+from services.listing_cache import conditional_listing
+from services.admission import AdmissionRejected, admission_controlled, create_gates
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS_REGISTRY, init_app as init_metrics
 
 # 配置常量
 UPLOAD_FOLDER = os.path.join('files', 'upload')
 LOAD_FOLDER = os.path.join('files', 'load')
 CHUNK_FOLDER = os.path.join('files', 'chunk')
+EMBEDDING_FOLDER = os.path.join('files', 'embedding')
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'md', 'xlsx', 'xls', 'docx', 'pptx'}
 
 # 初始化 Flask 应用
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['LOAD_FOLDER'] = LOAD_FOLDER
+# 请求体大小上限；上传文件在解析请求体时直接按块写入上传目录，不经过临时文件
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_REQUEST_BYTES
+app.request_class = make_upload_request_class(UPLOAD_FOLDER)
+
+# orjson 编码 JSON 响应，大响应流式输出，并按 Accept-Encoding 压缩
+init_json_response(app)
 
 # 配置 CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -31,12 +50,50 @@ CORS(app, resources={r"/api/*": {"origins": "*"}})
 # 设置日志记录器
 logger = setup_logger(app)
 
+# 记录每个请求的耗时，供 /metrics 导出
+init_metrics(app)
+
+# 按请求头或抽样率剖析请求 (REQUEST_PROFILING=1 时开启，未开启时不注册钩子)
+request_profiler = RequestProfiler()
+request_profiler.init_app(app)
+
 # 初始化文件处理器
-file_processor = FileProcessor(UPLOAD_FOLDER, LOAD_FOLDER)
+# unstructured 解析在沙箱工作进程中运行，卡死或内存暴涨的文件不会拖垮 API 进程
+file_processor = FileProcessor(UPLOAD_FOLDER, LOAD_FOLDER, partition_sandbox=PartitionSandbox())
 file_chunk_processor = FileChunkProcessor(LOAD_FOLDER, CHUNK_FOLDER)
 vector_file_processor = VectorFileProcessor()
+resumable_upload_manager = ResumableUploadManager(UPLOAD_FOLDER)
+# 重型接口的并发限制和等待队列
+admission_gates = create_gates()
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_too_large(e):
+    """上传文件或请求体超过大小上限"""
+    logger.warning(f"上传被拒绝 (413): {e.description}")
+    return jsonify({"success": False, "error": e.description}), 413
+
+@app.errorhandler(UnsupportedUploadType)
+def handle_unsupported_upload(e):
+    """上传文件的扩展名不允许或文件内容与扩展名不符"""
+    logger.warning(f"上传被拒绝 (415): {e.description}")
+    return jsonify({"success": False, "error": e.description}), 415
+
+@app.errorhandler(UnsupportedMediaType)
+def handle_unsupported_media_type(e):
+    """其他 415 (例如 request.json 读取的请求体不是 JSON)，不是上传被拒绝"""
+    logger.warning(f"请求的内容类型不受支持 (415) {request.method} {request.path}: {e.description}")
+    return jsonify({"success": False, "error": e.description}), 415
+
+@app.errorhandler(AdmissionRejected)
+def handle_admission_rejected(e):
+    """重型接口的并发和排队已满"""
+    logger.warning(f"请求被拒绝 (429): {e.message}")
+    response = jsonify(e.to_dict())
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
 
 @app.route('/api/upload', methods=['POST'])
+@admission_controlled(admission_gates["upload"])
 def upload_file():
     """
     处理文件上传请求，解析文件内容并返回结果
@@ -50,6 +107,18 @@ def upload_file():
     file = request.files['file']
     file_type = request.form.get('type')
     
+    # zip 压缩包：并行解析其中所有允许的文件
+    if file.filename and is_archive(file.filename):
+        max_workers = request.form.get('maxWorkers', type=int)
+        logger.info(f"开始处理压缩包: {file.filename}")
+        result, status_code = file_processor.handle_archive_upload(
+            file=file,
+            allowed_extensions=ALLOWED_EXTENSIONS,
+            logger=logger,
+            max_workers=max_workers
+        )
+        return jsonify(result), status_code
+    
     # 委托给FileProcessor处理所有上传和处理逻辑
     result, status_code = file_processor.handle_upload_request(
         file=file,
@@ -60,7 +129,106 @@ def upload_file():
     
     return jsonify(result), status_code
 
+@app.route('/api/upload/resumable', methods=['POST'])
+def initiate_resumable_upload():
+    """
+    创建可续传上传会话
+    """
+    data = request.json
+    if not data:
+        logger.warning("没有提供JSON数据")
+        return jsonify({"success": False, "error": "没有提供JSON数据"}), 400
+    
+    file_type = data.get('type')
+    if not file_type:
+        logger.warning("没有指定文件类型")
+        return jsonify({"success": False, "error": "没有指定文件类型"}), 400
+    if not file_processor.allowed_file(data.get('filename') or '', ALLOWED_EXTENSIONS):
+        logger.warning(f"不允许的文件类型: {data.get('filename')}")
+        return jsonify({"success": False, "error": "不允许的文件类型"}), 400
+    
+    try:
+        session = resumable_upload_manager.initiate(
+            filename=data.get('filename'),
+            total_size=data.get('totalSize'),
+            file_type=file_type,
+            part_size=data.get('partSize'),
+            sha256=data.get('sha256')
+        )
+        logger.info(f"创建可续传上传会话 {session['upload_id']}: {session['filename']}, {session['total_size']} 字节, {session['part_count']} 个分片")
+        return jsonify({"success": True, **session}), 200
+    except ResumableUploadError as e:
+        logger.warning(f"创建可续传上传会话失败: {e.message}")
+        return jsonify({"success": False, "error": e.message}), e.status
+    except Exception as e:
+        logger.error(f"创建可续传上传会话时出错: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": f"创建上传会话失败: {str(e)}"}), 500
+
+@app.route('/api/upload/resumable/<upload_id>/parts/<int:index>', methods=['PUT'])
+def upload_resumable_part(upload_id, index):
+    """
+    上传一个分片，请求体为分片的原始字节，X-Part-SHA256 请求头为分片的 SHA-256
+    """
+    try:
+        part = resumable_upload_manager.write_part(
+            upload_id, index, request.stream, request.headers.get('X-Part-SHA256')
+        )
+        return jsonify({"success": True, **part}), 200
+    except ResumableUploadError as e:
+        logger.warning(f"上传分片 {upload_id}/{index} 失败: {e.message}")
+        return jsonify({"success": False, "error": e.message}), e.status
+    except Exception as e:
+        logger.error(f"上传分片 {upload_id}/{index} 时出错: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": f"上传分片失败: {str(e)}"}), 500
+
+@app.route('/api/upload/resumable/<upload_id>', methods=['GET'])
+def get_resumable_upload_status(upload_id):
+    """
+    查询可续传上传已收到的分片和字节范围
+    """
+    try:
+        return jsonify({"success": True, **resumable_upload_manager.status(upload_id)}), 200
+    except ResumableUploadError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+    except Exception as e:
+        logger.error(f"查询上传会话 {upload_id} 时出错: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": f"查询上传会话失败: {str(e)}"}), 500
+
+@app.route('/api/upload/resumable/<upload_id>', methods=['DELETE'])
+def abort_resumable_upload(upload_id):
+    """
+    取消可续传上传并删除已收到的数据
+    """
+    try:
+        resumable_upload_manager.abort(upload_id)
+        logger.info(f"取消可续传上传会话 {upload_id}")
+        return jsonify({"success": True, "upload_id": upload_id}), 200
+    except ResumableUploadError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+
+@app.route('/api/upload/resumable/<upload_id>/complete', methods=['POST'])
+@admission_controlled(admission_gates["upload"])
+def complete_resumable_upload(upload_id):
+    """
+    完成可续传上传：校验所有分片后把文件交给 FileProcessor 解析，响应与 /api/upload 相同
+    """
+    try:
+        session = resumable_upload_manager.get_session(upload_id)
+        file_info = file_processor.build_file_info(session['filename'], session['file_type'])
+        file_info['content_hash'] = resumable_upload_manager.complete(upload_id, file_info['upload_path'])
+        logger.info(f"可续传上传 {upload_id} 完成: {file_info['upload_path']}")
+    except ResumableUploadError as e:
+        logger.warning(f"完成可续传上传 {upload_id} 失败: {e.message}")
+        return jsonify({"success": False, "error": e.message}), e.status
+    except Exception as e:
+        logger.error(f"完成可续传上传 {upload_id} 时出错: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": f"完成上传失败: {str(e)}"}), 500
+    
+    result, status_code = file_processor.process_saved_file(file_info, logger)
+    return jsonify(result), status_code
+
 @app.route('/api/files/load', methods=['GET']) 
+@conditional_listing(LOAD_FOLDER)
 def get_loaded_files():
     """
     获取load文件夹下的文件列表
@@ -82,6 +250,7 @@ def get_loaded_files():
         }), 500
 
 @app.route('/api/chunk', methods=['POST'])
+@admission_controlled(admission_gates["chunk"])
 def chunk_file():
     """
     处理文件切分请求
@@ -122,7 +291,94 @@ def chunk_file():
             "error": f"处理文件切分请求时出错: {str(e)}"
         }), 500
 
+@app.route('/api/chunk/batch', methods=['POST'])
+@admission_controlled(admission_gates["chunk"])
+def chunk_files_batch():
+    """
+    批量切分多个文件，所有文件共用同一组切分参数
+    """
+    try:
+        data = request.json
+        if not data:
+            logger.warning("请求中没有JSON数据")
+            return jsonify({"success": False, "error": "请求中没有JSON数据"}), 400
+        
+        # fileIds 为 "all" 时处理所有已加载文件
+        file_ids = data.get('fileIds')
+        if file_ids == 'all':
+            file_ids = None
+        elif not isinstance(file_ids, list) or not file_ids:
+            logger.warning("未提供文件ID列表")
+            return jsonify({"success": False, "error": "未提供文件ID列表 (fileIds 为ID数组或 \"all\")"}), 400
+        
+        method = data.get('method', 'llamaindex')
+        chunk_size = int(data.get('chunkSize', 500))
+        chunk_overlap = int(data.get('chunkOverlap', 50))
+        separator = data.get('separator', '\n\n')
+        max_workers = data.get('maxWorkers')
+        
+        logger.info(f"开始批量切分: fileCount={'all' if file_ids is None else len(file_ids)}, method={method}, chunkSize={chunk_size}, chunkOverlap={chunk_overlap}")
+        result = file_chunk_processor.process_chunk_batch(
+            file_ids, method, chunk_size, chunk_overlap, separator,
+            max_workers=int(max_workers) if max_workers else None
+        )
+        
+        if result["success"]:
+            logger.info(f"批量切分完成: 成功={result['succeeded_count']}, 失败={result['failed_count']}, 耗时={result['elapsed_seconds']}秒")
+            return jsonify(result), 200
+        else:
+            logger.warning(f"批量切分失败: {result['error']}")
+            return jsonify(result), 400
+    
+    except Exception as e:
+        logger.error(f"处理批量切分请求时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"处理批量切分请求时出错: {str(e)}"
+        }), 500
+
+@app.route('/api/chunk/sweep', methods=['POST'])
+@admission_controlled(admission_gates["chunk"])
+def sweep_chunk_configs():
+    """
+    批量评估多组切分参数，只为选中的配置写入切分结果
+    """
+    try:
+        data = request.json
+        if not data:
+            logger.warning("请求中没有JSON数据")
+            return jsonify({"success": False, "error": "请求中没有JSON数据"}), 400
+        
+        file_id = data.get('fileId')
+        if not file_id:
+            logger.warning("未提供文件ID")
+            return jsonify({"success": False, "error": "未提供文件ID"}), 400
+        
+        try:
+            configs = file_chunk_processor.build_sweep_configs(data.get('configs'), data.get('grid'))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"扫描配置无效: {str(e)}")
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        logger.info(f"开始切分参数扫描: fileId={file_id}, configCount={len(configs)}")
+        result = file_chunk_processor.sweep_chunk_configs(file_id, configs, data.get('save', []))
+        
+        if result["success"]:
+            logger.info(f"切分参数扫描完成: fileId={file_id}, 耗时={result['elapsed_seconds']}秒")
+            return jsonify(result), 200
+        else:
+            logger.warning(f"切分参数扫描失败: {result['error']}")
+            return jsonify(result), 400
+    
+    except Exception as e:
+        logger.error(f"处理切分参数扫描请求时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"处理切分参数扫描请求时出错: {str(e)}"
+        }), 500
+
 @app.route('/api/embedding', methods=['POST'])
+@admission_controlled(admission_gates["embedding"])
 def generate_embeddings():
     """
     为切分后的文档生成嵌入向量
@@ -136,6 +392,8 @@ def generate_embeddings():
         
         chunk_file_id = data.get('chunkFileId')
         model_type = data.get('modelType', 'huggingface')  # 默认使用huggingface
+        dedup = bool(data.get('dedup', False))  # 是否跳过近似重复 chunk 的嵌入
+        dedup_max_distance = int(data.get('dedupMaxDistance', DEFAULT_MAX_DISTANCE))
         
         # 验证必要参数
         if not chunk_file_id:
@@ -148,9 +406,11 @@ def generate_embeddings():
             return jsonify({"success": False, "error": f"不支持的模型类型: {model_type}"}), 400
         
         # 处理向量嵌入
-        logger.info(f"开始生成嵌入向量: chunkFileId={chunk_file_id}, modelType={model_type}")
-        embedding_processor = EmbeddingClass(model_type=model_type)
-        result = embedding_processor.process_embeddings(chunk_file_id)
+        logger.info(f"开始生成嵌入向量: chunkFileId={chunk_file_id}, modelType={model_type}, dedup={dedup}")
+        embedding_processor = EmbeddingClass(model_type=model_type, logger=logger)
+        result = embedding_processor.process_embeddings(
+            chunk_file_id, dedup=dedup, dedup_max_distance=dedup_max_distance
+        )
         
         if result["success"]:
             logger.info(f"嵌入向量生成成功: chunkFileId={chunk_file_id}")
@@ -183,7 +443,7 @@ def get_embedding_stats():
 
         # 使用默认的huggingface模型查询统计信息
         # Note: The model_type might not matter for just getting stats if the file exists.
-        embedding_processor = EmbeddingClass(model_type="huggingface") 
+        embedding_processor = EmbeddingClass(model_type="huggingface", logger=logger)
         stats = embedding_processor.get_embedding_stats(embedding_file_id)
 
         if stats.get("exists"):
@@ -216,6 +476,7 @@ def get_embedding_stats():
         }), 500
 
 @app.route('/api/files/chunk', methods=['GET'])
+@conditional_listing(CHUNK_FOLDER)
 def get_chunk_files():
     """
     获取chunk文件夹下的文件列表
@@ -237,6 +498,7 @@ def get_chunk_files():
         }), 500
 
 @app.route('/api/vector/stats', methods=['GET'])
+@conditional_listing(EMBEDDING_FOLDER)
 def get_vector_files_stats():
     """
     获取 files/embedding 文件夹下所有向量文件的统计信息
@@ -263,6 +525,7 @@ def get_vector_files_stats():
         }), 500
 
 @app.route('/api/vector/store', methods=['POST'])
+@admission_controlled(admission_gates["vector_store"])
 def store_vectors_to_db():
     """
     Stores vectors from a specified embedding file into a vector database.
@@ -317,6 +580,176 @@ def store_vectors_to_db():
             "error": f"An unexpected server error occurred: {str(e)}"
         }), 500
 
+@app.route('/api/pipeline/ingest', methods=['POST'])
+@admission_controlled(admission_gates["pipeline"])
+def ingest_pipeline():
+    """
+    一次请求完成多个文件的 上传 -> 解析 -> 切分 -> 嵌入 -> 入库，各阶段流水线并行
+    """
+    files = request.files.getlist('files')
+    if not files:
+        logger.warning("没有文件部分在请求中")
+        return jsonify({"success": False, "error": "没有文件部分"}), 400
+    
+    form = request.form
+    model_type = form.get('modelType', 'huggingface')
+    if model_type not in ['huggingface', 'openai']:
+        logger.warning(f"不支持的模型类型: {model_type}")
+        return jsonify({"success": False, "error": f"不支持的模型类型: {model_type}"}), 400
+    
+    try:
+        file_infos = []
+        for file in files:
+            if not file_processor.allowed_file(file.filename, ALLOWED_EXTENSIONS):
+                logger.warning(f"不允许的文件类型: {file.filename}")
+                return jsonify({"success": False, "error": f"不允许的文件类型: {file.filename}"}), 400
+            file_infos.append(file_processor.save_upload_file(file, file.filename.rsplit('.', 1)[1].lower()))
+        
+        stages = build_ingest_stages(
+            file_processor,
+            file_chunk_processor,
+            EmbeddingClass(model_type=model_type, logger=logger),
+            vector_file_processor,
+            method=form.get('method', 'llamaindex'),
+            chunk_size=form.get('chunkSize', 500, type=int),
+            chunk_overlap=form.get('chunkOverlap', 50, type=int),
+            separator=form.get('separator', '\n\n'),
+            dedup=form.get('dedup', 'false').lower() == 'true',
+            collection_name=form.get('collectionName'),
+            dimension=form.get('dimension', type=int),
+            workers={
+                stage: form.get(f'{stage}Workers', type=int)
+                for stage in ('parse', 'chunk', 'embed', 'store') if form.get(f'{stage}Workers', type=int)
+            },
+            # 每个文件嵌入时才占用 embedding 名额，不在整个请求期间阻塞 /api/embedding
+            embed_gate=admission_gates["embedding"]
+        )
+        logger.info(f"开始流水线入库: {len(file_infos)} 个文件, 阶段: {[stage.name for stage in stages]}")
+        summary = StreamingPipeline(stages, queue_size=form.get('queueSize', 4, type=int)).run(file_infos)
+        for result in summary["results"]:
+            if result["success"]:
+                result["document"] = result.pop("output")
+            else:
+                result["filename"] = result.pop("input").get("filename")
+        logger.info(
+            f"流水线入库完成: 成功 {summary['succeeded_count']}/{summary['item_count']}, "
+            f"耗时 {summary['elapsed_seconds']} 秒, 瓶颈阶段: {summary['bottleneck']}"
+        )
+        return jsonify({"success": summary["succeeded_count"] > 0, **summary}), 200
+    except ValueError as e:
+        logger.warning(f"流水线参数错误: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"流水线入库时出错: {str(e)}", exc_info=True)
+        return jsonify({"success": False, "error": f"流水线入库失败: {str(e)}"}), 500
+
+@app.route('/api/partition/cache/stats', methods=['GET'])
+def get_partition_cache_stats():
+    """
+    获取解析结果缓存的命中率和占用空间
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "stats": file_processor.partition_cache.stats(),
+            "timestamp": datetime.datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"获取解析缓存统计信息时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"获取解析缓存统计信息失败: {str(e)}"
+        }), 500
+
+@app.route('/api/partition/sandbox/stats', methods=['GET'])
+def get_partition_sandbox_stats():
+    """
+    获取解析沙箱的任务结果统计和限制配置
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "stats": file_processor.partition_sandbox.stats(),
+            "timestamp": datetime.datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"获取解析沙箱统计信息时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"获取解析沙箱统计信息失败: {str(e)}"
+        }), 500
+
+@app.route('/api/admission/stats', methods=['GET'])
+def get_admission_stats():
+    """
+    获取各重型接口的并发限制、当前执行和排队数以及拒绝次数
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "stats": {name: gate.stats() for name, gate in admission_gates.items()},
+            "timestamp": datetime.datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"获取准入控制统计信息时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"获取准入控制统计信息失败: {str(e)}"
+        }), 500
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """
+    列出保存的请求剖析 (最新的在前) 和剖析配置
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "stats": request_profiler.stats(),
+            "profiles": request_profiler.list_profiles()
+        }), 200
+    except Exception as e:
+        logger.error(f"列出剖析时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"列出剖析失败: {str(e)}"
+        }), 500
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    下载剖析文件 (pstats 格式)；format=text 时返回按 sort 排序的文本摘要
+    """
+    try:
+        if request.args.get('format') == 'text':
+            summary = request_profiler.summary(
+                profile_id, sort=request.args.get('sort', 'cumulative'), limit=request.args.get('limit', 40, type=int)
+            )
+            if summary is None:
+                return jsonify({"success": False, "error": f"剖析不存在: {profile_id}"}), 404
+            return Response(summary, content_type="text/plain; charset=utf-8")
+
+        path = request_profiler.profile_path(profile_id)
+        if path is None:
+            return jsonify({"success": False, "error": f"剖析不存在: {profile_id}"}), 404
+        return send_file(os.path.abspath(path), as_attachment=True, download_name=f"{profile_id}.prof")
+    except ValueError as e:
+        logger.warning(f"剖析摘要参数无效: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"下载剖析 {profile_id} 时出错: {str(e)}", exc_info=True)
+        return jsonify({
+            "success": False,
+            "error": f"下载剖析失败: {str(e)}"
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    以 Prometheus 文本格式导出请求延迟、各阶段耗时、队列深度、缓存命中、模型加载次数和进程内存
+    """
+    return Response(METRICS_REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
@@ -327,6 +760,7 @@ def health_check():
         "timestamp": datetime.datetime.now().isoformat()
     }), 200
 
+# 开发服务器 (单进程、调试模式)；生产环境使用 gunicorn -c gunicorn.conf.py，见 wsgi.py
 if __name__ == '__main__':
     logger.info("应用启动，监听端口: 5000")
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+日志开销基准测试
+比较嵌入循环中逐 chunk 写日志 (同步文件处理器 / 队列处理器) 与限频进度日志的每个 chunk 的开销
+
+用法:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --chunks 200000 --threads 4
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from logging.handlers import RotatingFileHandler
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.logger import ProgressReporter, _start_listener, stop_listeners
+
+LOG_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+
+def make_logger(name, handler):
+    """创建只使用指定处理器的日志记录器"""
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def file_handler(folder, name):
+    handler = RotatingFileHandler(os.path.join(folder, f"{name}.log"), maxBytes=10485760, backupCount=5)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.setLevel(logging.INFO)
+    return handler
+
+
+def run_loop(chunks, threads, step):
+    """在 threads 个线程中共执行 chunks 次 step(i)，返回耗时"""
+    per_thread = chunks // threads
+
+    def work(offset):
+        for i in range(offset, offset + per_thread):
+            step(i)
+
+    workers = [threading.Thread(target=work, args=(n * per_thread,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐 chunk 日志与限频进度日志的开销对比")
+    parser.add_argument("--chunks", type=int, default=50000, help="模拟的 chunk 数")
+    parser.add_argument("--threads", type=int, default=1, help="同时写日志的线程数 (模拟并发请求)")
+    args = parser.parse_args()
+    chunks = args.chunks - args.chunks % args.threads
+
+    folder = tempfile.mkdtemp(prefix="bench_logging_")
+    try:
+        results = []
+        baseline = run_loop(chunks, args.threads, lambda i: None)
+        results.append(("空循环", baseline, None))
+
+        sync_logger = make_logger("bench_sync", file_handler(folder, "sync"))
+        elapsed = run_loop(chunks, args.threads, lambda i: sync_logger.info(f"正在处理 chunk {i + 1}/{chunks} for bench"))
+        results.append(("同步文件处理器，逐 chunk 日志 (修改前)", elapsed, None))
+
+        queue_logger = make_logger("bench_queue", _start_listener([file_handler(folder, "queue")]))
+        elapsed = run_loop(chunks, args.threads, lambda i: queue_logger.info(f"正在处理 chunk {i + 1}/{chunks} for bench"))
+        drain_start = time.perf_counter()
+        stop_listeners()
+        results.append(("队列处理器，逐 chunk 日志", elapsed, time.perf_counter() - drain_start))
+
+        progress_logger = make_logger("bench_progress", _start_listener([file_handler(folder, "progress")]))
+        reporters = {}
+
+        def progress_step(i):
+            reporter = reporters.get(threading.get_ident())
+            if reporter is None:
+                reporter = reporters[threading.get_ident()] = ProgressReporter(progress_logger, "嵌入 bench", chunks // args.threads)
+            reporter.update()
+
+        elapsed = run_loop(chunks, args.threads, progress_step)
+        for reporter in reporters.values():
+            reporter.close()
+        stop_listeners()
+        results.append(("队列处理器，限频进度日志 (修改后)", elapsed, None))
+
+        print(f"{chunks} 个 chunk，{args.threads} 个线程")
+        print(f"{'方式':<36}{'总耗时(s)':>12}{'每 chunk(us)':>14}{'后台写完(s)':>14}")
+        for name, elapsed, drain in results:
+            per_chunk = (elapsed - baseline) / chunks * 1e6
+            drain_text = f"{drain:>14.3f}" if drain is not None else f"{'-':>14}"
+            print(f"{name:<36}{elapsed:>12.3f}{per_chunk:>14.2f}{drain_text}")
+        for name in ("sync", "queue", "progress"):
+            with open(os.path.join(folder, f"{name}.log"), 'rb') as f:
+                print(f"{name}.log: {sum(1 for _ in f)} 行")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
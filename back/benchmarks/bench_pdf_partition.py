@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+PDF 分页并行解析基准测试
+比较整份 PDF 单进程解析与按页范围并行解析的耗时，观察加速比随页数的变化
+
+用法:
+    python benchmarks/bench_pdf_partition.py --file files/upload/x.pdf
+    python benchmarks/bench_pdf_partition.py --file x.pdf --pages 20,50,100,200 --workers 4 --pages-per-task 10
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pypdf import PdfReader, PdfWriter
+
+from services.pdf_partition import PDF_PAGES_PER_TASK, PDF_PARTITION_WORKERS, partition_pdf_parallel, partition_to_texts
+
+
+def build_pdf(source_file, page_count, output_path):
+    """循环复制源 PDF 的页面，生成指定页数的测试文件"""
+    reader = PdfReader(source_file)
+    writer = PdfWriter()
+    for i in range(page_count):
+        writer.add_page(reader.pages[i % len(reader.pages)])
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 分页并行解析基准测试")
+    parser.add_argument("--file", required=True, help="源 PDF 文件，按需循环复制页面")
+    parser.add_argument("--pages", default="10,50,100,200", help="测试的页数列表")
+    parser.add_argument("--workers", type=int, default=PDF_PARTITION_WORKERS)
+    parser.add_argument("--pages-per-task", type=int, default=PDF_PAGES_PER_TASK)
+    parser.add_argument("--strategy", default="auto")
+    args = parser.parse_args()
+
+    temp_folder = tempfile.mkdtemp(prefix="bench_pdf_")
+    try:
+        print(f"进程数: {args.workers}, 每个任务页数: {args.pages_per_task}, 解析策略: {args.strategy}")
+        print(f"{'页数':>8}{'单进程(s)':>12}{'并行(s)':>12}{'加速比':>10}")
+        for page_count in [int(p) for p in args.pages.split(",")]:
+            pdf_path = os.path.join(temp_folder, f"bench_{page_count}.pdf")
+            build_pdf(args.file, page_count, pdf_path)
+
+            start = time.perf_counter()
+            serial_texts = partition_to_texts(pdf_path, args.strategy)
+            serial = time.perf_counter() - start
+
+            start = time.perf_counter()
+            parallel_texts = partition_pdf_parallel(pdf_path, args.strategy, args.workers, args.pages_per_task)
+            parallel = time.perf_counter() - start
+
+            if "".join(serial_texts).split() != "".join(parallel_texts).split():
+                print(f"警告: {page_count} 页时并行解析的文本与单进程结果不一致")
+            print(f"{page_count:>8}{serial:>12.2f}{parallel:>12.2f}{serial / parallel:>10.2f}")
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
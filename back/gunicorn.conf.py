@@ -0,0 +1,61 @@
+"""
+gunicorn 配置
+
+用法 (在 back 目录下执行):
+    gunicorn -c gunicorn.conf.py
+
+环境变量:
+    WEB_BIND: 监听地址，默认 0.0.0.0:5000
+    WEB_WORKERS: 工作进程数，默认 CPU 核数 (最多 4)
+    WEB_THREADS: 每个工作进程的请求线程数，默认 4
+    WEB_TIMEOUT: 请求超时秒数，默认 600 (大文件解析和嵌入耗时较长)
+    WEB_MAX_REQUESTS: 工作进程处理多少个请求后重启，默认 0 (不重启)
+    TORCH_NUM_THREADS: 每个工作进程的 torch 线程数，默认 CPU 核数 / 工作进程数
+    WARMUP_MODELS: 设为 0 时不在 fork 前预加载模型
+    METRICS_MULTIPROC_DIR: 多进程指标的共享目录，默认 log/metrics (启动时清空)
+    ADMISSION_LOCK_DIR: 准入控制的名额锁目录，默认 log/admission (各工作进程共用同一份并发限制)
+"""
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.serving import limit_native_threads, torch_threads_per_worker, worker_count
+
+wsgi_app = "wsgi:application"
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+
+# 各工作进程及其子进程把指标写入共享目录，/metrics 汇总所有进程的数据；必须在导入应用之前设置
+metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(chdir, "log", "metrics"))
+# 上次运行留下的数据不计入本次
+shutil.rmtree(metrics_dir, ignore_errors=True)
+
+# 准入名额用文件锁实现，所有工作进程共用同一份并发数和排队数限制
+os.environ.setdefault("ADMISSION_LOCK_DIR", os.path.join(chdir, "log", "admission"))
+
+workers = worker_count()
+# 请求线程主要在等待 I/O、解析沙箱和 torch (释放 GIL)，用线程而不是更多进程提高并发
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = int(os.getenv("WEB_TIMEOUT", "600"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+# 主进程导入应用并预加载模型后再 fork，工作进程共享模型权重
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+# 主进程导入 torch 之前限制线程数，fork 出的工作进程继承这些环境变量
+limit_native_threads(torch_threads_per_worker(workers))
+
+
+def post_fork(server, worker):
+    """fork 之后在工作进程中重新设置 torch 线程数 (线程池不会跨 fork 继承)"""
+    from services.model_cache import configure_torch_threads
+    server.log.info(f"工作进程 {worker.pid} 已启动，torch 线程数: {configure_torch_threads()}")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+目录批量入库命令行工具
+遍历目录，按 解析 -> 切分 -> 嵌入 -> 入库 的流水线处理其中的文档，可中断后续跑
+
+用法:
+    python ingest_cli.py /data/docs
+    python ingest_cli.py /data/docs --collection policy --dimension 512 --parse-workers 4
+    python ingest_cli.py /data/docs --checkpoint files/policy_checkpoint.jsonl --method tokens --chunk-size 256
+
+每个文件的结果按内容哈希记录在检查点文件中 (每处理完一个追加一行)，中断后用相同参数重新运行即从中断处继续：
+只有最近一次记录为 done (已走完全部阶段) 的文件被跳过，失败或尚未记录的文件重新处理
+(已解析过的内容命中解析缓存)。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+
+BACK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACK_DIR)
+
+from services.file_processor import FileProcessor
+from services.file_chunk import CHUNK_METHODS, FileChunkProcessor
+from services.ingest_pipeline import DEFAULT_QUEUE_SIZE, StreamingPipeline, build_ingest_stages
+from services.logger import setup_logger
+from services.partition_cache import hash_file
+from services.partition_sandbox import PartitionSandbox
+
+# 与 app.py 相同的目录 (相对于 back 目录)
+UPLOAD_FOLDER = os.path.join('files', 'upload')
+LOAD_FOLDER = os.path.join('files', 'load')
+CHUNK_FOLDER = os.path.join('files', 'chunk')
+DEFAULT_CHECKPOINT = os.path.join('files', 'ingest_checkpoint.jsonl')
+# 命令行工具单独的日志目录，不与 Web 服务的进程共同轮转同一个日志文件
+LOG_FOLDER = os.path.join('log', 'ingest_cli')
+ALLOWED_EXTENSIONS = {'txt', 'pdf', 'md', 'xlsx', 'xls', 'docx', 'pptx'}
+
+
+def load_checkpoint(path):
+    """
+    读取检查点文件
+
+    Args:
+        path: 检查点文件路径
+
+    Returns:
+        set: 最近一次记录为 done 的文件内容哈希 (之后又失败的文件不计入)
+    """
+    statuses = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下不完整的最后一行
+                continue
+            if record.get("content_hash"):
+                statuses[record["content_hash"]] = record.get("status")
+    return {content_hash for content_hash, status in statuses.items() if status == "done"}
+
+
+def checkpoint_entry(source_path, result):
+    """
+    把流水线的单个结果转换为检查点记录
+
+    Args:
+        source_path: 源文件路径
+        result: StreamingPipeline 的结果 (success、input/output、stage、error)
+
+    Returns:
+        dict: 检查点记录，走完全部阶段时 status 为 done，否则为 failed
+    """
+    document = result["output"] if result["success"] else result["input"]
+    entry = {
+        "content_hash": document.get("content_hash"),
+        "source_path": source_path,
+        "status": "done" if result["success"] else "failed",
+        "time": datetime.datetime.now().isoformat()
+    }
+    if result["success"]:
+        entry.update({key: document.get(key) for key in ("file_id", "chunk_file_id", "embedding_file")})
+    else:
+        entry.update({"stage": result["stage"], "error": result["error"]})
+    return entry
+
+
+def pending_files(directory, extensions, done, counts=None):
+    """
+    遍历目录，跳过检查点中已完成的文件和本次运行中内容重复的文件
+
+    load 目录中已有解析结果不代表该文件已经切分、嵌入和入库，因此不作为跳过的依据。
+
+    Args:
+        directory: 要入库的目录
+        extensions: 允许的扩展名
+        done: 已完成的内容哈希 (load_checkpoint 的返回值)
+        counts: 累计 scanned / skipped 数量的字典
+
+    Returns:
+        Iterator: (文件路径, 内容哈希)
+    """
+    counts = counts if counts is not None else {}
+    known = set(done)
+    for path in walk_files(directory, extensions):
+        counts["scanned"] = counts.get("scanned", 0) + 1
+        content_hash = hash_file(path)
+        if content_hash in known:
+            counts["skipped"] = counts.get("skipped", 0) + 1
+            continue
+        # 同一次运行中内容相同的文件只入库一次
+        known.add(content_hash)
+        yield path, content_hash
+
+
+def walk_files(directory, extensions):
+    """按路径顺序遍历目录中允许类型的文件 (跳过隐藏文件和目录)"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for filename in sorted(files):
+            if not filename.startswith('.') and filename.rsplit('.', 1)[-1].lower() in extensions:
+                yield os.path.join(root, filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目录批量入库 (解析 -> 切分 -> 嵌入 -> 入库)")
+    parser.add_argument("directory", help="要入库的目录")
+    parser.add_argument("--extensions", default=",".join(sorted(ALLOWED_EXTENSIONS)), help="入库的扩展名，逗号分隔")
+    parser.add_argument("--method", default="llamaindex", choices=CHUNK_METHODS, help="切分方法")
+    parser.add_argument("--chunk-size", type=int, default=500, help="chunk 大小")
+    parser.add_argument("--chunk-overlap", type=int, default=50, help="chunk 重叠")
+    parser.add_argument("--separator", default="\n\n", help="分隔符")
+    parser.add_argument("--model-type", default="huggingface", choices=["huggingface", "openai"], help="嵌入模型类型")
+    parser.add_argument("--dedup", action="store_true", help="跳过近似重复 chunk 的嵌入")
+    parser.add_argument("--collection", help="Milvus 集合名，不指定时止于嵌入")
+    parser.add_argument("--dimension", type=int, help="向量维度")
+    parser.add_argument("--parse-workers", type=int, default=2, help="解析线程数 (同时也是解析沙箱的进程数)")
+    parser.add_argument("--chunk-workers", type=int, default=1, help="切分线程数")
+    parser.add_argument("--embed-workers", type=int, default=1, help="嵌入线程数")
+    parser.add_argument("--store-workers", type=int, default=1, help="入库线程数")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="阶段之间队列的容量")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="检查点文件 (相对路径相对于 back 目录)")
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.directory)
+    if not os.path.isdir(directory):
+        parser.error(f"目录不存在: {args.directory}")
+    # 与 Web 服务使用同一套相对路径 (files/...)
+    os.chdir(BACK_DIR)
+
+    # 导入嵌入模块会加载 torch，放在参数检查之后
+    from services.file_embedding import EmbeddingClass
+    from services.file_vector import VectorFileProcessor
+
+    extensions = {extension.strip().lower().lstrip('.') for extension in args.extensions.split(',') if extension.strip()}
+    done = load_checkpoint(args.checkpoint)
+    print(f"检查点中已完成 {len(done)} 个文件")
+
+    sandbox = PartitionSandbox(max_workers=args.parse_workers)
+    file_processor = FileProcessor(UPLOAD_FOLDER, LOAD_FOLDER, partition_sandbox=sandbox)
+    stages = build_ingest_stages(
+        file_processor,
+        FileChunkProcessor(LOAD_FOLDER, CHUNK_FOLDER),
+        EmbeddingClass(model_type=args.model_type, logger=setup_logger("ingest_cli", LOG_FOLDER)),
+        VectorFileProcessor(),
+        method=args.method,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        separator=args.separator,
+        dedup=args.dedup,
+        collection_name=args.collection,
+        dimension=args.dimension,
+        workers={
+            "parse": args.parse_workers, "chunk": args.chunk_workers,
+            "embed": args.embed_workers, "store": args.store_workers
+        }
+    )
+
+    counts = {"scanned": 0, "skipped": 0}
+    sources = []  # 按提交顺序记录 (源文件路径, 字节数)
+
+    def submit():
+        """跳过已完成的文件，把其余文件复制到上传目录后交给流水线"""
+        for path, content_hash in pending_files(directory, extensions, done, counts):
+            file_info = file_processor.build_file_info(os.path.basename(path), path.rsplit('.', 1)[-1].lower())
+            shutil.copyfile(path, file_info["upload_path"])
+            file_info["content_hash"] = content_hash
+            sources.append((path, os.path.getsize(path)))
+            yield file_info
+
+    with open(args.checkpoint, 'a', encoding='utf-8') as checkpoint:
+        def record(number, result):
+            path = sources[number][0]
+            entry = checkpoint_entry(path, result)
+            if result["success"]:
+                print(f"✓ {path} ({result['output'].get('chunk_count')} chunks)")
+            else:
+                print(f"✗ {path} [{result['stage']}] {result['error']}", file=sys.stderr)
+            # 每完成一个文件落盘一次，中断后不会丢失已完成的进度
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+
+        try:
+            summary = StreamingPipeline(stages, queue_size=args.queue_size).run(submit(), on_result=record)
+        finally:
+            sandbox.close()
+
+    elapsed = summary["elapsed_seconds"]
+    total_mb = sum(size for _, size in sources) / 1024 / 1024
+    print()
+    print(f"扫描 {counts['scanned']} 个文件，跳过 {counts['skipped']} 个，"
+          f"入库成功 {summary['succeeded_count']} 个，失败 {summary['failed_count']} 个")
+    if summary["item_count"]:
+        print(f"耗时 {elapsed:.1f} 秒，{summary['items_per_second']} 文件/秒，{total_mb / elapsed if elapsed else 0:.2f} MB/秒，"
+              f"阶段重叠加速 {summary['overlap_speedup']}x")
+        print(f"{'阶段':<8}{'线程':>6}{'完成':>8}{'失败':>6}{'忙碌(s)':>10}{'利用率':>8}{'容量(个/s)':>12}{'平均队列':>10}")
+        for stage in summary["stages"]:
+            print(f"{stage['name']:<8}{stage['workers']:>6}{stage['processed']:>8}{stage['failed']:>6}"
+                  f"{stage['busy_seconds']:>10.1f}{stage['utilization']:>8.0%}{stage['capacity_per_second'] or 0:>12.2f}"
+                  f"{stage['avg_queue_depth']:>10.2f}")
+        print(f"瓶颈阶段: {summary['bottleneck']}")
+    return 0 if summary["failed_count"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
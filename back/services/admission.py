@@ -0,0 +1,296 @@
+"""
+准入控制模块：限制重型接口的并发数，超出时在有界队列中等待，队列满或等待超时时返回 429。
+
+上传解析、切分、嵌入和入库都会占用大量内存和 CPU；同时到达的请求全部并发执行时，
+进程会因内存耗尽或线程争抢而整体变慢甚至崩溃。每类资源有一个闸门 (使用相同资源的接口共用)：最多 max_concurrent 个请求同时执行，
+最多 max_queue 个请求排队等待 (最长 timeout 秒)，其余请求立即得到 429 和 Retry-After。
+
+设置 ADMISSION_LOCK_DIR 后限制跨进程生效 (gunicorn 默认设置)：每个执行名额和排队名额是该目录下的一个锁文件，
+持有文件锁 (flock) 即占用名额，所有工作进程共用同一组名额；进程异常退出时系统自动释放它持有的锁，名额不会泄漏。
+排队的请求按 ADMISSION_POLL_INTERVAL 秒的间隔重试。未设置时 (或平台不支持 flock) 限制只在当前进程内生效。
+"""
+import os
+import math
+import time
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内限制
+    fcntl = None
+
+from services.metrics import QUEUE_DEPTH, Counter, Gauge, Histogram
+
+# 各接口的默认限制: (同时执行数, 排队数)
+DEFAULT_LIMITS = {
+    "upload": (2, 8),
+    "chunk": (2, 8),
+    # 每个嵌入请求都会跑完整个文件的模型推理，默认串行执行
+    "embedding": (1, 4),
+    "vector_store": (1, 4),
+    # 流水线入库一次请求跑完解析到入库的全部阶段，每个文件嵌入时另外占用 embedding 闸门的名额
+    "pipeline": (1, 2),
+}
+# 排队的最长等待时间 (秒)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "120"))
+# 跨进程名额的锁文件目录，未设置时只在进程内限制
+ADMISSION_LOCK_DIR = os.getenv("ADMISSION_LOCK_DIR")
+# 跨进程排队时重试获取名额的间隔 (秒)
+ADMISSION_POLL_INTERVAL = float(os.getenv("ADMISSION_POLL_INTERVAL", "0.05"))
+# Retry-After 的上下限 (秒)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+
+ADMISSION_WAIT_SECONDS = Histogram("rag_admission_wait_seconds", "请求在准入队列中的等待时间", ("endpoint",))
+ADMISSION_REJECTED = Counter("rag_admission_rejected_total", "被拒绝 (429) 的请求数", ("endpoint", "reason"))
+ADMISSION_IN_FLIGHT = Gauge("rag_admission_in_flight", "正在执行的请求数", ("endpoint",))
+
+
+class AdmissionRejected(Exception):
+    """请求未被接纳 (队列已满或等待超时)，retry_after 为建议的重试间隔 (秒)"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为接口返回的错误字典"""
+        return {"success": False, "error": self.message, "retry_after": self.retry_after}
+
+
+class FileSlots:
+    """跨进程的名额池：每个名额是一个锁文件，持有其 flock 即占用该名额"""
+
+    def __init__(self, folder: str, name: str, count: int):
+        """
+        初始化名额池
+
+        Args:
+            folder: 锁文件目录
+            name: 名额池名称 (锁文件名前缀)
+            count: 名额数
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.paths = [os.path.join(folder, f"{name}.{index}.lock") for index in range(count)]
+
+    def try_acquire(self):
+        """
+        不等待地占用一个空闲名额
+
+        Returns:
+            持有锁的文件对象 (传给 release 释放)，没有空闲名额时返回 None
+        """
+        for path in self.paths:
+            lock_file = open(path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock_file
+            except BlockingIOError:
+                lock_file.close()
+        return None
+
+    def acquire(self, timeout: float):
+        """
+        占用一个名额，最多等待 timeout 秒
+
+        Returns:
+            持有锁的文件对象，超时时返回 None
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            lock_file = self.try_acquire()
+            if lock_file is not None or time.monotonic() >= deadline:
+                return lock_file
+            time.sleep(min(ADMISSION_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    @staticmethod
+    def release(lock_file):
+        """释放名额"""
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+
+class AdmissionGate:
+    """单个接口的并发限制和等待队列"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float = ADMISSION_QUEUE_TIMEOUT,
+                 lock_dir: Optional[str] = None):
+        """
+        初始化闸门
+
+        Args:
+            name: 接口名称 (用作指标标签)
+            max_concurrent: 最多同时执行的请求数
+            max_queue: 最多排队等待的请求数
+            timeout: 排队的最长等待时间 (秒)
+            lock_dir: 跨进程名额的锁文件目录，为 None 时只在进程内限制
+        """
+        if max_concurrent < 1 or max_queue < 0:
+            raise ValueError(f"无效的准入限制: {name} ({max_concurrent}, {max_queue})")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # 共用该闸门的视图函数名 (由 admission_controlled 登记)
+        self.endpoints: List[str] = []
+        self.shared = bool(lock_dir) and fcntl is not None
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        if self.shared:
+            self._file_slots = FileSlots(lock_dir, name, max_concurrent)
+            self._queue_slots = FileSlots(lock_dir, f"{name}.queue", max_queue)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        # 请求执行耗时的指数移动平均，用于估算 Retry-After
+        self.avg_service_seconds = None
+        self.stats_counts = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def retry_after(self) -> int:
+        """按排队人数和平均执行耗时估算的重试间隔 (秒)"""
+        average = self.avg_service_seconds or 1.0
+        seconds = math.ceil(average * (self.waiting + 1) / self.max_concurrent)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, seconds))
+
+    def _reject(self, reason: str, message: str):
+        with self._lock:
+            self.stats_counts[f"rejected_{reason}"] += 1
+        ADMISSION_REJECTED.inc(endpoint=self.name, reason=reason)
+        raise AdmissionRejected(message, self.retry_after())
+
+    def _try_acquire_slot(self):
+        if self.shared:
+            return self._file_slots.try_acquire()
+        return self._slots.acquire(blocking=False) or None
+
+    def _acquire_slot(self):
+        if self.shared:
+            return self._file_slots.acquire(self.timeout)
+        return self._slots.acquire(timeout=self.timeout) or None
+
+    def _release_slot(self, slot):
+        if self.shared:
+            FileSlots.release(slot)
+        else:
+            self._slots.release()
+
+    def _try_enter_queue(self):
+        """占用一个排队名额，队列已满时返回 None"""
+        queue_slot = self._queue_slots.try_acquire() if self.shared else True
+        with self._lock:
+            if queue_slot is None or (not self.shared and self.waiting >= self.max_queue):
+                return None
+            self.waiting += 1
+            self.stats_counts["queued"] += 1
+        return queue_slot
+
+    @contextmanager
+    def admit(self):
+        """
+        在 with 语句块中占用一个执行名额
+
+        Raises:
+            AdmissionRejected: 队列已满，或排队超过 timeout 秒
+        """
+        start_time = time.perf_counter()
+        slot = self._try_acquire_slot()
+        if slot is None:
+            queue_slot = self._try_enter_queue()
+            if queue_slot is None:
+                self._reject("queue_full", f"服务繁忙: {self.name} 已有 {self.max_concurrent} 个请求在执行、"
+                                           f"{self.max_queue} 个请求在排队，请稍后重试")
+            QUEUE_DEPTH.inc(queue=f"admission_{self.name}")
+            try:
+                slot = self._acquire_slot()
+            finally:
+                QUEUE_DEPTH.dec(queue=f"admission_{self.name}")
+                with self._lock:
+                    self.waiting -= 1
+                if self.shared:
+                    FileSlots.release(queue_slot)
+            if slot is None:
+                self._reject("timeout", f"服务繁忙: {self.name} 排队超过 {self.timeout:.0f} 秒，请稍后重试")
+
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start_time, endpoint=self.name)
+        with self._lock:
+            self.active += 1
+            self.stats_counts["admitted"] += 1
+        ADMISSION_IN_FLIGHT.inc(endpoint=self.name)
+        service_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - service_start
+            with self._lock:
+                self.active -= 1
+                self.avg_service_seconds = (
+                    elapsed if self.avg_service_seconds is None else 0.8 * self.avg_service_seconds + 0.2 * elapsed
+                )
+            ADMISSION_IN_FLIGHT.dec(endpoint=self.name)
+            self._release_slot(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        闸门统计
+
+        Returns:
+            Dict: 共用闸门的接口、限制配置、当前进程中执行和排队的请求数、各类结果的请求数和平均执行耗时；
+                shared 表示限制是否跨进程生效
+        """
+        with self._lock:
+            return {
+                **self.stats_counts,
+                "endpoints": list(self.endpoints),
+                "shared": self.shared,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout,
+                "active": self.active,
+                "waiting": self.waiting,
+                "avg_service_seconds": round(self.avg_service_seconds, 3) if self.avg_service_seconds is not None else None
+            }
+
+
+def create_gates() -> Dict[str, AdmissionGate]:
+    """
+    按默认限制创建各接口的闸门，环境变量 ADMISSION_<名称>_CONCURRENCY / ADMISSION_<名称>_QUEUE 可覆盖
+
+    Returns:
+        Dict[str, AdmissionGate]: 名称到闸门的映射
+    """
+    gates = {}
+    for name, (max_concurrent, max_queue) in DEFAULT_LIMITS.items():
+        prefix = f"ADMISSION_{name.upper()}"
+        gates[name] = AdmissionGate(
+            name,
+            int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrent))),
+            int(os.getenv(f"{prefix}_QUEUE", str(max_queue))),
+            lock_dir=ADMISSION_LOCK_DIR
+        )
+    return gates
+
+
+def admission_controlled(gate: AdmissionGate):
+    """
+    接口装饰器：在闸门内执行视图函数
+
+    使用相同资源的接口应共用同一个闸门；需要多个闸门时叠加装饰器，各接口按相同顺序叠加以免互相等待。
+
+    Args:
+        gate: 闸门
+
+    Returns:
+        装饰器
+    """
+    def decorator(view):
+        gate.endpoints.append(view.__name__)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with gate.admit():
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
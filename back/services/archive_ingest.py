@@ -0,0 +1,171 @@
+"""
+压缩包批量上传模块：检查 zip 压缩包的成员并逐个流式解压。
+
+只读取中央目录就能得到成员列表和声明的解压大小，据此在解压任何数据之前拒绝成员过多、
+总解压大小过大或压缩比异常的压缩包 (zip 炸弹)；解压时 zipfile 最多读出声明的大小，
+因此声明的大小同时是实际解压量的上限。成员在解析时才逐个解压，不预先展开整个压缩包。
+"""
+import os
+import hashlib
+import zipfile
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from services.partition_cache import HashingWriter
+
+# 压缩包中允许的最大成员数 (只统计需要解析的文件)
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "1000"))
+# 需要解析的成员的解压总大小上限
+ARCHIVE_MAX_UNCOMPRESSED_BYTES = int(os.getenv("ARCHIVE_MAX_UNCOMPRESSED_MB", "2048")) * 1024 * 1024
+# 单个成员的最大压缩比，超过时视为 zip 炸弹
+ARCHIVE_MAX_RATIO = 200
+# 并行解析的成员数 (每个成员在解析沙箱的工作进程中解析)
+ARCHIVE_WORKERS = int(os.getenv("ARCHIVE_WORKERS", str(os.cpu_count() or 1)))
+# 整个压缩包的解析时限 (秒)，到时仍未完成的成员记为超时失败
+ARCHIVE_TIMEOUT_SECONDS = float(os.getenv("ARCHIVE_TIMEOUT_SECONDS", "1800"))
+# 解压时每次读取的字节数
+EXTRACT_BLOCK_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """压缩包无效或超出限制，status 为对应的 HTTP 状态码"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ArchiveDeadline:
+    """
+    压缩包解析时限的提交闸门
+
+    成员解析完成后、写入 load 文件之前调用 claim 登记；到时限时 expire 关闭闸门，之后登记的成员不再写入，
+    由调用方记为超时。expire 返回在关闭前已登记的成员，这些成员即将写完，应等待并采用其结果，
+    保证返回给客户端的结果与实际写入的文件一致。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expired = False
+        self._claimed: Set[str] = set()
+
+    def claim(self, member_name: str) -> bool:
+        """登记成员即将写入结果；时限已到时返回 False"""
+        with self._lock:
+            if self._expired:
+                return False
+            self._claimed.add(member_name)
+            return True
+
+    @property
+    def expired(self) -> bool:
+        """时限是否已到"""
+        with self._lock:
+            return self._expired
+
+    def expire(self) -> Set[str]:
+        """关闭闸门，返回已登记的成员"""
+        with self._lock:
+            self._expired = True
+            return set(self._claimed)
+
+
+def is_archive(filename: str) -> bool:
+    """根据扩展名判断是否为 zip 压缩包"""
+    return filename.lower().endswith(".zip")
+
+
+def member_filename(member_name: str) -> str:
+    """
+    把成员路径展平为上传目录中的文件名
+
+    目录分隔符替换为下划线，并在扩展名前加上成员路径哈希的前 8 位：
+    仅替换分隔符时 a/b.pdf 和 a_b.pdf 会得到相同的文件名。
+
+    Args:
+        member_name: 压缩包中的成员路径
+
+    Returns:
+        str: 文件名；成员路径中没有有效部分时为空字符串
+    """
+    parts = [part for part in member_name.replace("\\", "/").split("/") if part and part not in (".", "..")]
+    if not parts:
+        return ""
+    base, extension = os.path.splitext("_".join(parts))
+    digest = hashlib.sha1(member_name.encode("utf-8")).hexdigest()[:8]
+    return f"{base}_{digest}{extension}"
+
+
+def scan_archive(path: str, allowed_extensions: Iterable[str]) -> Tuple[List[zipfile.ZipInfo], List[Dict[str, Any]]]:
+    """
+    读取压缩包的中央目录，挑出需要解析的成员并检查限制
+
+    Args:
+        path: 压缩包路径
+        allowed_extensions: 允许的扩展名 (不含点)
+
+    Returns:
+        Tuple: (需要解析的成员列表, 跳过的成员及原因列表)
+
+    Raises:
+        ArchiveError: 不是有效的 zip 文件 (400)，或成员数、解压总大小、压缩比超出限制 (413)
+    """
+    allowed_extensions = {extension.lower() for extension in allowed_extensions}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            infos = archive.infolist()
+    except zipfile.BadZipFile as e:
+        raise ArchiveError(f"无效的 zip 文件: {e}")
+
+    members, skipped, seen = [], [], set()
+    for info in infos:
+        name = info.filename
+        basename = os.path.basename(name.rstrip("/"))
+        if info.is_dir():
+            continue
+        if name.startswith("__MACOSX/") or basename.startswith("."):
+            skipped.append({"member": name, "reason": "系统文件"})
+        elif info.flag_bits & 0x1:
+            skipped.append({"member": name, "reason": "加密文件"})
+        elif os.path.splitext(basename)[1].lower().lstrip(".") not in allowed_extensions:
+            skipped.append({"member": name, "reason": "不允许的文件类型"})
+        elif not member_filename(name):
+            skipped.append({"member": name, "reason": "无效的文件名"})
+        elif name in seen:
+            # 同一路径只解析一次 (按路径解压时读到的是其中最后一个)，否则结果和 load 文件会互相覆盖
+            skipped.append({"member": name, "reason": "重复的成员路径"})
+        else:
+            seen.add(name)
+            members.append(info)
+
+    if len(members) > ARCHIVE_MAX_MEMBERS:
+        raise ArchiveError(f"压缩包中需要解析的文件过多: {len(members)} > {ARCHIVE_MAX_MEMBERS}", 413)
+    total_size = sum(info.file_size for info in members)
+    if total_size > ARCHIVE_MAX_UNCOMPRESSED_BYTES:
+        raise ArchiveError(
+            f"压缩包解压后过大: {total_size // (1024 * 1024)} MB > {ARCHIVE_MAX_UNCOMPRESSED_BYTES // (1024 * 1024)} MB", 413
+        )
+    for info in members:
+        if info.file_size > ARCHIVE_MAX_RATIO * max(info.compress_size, 1) and info.file_size > EXTRACT_BLOCK_SIZE:
+            raise ArchiveError(f"成员 {info.filename} 的压缩比异常 (疑似 zip 炸弹)", 413)
+    return members, skipped
+
+
+def extract_member(archive_path: str, member_name: str, target_path: str) -> str:
+    """
+    把一个成员流式解压到目标路径，同时计算 SHA-256
+
+    Args:
+        archive_path: 压缩包路径
+        member_name: 成员路径
+        target_path: 目标文件路径
+
+    Returns:
+        str: 解压内容的 SHA-256
+    """
+    with zipfile.ZipFile(archive_path) as archive, archive.open(member_name) as source, open(target_path, 'wb') as f:
+        writer = HashingWriter(f)
+        for block in iter(lambda: source.read(EXTRACT_BLOCK_SIZE), b''):
+            writer.write(block)
+    return writer.hexdigest()
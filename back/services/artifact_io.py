@@ -0,0 +1,358 @@
+"""
+流式产物读写模块，为 chunk 和 embedding 阶段提供按行 JSON (NDJSON) 产物格式。
+
+产物文件结构 (每行一个 JSON 对象):
+    第一行: 头记录 {"kind": "header", "artifact": "chunk", "version": 1, "meta": {...}}
+    中间行: 数据记录，每个 chunk / embedding 一行
+    最后一行: 尾记录 {"kind": "footer", "record_count": N, "meta": {...}}，写入完成时追加
+
+写入端只追加，读取端是生成器，内存占用只与单条记录大小相关，而与整个文档大小无关。
+没有尾记录的文件表示仍在写入 (或写入中断)，已写入的记录依然可以被读取。
+
+chunk 记录可以只保存 start/end 字符偏移而不保存文本，头记录中的 source_path 指向
+load 阶段的产物，读取时通过 iter_materialized 按需从源文本中切片补全 content。
+"""
+import os
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from services.listing_cache import notify_artifact_written
+
+ARTIFACT_EXTENSION = ".jsonl"
+ARTIFACT_VERSION = 1
+
+# 旧格式 (整个 JSON 对象) 中保存记录列表的字段
+LEGACY_RECORDS_KEY = "chunks"
+
+# load 阶段产物中保存文档全文的字段
+SOURCE_TEXT_KEY = "文件读取内容"
+
+# 读取尾记录时每次从文件末尾向前读取的字节数
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _dump_line(obj: Dict[str, Any]) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def is_legacy_artifact(path: str) -> bool:
+    """判断是否为旧的整文件 JSON 产物"""
+    return path.endswith(".json")
+
+
+def is_artifact_file(filename: str) -> bool:
+    """判断文件名是否为可读取的产物文件 (新的 .jsonl 或旧的 .json)"""
+    return filename.endswith(ARTIFACT_EXTENSION) or filename.endswith(".json")
+
+
+def artifact_id(filename: str) -> str:
+    """去掉产物扩展名，得到文件 ID"""
+    if filename.endswith(ARTIFACT_EXTENSION):
+        return filename[:-len(ARTIFACT_EXTENSION)]
+    return os.path.splitext(filename)[0]
+
+
+class ArtifactWriter:
+    """
+    按行写入产物文件的写入器，可作为上下文管理器使用。
+
+    正常退出时追加尾记录；发生异常时不写尾记录，atomic 模式下会删除临时文件。
+    """
+
+    def __init__(self, path: str, artifact: str, meta: Optional[Dict[str, Any]] = None, atomic: bool = False):
+        """
+        初始化写入器并立即写入头记录
+
+        Args:
+            path: 产物文件路径
+            artifact: 产物类型 (chunk, embedding)
+            meta: 头记录中的元数据
+            atomic: 为 True 时先写入临时文件，关闭时再原子重命名为目标文件
+        """
+        self.path = path
+        self.artifact = artifact
+        self.atomic = atomic
+        self.record_count = 0
+        self.closed = False
+
+        self._write_path = f"{path}.tmp" if atomic else path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self._write_path, 'w', encoding='utf-8')
+        self._file.write(_dump_line({
+            "kind": "header",
+            "artifact": artifact,
+            "version": ARTIFACT_VERSION,
+            "meta": meta or {}
+        }))
+        self._file.flush()
+
+    def write(self, record: Dict[str, Any]):
+        """追加一条数据记录"""
+        self._file.write(_dump_line(record))
+        self.record_count += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]):
+        """逐条追加多条数据记录"""
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """把已写入的记录刷新到磁盘，便于下游阶段边写边读"""
+        self._file.flush()
+
+    def close(self, footer_meta: Optional[Dict[str, Any]] = None):
+        """
+        写入尾记录并关闭文件
+
+        Args:
+            footer_meta: 只有写入完成后才能确定的元数据 (如处理耗时)
+        """
+        if self.closed:
+            return
+        self._file.write(_dump_line({
+            "kind": "footer",
+            "record_count": self.record_count,
+            "meta": footer_meta or {}
+        }))
+        self._file.close()
+        self.closed = True
+        if self.atomic:
+            os.replace(self._write_path, self.path)
+        notify_artifact_written(self.path)
+
+    def abort(self):
+        """放弃写入：关闭文件，atomic 模式下删除临时文件"""
+        if self.closed:
+            return
+        self._file.close()
+        self.closed = True
+        if self.atomic and os.path.exists(self._write_path):
+            os.remove(self._write_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def _load_legacy(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    读取产物的头记录
+
+    Args:
+        path: 产物文件路径
+
+    Returns:
+        dict: 头记录；旧格式文件会被转换为同样的结构
+    """
+    if is_legacy_artifact(path):
+        data = _load_legacy(path)
+        return {
+            "kind": "header",
+            "artifact": "legacy",
+            "version": 0,
+            "meta": {k: v for k, v in data.items() if k != LEGACY_RECORDS_KEY}
+        }
+
+    with open(path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+    header = json.loads(first_line)
+    if header.get("kind") != "header":
+        raise ValueError(f"产物文件缺少头记录: {path}")
+    return header
+
+
+def read_footer(path: str) -> Optional[Dict[str, Any]]:
+    """
+    从文件末尾读取尾记录，不需要解析整个文件
+
+    Args:
+        path: 产物文件路径
+
+    Returns:
+        Optional[dict]: 尾记录，文件仍在写入或写入中断时返回 None
+    """
+    if is_legacy_artifact(path):
+        data = _load_legacy(path)
+        return {
+            "kind": "footer",
+            "record_count": len(data.get(LEGACY_RECORDS_KEY, [])),
+            "meta": {}
+        }
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        read_size = min(_TAIL_BLOCK_SIZE, file_size)
+        while True:
+            f.seek(file_size - read_size)
+            tail = f.read(read_size).rstrip(b"\n")
+            newline_pos = tail.rfind(b"\n")
+            if newline_pos >= 0 or read_size == file_size:
+                last_line = tail[newline_pos + 1:]
+                break
+            read_size = min(read_size * 2, file_size)
+
+    if not last_line:
+        return None
+    try:
+        record = json.loads(last_line.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        # 最后一行写到一半
+        return None
+    return record if record.get("kind") == "footer" else None
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    逐条读取产物中的数据记录
+
+    Args:
+        path: 产物文件路径
+
+    Yields:
+        dict: 数据记录 (不包括头记录和尾记录)
+    """
+    if is_legacy_artifact(path):
+        yield from _load_legacy(path).get(LEGACY_RECORDS_KEY, [])
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        f.readline()  # 跳过头记录
+        for line in f:
+            if not line.endswith("\n"):
+                # 写入端尚未写完的最后一行
+                break
+            record = json.loads(line)
+            if record.get("kind") == "footer":
+                break
+            yield record
+
+
+def read_meta(path: str) -> Dict[str, Any]:
+    """
+    合并头记录和尾记录中的元数据
+
+    值为 dict 的字段做一层合并，例如头记录中的 embedding_metadata 与尾记录中的
+    embedding_metadata 会合并为一个字典。
+
+    Args:
+        path: 产物文件路径
+
+    Returns:
+        dict: 合并后的元数据
+    """
+    meta = dict(read_header(path).get("meta", {}))
+    footer = read_footer(path)
+    if footer:
+        for key, value in footer.get("meta", {}).items():
+            if isinstance(value, dict) and isinstance(meta.get(key), dict):
+                meta[key] = {**meta[key], **value}
+            else:
+                meta[key] = value
+    return meta
+
+
+def count_records(path: str) -> int:
+    """
+    获取产物中的记录数量，优先使用尾记录，缺失时逐行计数
+
+    Args:
+        path: 产物文件路径
+
+    Returns:
+        int: 记录数量
+    """
+    footer = read_footer(path)
+    if footer is not None:
+        return footer.get("record_count", 0)
+    return sum(1 for _ in iter_records(path))
+
+
+def load_artifact(path: str) -> Dict[str, Any]:
+    """
+    把产物还原为旧的整文件 JSON 结构 ({...元数据, "chunks": [...]})
+
+    会把所有记录读入内存并补全 content，只用于需要一次性返回全部数据的 API 响应。
+
+    Args:
+        path: 产物文件路径
+
+    Returns:
+        dict: 旧格式的完整数据
+    """
+    data = read_meta(path)
+    data[LEGACY_RECORDS_KEY] = list(iter_materialized(path, data))
+    return data
+
+
+def load_source_text(source_path: str, expected_length: Optional[int] = None) -> str:
+    """
+    读取 load 阶段产物中的文档全文
+
+    Args:
+        source_path: load 产物路径
+        expected_length: 切分时记录的全文长度，用于发现源文件已被修改
+
+    Returns:
+        str: 文档全文
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"chunk 偏移引用的源文件不存在: {source_path}")
+    with open(source_path, 'r', encoding='utf-8') as f:
+        text = json.load(f).get(SOURCE_TEXT_KEY, "")
+    if expected_length is not None and len(text) != expected_length:
+        raise ValueError(f"源文件内容已变化，chunk 偏移失效: {source_path}")
+    return text
+
+
+def iter_materialized(path: str, meta: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐条读取记录，并根据 start/end 偏移补全 content 字段
+
+    源文本只在第一次遇到没有 content 的记录时加载一次。
+
+    Args:
+        path: 产物文件路径
+        meta: 已读取的头记录元数据，为空时自动读取
+
+    Yields:
+        dict: 带有 content 字段的数据记录
+    """
+    if meta is None:
+        meta = read_header(path).get("meta", {})
+    source_text = None
+    for record in iter_records(path):
+        if "content" not in record and "start" in record:
+            if source_text is None:
+                source_path = meta.get("source_path")
+                if not source_path:
+                    raise ValueError(f"产物缺少 source_path，无法还原 chunk 文本: {path}")
+                source_text = load_source_text(source_path, meta.get("source_length"))
+            record["content"] = source_text[record["start"]:record["end"]]
+        yield record
+
+
+def strip_materialized(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    写回产物前去掉可由偏移还原的 content 字段
+
+    Args:
+        record: 数据记录
+
+    Returns:
+        dict: 去掉 content 后的记录 (没有偏移的记录原样返回)
+    """
+    if "start" in record and "end" in record and "content" in record:
+        return {k: v for k, v in record.items() if k != "content"}
+    return record
@@ -0,0 +1,222 @@
+"""
+chunk 近似去重模块，用 SimHash 指纹和 LSH 分桶找出内容几乎相同的 chunk。
+
+政策、合同、幻灯片等语料中大量重复的模板段落会切出内容相同或仅有细微差别的 chunk，
+去重后每个簇只需嵌入一个代表 chunk，其余 chunk 记录 duplicate_of 并复用代表的向量。
+除了同一文件内的 chunk，还可以加入语料中其他产物已嵌入的代表 (add_existing)，跨文档的重复模板同样只嵌入一次。
+"""
+import re
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# 指纹位数
+SIMHASH_BITS = 64
+# 默认判定为近似重复的最大汉明距离
+DEFAULT_MAX_DISTANCE = 3
+# 默认字符 n-gram 长度，对中文和中英混合文本都适用
+DEFAULT_NGRAM = 3
+
+# 归一化时去掉空白、标点和下划线，只保留文字和数字
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    归一化文本：转小写并去掉空白和标点，使只有排版差异的 chunk 得到相同指纹
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 归一化后的文本
+    """
+    return _NON_WORD_RE.sub('', text.lower())
+
+
+def simhash(text: str, ngram: int = DEFAULT_NGRAM) -> Optional[int]:
+    """
+    计算文本的 64 位 SimHash 指纹
+
+    以字符 n-gram 为特征 (按出现次数加权)，每个特征取 64 位哈希，各位按多数投票得到指纹；
+    相似文本的指纹汉明距离小。
+
+    Args:
+        text: 文本
+        ngram: 字符 n-gram 长度
+
+    Returns:
+        Optional[int]: 指纹，归一化后为空文本时返回 None
+    """
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+
+    count = max(1, len(normalized) - ngram + 1)
+    hashes = np.fromiter(
+        (int.from_bytes(blake2b(normalized[i:i + ngram].encode('utf-8'), digest_size=8).digest(), 'little')
+         for i in range(count)),
+        dtype='<u8',
+        count=count
+    )
+    # (count, 64) 的位矩阵，第 j 列为每个特征哈希的第 j 位
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(count, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > count
+    return int.from_bytes(np.packbits(votes, bitorder='little').tobytes(), 'little')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹的汉明距离"""
+    return (a ^ b).bit_count()
+
+
+class ChunkDeduplicator:
+    """
+    流式 chunk 近似去重器
+
+    chunk 按顺序逐个加入；每个簇以最先出现的 chunk 为代表，只有代表进入 LSH 索引。
+    指纹按位切为 max_distance + 1 段，由抽屉原理，汉明距离不超过 max_distance 的两个指纹
+    至少有一段完全相同，因此只需比较同一分桶中的代表，不会漏判。
+    新 chunk 只和代表比较 (不做传递合并)，保证簇内每个 chunk 与代表的距离都不超过阈值。
+    其他产物的代表以 (产物名, chunk ID) 为键加入索引，只参与查找，不计入本文件的统计和簇映射。
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, ngram: int = DEFAULT_NGRAM):
+        """
+        初始化去重器
+
+        Args:
+            max_distance: 判定为近似重复的最大汉明距离
+            ngram: 字符 n-gram 长度
+        """
+        if not 0 <= max_distance < SIMHASH_BITS // 2:
+            raise ValueError(f"max_distance 必须在 [0, {SIMHASH_BITS // 2}) 范围内: {max_distance}")
+        self.max_distance = max_distance
+        self.ngram = ngram
+        self.band_count = max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.band_count
+        self._band_mask = (1 << self.band_bits) - 1
+
+        self._buckets: Dict[tuple, List[Any]] = {}
+        self._fingerprints: Dict[Any, int] = {}  # 代表 chunk 的指纹
+        self.clusters: Dict[Any, List[Any]] = {}  # 代表 chunk ID -> 重复 chunk ID 列表
+        self._external = set()  # 来自其他产物的代表 (产物名, chunk ID)
+        self.corpus_duplicates: Dict[str, int] = {}  # 其他产物 -> 与其代表重复的 chunk 数
+        self.total_count = 0
+        self.duplicate_count = 0
+
+    def _bands(self, fingerprint: int):
+        for band in range(self.band_count):
+            yield band, (fingerprint >> (band * self.band_bits)) & self._band_mask
+
+    def _index(self, key: Any, fingerprint: int):
+        self._fingerprints[key] = fingerprint
+        for band_key in self._bands(fingerprint):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def _unindex(self, key: Any):
+        fingerprint = self._fingerprints.pop(key)
+        for band_key in self._bands(fingerprint):
+            self._buckets[band_key].remove(key)
+        self._external.discard(key)
+
+    def add_existing(self, source: str, chunk_ids: Iterable[Any], fingerprints: Iterable[int]):
+        """
+        加入其他产物中已嵌入的代表 chunk
+
+        Args:
+            source: 代表所在的产物名
+            chunk_ids: 代表 chunk ID
+            fingerprints: 与 chunk_ids 一一对应的指纹
+        """
+        for chunk_id, fingerprint in zip(chunk_ids, fingerprints):
+            key = (source, chunk_id)
+            self._external.add(key)
+            self._index(key, int(fingerprint))
+
+    def is_external(self, representative: Any) -> bool:
+        """代表是否来自其他产物 (此时为 (产物名, chunk ID))"""
+        return representative in self._external
+
+    def fingerprint(self, chunk_id: Any) -> Optional[int]:
+        """代表 chunk 的指纹，不是代表时返回 None"""
+        return self._fingerprints.get(chunk_id)
+
+    def find(self, fingerprint: int) -> Optional[Any]:
+        """
+        查找与指纹近似重复的代表 chunk
+
+        Args:
+            fingerprint: SimHash 指纹
+
+        Returns:
+            Optional[Any]: 最近的代表 chunk ID，没有近似重复时返回 None
+        """
+        best_id, best_distance = None, self.max_distance + 1
+        seen = set()
+        for key in self._bands(fingerprint):
+            for candidate in self._buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming_distance(fingerprint, self._fingerprints[candidate])
+                if distance < best_distance:
+                    best_id, best_distance = candidate, distance
+        return best_id
+
+    def add(self, chunk_id: Any, text: str, accept_external: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        加入一个 chunk
+
+        Args:
+            chunk_id: chunk ID
+            text: chunk 文本
+            accept_external: 判断其他产物的代表是否可用 (例如其向量能否读取) 的回调；
+                返回 False 时该代表移出索引并改找下一个代表，都不可用时该 chunk 成为新的代表
+
+        Returns:
+            Optional[Any]: 近似重复时返回代表 chunk ID (其他产物的代表为 (产物名, chunk ID))，
+                否则返回 None (该 chunk 成为新的代表)
+        """
+        self.total_count += 1
+        fingerprint = simhash(text, self.ngram)
+        if fingerprint is None:
+            return None
+
+        representative = self.find(fingerprint)
+        while (representative is not None and accept_external is not None
+               and representative in self._external and not accept_external(representative)):
+            self._unindex(representative)
+            representative = self.find(fingerprint)
+        if representative is not None:
+            if representative in self._external:
+                source = representative[0]
+                self.corpus_duplicates[source] = self.corpus_duplicates.get(source, 0) + 1
+            else:
+                self.clusters.setdefault(representative, []).append(chunk_id)
+            self.duplicate_count += 1
+            return representative
+
+        self._index(chunk_id, fingerprint)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        去重统计信息
+
+        Returns:
+            Dict: chunk 总数、重复数、去重率以及代表 -> 重复 chunk 的映射 (只含有重复的簇)
+        """
+        return {
+            "method": "simhash",
+            "max_distance": self.max_distance,
+            "total_chunk_count": self.total_count,
+            "unique_chunk_count": self.total_count - self.duplicate_count,
+            "duplicate_chunk_count": self.duplicate_count,
+            "dedup_ratio": round(self.duplicate_count / self.total_count, 4) if self.total_count else 0.0,
+            # JSON 对象的键只能是字符串
+            "clusters": {str(rep): duplicates for rep, duplicates in self.clusters.items()},
+            # 与其他产物中的代表重复的 chunk 数 (按代表所在产物)
+            "corpus_duplicates": dict(self.corpus_duplicates)
+        }
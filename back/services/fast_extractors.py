@@ -0,0 +1,229 @@
+"""
+快速文本提取模块，为不需要版面分析的格式提供轻量提取器，绕过 unstructured。
+
+- txt / md: 直接解码
+- xlsx: openpyxl 只读模式逐行流式读取，不把整个工作簿载入内存
+- docx / pptx: 直接从 zip 包中流式解析 XML 提取文本
+
+每个提取器返回文本块列表 (与 unstructured 的元素对应)，由调用方用空行拼接。
+xlsx/docx/pptx 来自不可信的上传，在 API 进程中解析：解析前按 zip 目录检查解压后的大小，
+超过 FAST_EXTRACT_MAX_BYTES 时抛出 ExtractionLimitError，防止解压炸弹。
+"""
+import os
+import re
+import codecs
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterator, List, Optional
+
+from openpyxl import load_workbook
+
+# 按顺序尝试的文本编码，gb18030 兼容 GBK/GB2312
+TEXT_ENCODINGS = ("utf-8-sig", "gb18030")
+# 以 BOM 标识的编码 (UTF-32 的 BOM 以 UTF-16 的 BOM 开头，需要先判断)
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_SLIDE_NAME_RE = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+
+# 快速提取时 zip 包中要解析的成员解压后的总大小上限 (字节)
+FAST_EXTRACT_MAX_BYTES = int(os.getenv("FAST_EXTRACT_MAX_MB", "256")) * 1024 * 1024
+
+
+class ExtractionLimitError(ValueError):
+    """文件解压后超出快速提取的大小上限"""
+
+
+def _check_uncompressed_size(archive: zipfile.ZipFile, names: List[str], path: str):
+    """
+    检查 zip 包中成员解压后的总大小
+
+    zipfile 读取成员时最多返回目录中记录的 file_size 字节，因此按目录检查即可限制实际解压量。
+
+    Args:
+        archive: 已打开的 zip 包
+        names: 要解析的成员名
+        path: 文件路径 (用于错误信息)
+
+    Raises:
+        ExtractionLimitError: 超出 FAST_EXTRACT_MAX_BYTES
+    """
+    total = sum(archive.getinfo(name).file_size for name in names)
+    if total > FAST_EXTRACT_MAX_BYTES:
+        raise ExtractionLimitError(
+            f"{os.path.basename(path)} 解压后为 {total / 1024 / 1024:.1f} MB，"
+            f"超过上限 {FAST_EXTRACT_MAX_BYTES / 1024 / 1024:.0f} MB"
+        )
+
+
+def bom_encoding(data: bytes) -> Optional[str]:
+    """
+    根据开头的 BOM 判断 UTF-16 / UTF-32 编码
+
+    Args:
+        data: 文件开头的字节
+
+    Returns:
+        Optional[str]: utf-16 或 utf-32 (解码时自动去掉 BOM)，没有这两种 BOM 时返回 None
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+
+def extract_text(path: str) -> List[str]:
+    """
+    直接解码纯文本 / Markdown 文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        List[str]: 按空行分隔的文本段落
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoding = bom_encoding(data)
+    for encoding in ((encoding,) if encoding else TEXT_ENCODINGS):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode("utf-8", errors="replace")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+
+def extract_xlsx(path: str) -> List[str]:
+    """
+    以只读模式逐行读取 Excel 工作簿
+
+    每个工作表一个文本块，单元格以制表符分隔，空行跳过。
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        List[str]: 每个工作表的文本
+    """
+    with zipfile.ZipFile(path) as archive:
+        _check_uncompressed_size(archive, archive.namelist(), path)
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        blocks = []
+        for sheet in workbook.worksheets:
+            lines = []
+            for row in sheet.iter_rows(values_only=True):
+                cells = ["" if value is None else str(value) for value in row]
+                if any(cells):
+                    lines.append("\t".join(cells).rstrip("\t"))
+            if lines:
+                blocks.append(f"{sheet.title}\n" + "\n".join(lines))
+        return blocks
+    finally:
+        workbook.close()
+
+
+def _iter_paragraphs(xml_file, paragraph_tag: str, text_tag: str, break_tags: tuple) -> Iterator[str]:
+    """
+    流式解析 XML，按段落产生文本
+
+    段落结束时清空该元素并把它从父元素中移除，已处理的段落不会继续挂在文档树上，
+    内存占用与文档大小无关。
+    """
+    parts = []
+    # 当前打开的元素，栈顶为正在结束的元素的父元素
+    open_elements = []
+    for event, element in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            open_elements.append(element)
+            continue
+        open_elements.pop()
+        tag = element.tag
+        if tag == text_tag:
+            parts.append(element.text or "")
+        elif tag in break_tags:
+            parts.append("\t" if tag.endswith("tab") else "\n")
+        elif tag == paragraph_tag:
+            text = "".join(parts).strip()
+            parts = []
+            element.clear()
+            # 结束时段落总是父元素的最后一个子元素
+            if open_elements and len(open_elements[-1]) and open_elements[-1][-1] is element:
+                del open_elements[-1][-1]
+            if text:
+                yield text
+
+
+def extract_docx(path: str) -> List[str]:
+    """
+    从 docx 的 word/document.xml 中提取段落文本 (表格单元格中的段落同样提取)
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        List[str]: 段落文本
+    """
+    with zipfile.ZipFile(path) as archive:
+        _check_uncompressed_size(archive, ["word/document.xml"], path)
+        with archive.open("word/document.xml") as xml_file:
+            return list(_iter_paragraphs(
+                xml_file, f"{_WORD_NS}p", f"{_WORD_NS}t", (f"{_WORD_NS}tab", f"{_WORD_NS}br", f"{_WORD_NS}cr")
+            ))
+
+
+def extract_pptx(path: str) -> List[str]:
+    """
+    按幻灯片顺序从 pptx 的 ppt/slides/slideN.xml 中提取段落文本
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        List[str]: 段落文本
+    """
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (int(match.group(1)), name)
+            for name in archive.namelist()
+            for match in [_SLIDE_NAME_RE.match(name)] if match
+        )
+        _check_uncompressed_size(archive, [name for _, name in slides], path)
+        blocks = []
+        for _, name in slides:
+            with archive.open(name) as xml_file:
+                blocks.extend(_iter_paragraphs(xml_file, f"{_DRAWING_NS}p", f"{_DRAWING_NS}t", (f"{_DRAWING_NS}br",)))
+        return blocks
+
+
+# 扩展名 -> 快速提取器；未列出的格式 (pdf、xls 等) 仍由 unstructured 解析
+FAST_EXTRACTORS: Dict[str, Callable[[str], List[str]]] = {
+    ".txt": extract_text,
+    ".md": extract_text,
+    ".xlsx": extract_xlsx,
+    ".docx": extract_docx,
+    ".pptx": extract_pptx,
+}
+
+
+def get_fast_extractor(path: str) -> Optional[Callable[[str], List[str]]]:
+    """
+    根据扩展名获取快速提取器
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Optional[Callable]: 提取器，没有快速路径的格式返回 None
+    """
+    return FAST_EXTRACTORS.get(os.path.splitext(path)[1].lower())
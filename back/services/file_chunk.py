@@ -3,8 +3,21 @@
 """
 import os
 import json
+import time
 import datetime
 import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from services.artifact_io import (
+    ARTIFACT_EXTENSION, SOURCE_TEXT_KEY, ArtifactWriter, artifact_id, count_records, is_artifact_file, read_meta
+)
+from services.metrics import STAGE_ITEMS, STAGE_SECONDS
+from services.model_cache import HF_MAX_LENGTH, HF_MODEL_NAME, embed_texts, get_tokenizer
+from services.text_segmenter import (
+    build_token_offsets, chunk_spans, iter_sentence_spans, iter_text_pieces, pack_spans, semantic_groups, split_span
+)
+import numpy as np
 
 # LlamaIndex 相关导入
 from llama_index.llms.openai import OpenAI
@@ -21,6 +34,36 @@ from langchain.text_splitter import CharacterTextSplitter
 from dotenv import load_dotenv
 load_dotenv()
 
+# 支持的切分方法
+CHUNK_METHODS = ("llamaindex", "langchain", "custom", "native", "tokens", "semantic")
+# 语义切分：chunk 最小长度占 chunk_size 的比例，以及视为话题转换点的相似度分位数
+SEMANTIC_MIN_CHUNK_RATIO = 0.25
+SEMANTIC_BREAKPOINT_PERCENTILE = 15.0
+# 句子向量旁路文件的后缀，与 chunk 产物放在同一目录
+SENTENCE_VECTORS_SUFFIX = ".sentences.npy"
+# 按 token 切分时句子的最大字符数：没有句子边界的长文本先按该长度切开，保证分句是线性时间，
+# 之后仍在 token 边界上按 token 预算切分 (模型最多 512 个 token，通常远少于该字符数)
+TOKEN_SENTENCE_MAX_CHARS = 4096
+# 一次参数扫描最多评估的配置数
+MAX_SWEEP_CONFIGS = 64
+# 批量切分的默认进程数
+CHUNK_BATCH_WORKERS = int(os.getenv("CHUNK_BATCH_WORKERS", os.cpu_count() or 1))
+
+# 批量切分子进程内的处理器，由 _init_batch_worker 在每个子进程中创建一次
+_batch_processor = None
+
+
+def _init_batch_worker(load_folder, chunk_folder):
+    """批量切分子进程初始化：创建进程内复用的切分处理器 (分词器等随之复用)"""
+    global _batch_processor
+    _batch_processor = FileChunkProcessor(load_folder, chunk_folder)
+
+
+def _run_batch_chunk(file_id, method, chunk_size, chunk_overlap, separator):
+    """在子进程中切分单个文件，只返回摘要，chunk内容已写入产物，不再传回主进程"""
+    return _batch_processor.chunk_file_summary(file_id, method, chunk_size, chunk_overlap, separator)
+
+
 class FileChunkProcessor:
     def __init__(self, load_folder, chunk_folder):
         """
@@ -36,6 +79,11 @@ class FileChunkProcessor:
         # 确保目录存在
         os.makedirs(self.chunk_folder, exist_ok=True)
         
+        # 按 token 切分时使用的分词器，首次使用时加载
+        self.tokenizer = None
+        # 语义切分时计算句子向量的函数 (texts -> np.ndarray)，首次使用时绑定到共享的 bge 模型
+        self.sentence_encoder = None
+        
         # 初始化LlamaIndex设置
         # self.initialize_llama_index()
         
@@ -140,6 +188,138 @@ class FileChunkProcessor:
             print(f"使用LangChain切分文档时出错: {e}")
             return []
     
+    def chunk_spans_native(self, content, chunk_size=500, chunk_overlap=50):
+        """
+        使用内置的流式切分器计算 chunk 偏移
+        
+        单遍扫描文本，识别中英文句末标点 (。！？；!?;) 和换行作为句子边界，
+        再把句子贪心打包为不超过 chunk_size 的 chunk。
+        
+        Args:
+            content: 文档内容
+            chunk_size: 每个chunk的最大字符数
+            chunk_overlap: chunk之间的最大重叠字符数
+            
+        Returns:
+            list: 每个chunk在原文中的 (start, end) 偏移
+        """
+        try:
+            return list(chunk_spans(iter_text_pieces(content), chunk_size, chunk_overlap))
+        except Exception as e:
+            print(f"使用内置切分器切分文档时出错: {e}")
+            return []
+    
+    def chunk_document_native(self, content, chunk_size=500, chunk_overlap=50):
+        """
+        使用内置的流式切分器对文档进行切分
+        
+        Args:
+            content: 文档内容
+            chunk_size: 每个chunk的最大字符数
+            chunk_overlap: chunk之间的最大重叠字符数
+            
+        Returns:
+            list: 包含切分后内容的列表
+        """
+        return [content[start:end] for start, end in self.chunk_spans_native(content, chunk_size, chunk_overlap)]
+    
+    def get_sentence_encoder(self):
+        """获取句子向量编码函数，默认使用进程内共享的 bge-small-zh 模型批量编码"""
+        if self.sentence_encoder is None:
+            self.sentence_encoder = embed_texts
+        return self.sentence_encoder
+    
+    def chunk_spans_semantic(self, content, chunk_size=500, min_chunk_size=None):
+        """
+        按语义切分文档：在相邻句子相似度下降处切开
+        
+        所有句子一次性分批送入嵌入模型，得到的句子向量同时返回，保存后供嵌入阶段
+        直接池化得到 chunk 向量，不必再次计算。
+        
+        Args:
+            content: 文档内容
+            chunk_size: 每个chunk的最大字符数
+            min_chunk_size: 每个chunk的最小字符数，默认为 chunk_size 的四分之一
+            
+        Returns:
+            tuple: (chunk偏移列表, 每个chunk包含的句子下标范围列表, 句子向量数组)
+        """
+        try:
+            if min_chunk_size is None:
+                min_chunk_size = int(chunk_size * SEMANTIC_MIN_CHUNK_RATIO)
+            sentences = [
+                piece
+                for sentence in iter_sentence_spans(iter_text_pieces(content), max_length=chunk_size)
+                for piece in split_span(sentence, chunk_size)
+            ]
+            if not sentences:
+                return [], [], None
+            vectors = np.asarray(
+                self.get_sentence_encoder()([content[start:end] for start, end in sentences]),
+                dtype=np.float32
+            )
+            groups = semantic_groups(
+                sentences, vectors, chunk_size, min_chunk_size, SEMANTIC_BREAKPOINT_PERCENTILE
+            )
+            spans = [(sentences[first][0], sentences[last - 1][1]) for first, last in groups]
+            return spans, groups, vectors
+        except Exception as e:
+            print(f"按语义切分文档时出错: {e}")
+            return [], [], None
+    
+    def get_tokenizer(self):
+        """获取嵌入模型 (bge-small-zh) 的快速分词器，首次调用时加载"""
+        if self.tokenizer is None:
+            self.tokenizer = get_tokenizer()
+        return self.tokenizer
+    
+    def chunk_spans_tokens(self, content, chunk_size=500, chunk_overlap=50):
+        """
+        按嵌入模型的 token 数计算 chunk 偏移
+        
+        全文只分词一次 (分片批量调用快速分词器获取 token 偏移)，之后按句子边界
+        贪心打包，使每个 chunk 的 token 数不超过 chunk_size，且不超过模型的最大输入长度。
+        
+        Args:
+            content: 文档内容
+            chunk_size: 每个chunk的最大token数
+            chunk_overlap: chunk之间的最大重叠token数
+            
+        Returns:
+            tuple: (chunk偏移列表, 每个chunk的token数列表)
+        """
+        try:
+            token_offsets = build_token_offsets(self.get_tokenizer(), content)
+            sentences = iter_sentence_spans(iter_text_pieces(content), max_length=TOKEN_SENTENCE_MAX_CHARS)
+            spans = self.pack_token_spans(sentences, token_offsets, chunk_size, chunk_overlap)
+            return spans, [token_offsets.count(start, end) for start, end in spans]
+        except Exception as e:
+            print(f"按token切分文档时出错: {e}")
+            return [], []
+    
+    def pack_token_spans(self, sentences, token_offsets, chunk_size, chunk_overlap):
+        """
+        按token数把句子打包为chunk
+        
+        Args:
+            sentences: 句子偏移序列
+            token_offsets: 全文的token偏移表
+            chunk_size: 每个chunk的最大token数
+            chunk_overlap: chunk之间的最大重叠token数
+            
+        Returns:
+            list: chunk偏移列表
+        """
+        # 预留 [CLS] 和 [SEP] 两个特殊 token
+        token_budget = min(chunk_size, HF_MAX_LENGTH - 2)
+        return list(pack_spans(
+            sentences,
+            token_budget,
+            min(chunk_overlap, token_budget - 1),
+            measure=token_offsets.count,
+            split=token_offsets.split
+        ))
+    
     def chunk_document_custom(self, content, separator="\n\n"):
         """
         使用自定义分隔符对文档进行切分
@@ -163,15 +343,41 @@ class FileChunkProcessor:
             print(f"使用自定义方法切分文档时出错: {e}")
             return []
     
+    def locate_chunks(self, content, chunks):
+        """
+        计算每个 chunk 在原文中的字符偏移
+        
+        chunk 按顺序出现且可能互相重叠，因此每次从上一个 chunk 的起点之后开始查找。
+        
+        Args:
+            content: 文档全文
+            chunks: 切分得到的文本列表
+            
+        Returns:
+            list: 与 chunks 一一对应的 (start, end) 元组，无法定位的 chunk 为 None
+        """
+        spans = []
+        cursor = 0
+        for chunk in chunks:
+            start = content.find(chunk, cursor)
+            if start < 0:
+                start = content.find(chunk)
+            if start < 0:
+                spans.append(None)
+                continue
+            spans.append((start, start + len(chunk)))
+            cursor = start + 1
+        return spans
+    
     def process_chunk(self, file_id, method, chunk_size=500, chunk_overlap=50, separator="\n\n"):
         """
         处理文件切分
         
         Args:
             file_id: 文件ID
-            method: 切分方法 (langchain, llamaindex, custom)
+            method: 切分方法 (langchain, llamaindex, custom, native, tokens, semantic)
             chunk_size: 块大小
-            chunk_overlap: 块重叠大小
+            chunk_overlap: 块重叠大小 (semantic 方法在语义转换点切开，不使用重叠)
             separator: 自定义切分时的分隔符
             
         Returns:
@@ -194,8 +400,22 @@ class FileChunkProcessor:
             }
         
         # 根据方法选择切分器
+        start_time = time.perf_counter()
         chunks = []
-        if method == "llamaindex":
+        spans = None
+        token_counts = None
+        sentence_ranges = None
+        sentence_vectors = None
+        if method == "native":
+            spans = self.chunk_spans_native(content, chunk_size, chunk_overlap)
+            chunks = [content[start:end] for start, end in spans]
+        elif method == "tokens":
+            spans, token_counts = self.chunk_spans_tokens(content, chunk_size, chunk_overlap)
+            chunks = [content[start:end] for start, end in spans]
+        elif method == "semantic":
+            spans, sentence_ranges, sentence_vectors = self.chunk_spans_semantic(content, chunk_size)
+            chunks = [content[start:end] for start, end in spans]
+        elif method == "llamaindex":
             chunks = self.chunk_document_llama_index(content, chunk_size, chunk_overlap)
         elif method == "langchain":
             chunks = self.chunk_document_langchain(content, chunk_size, chunk_overlap)
@@ -207,6 +427,9 @@ class FileChunkProcessor:
                 "error": f"不支持的切分方法: {method}"
             }
         
+        STAGE_SECONDS.observe(time.perf_counter() - start_time, stage="chunk")
+        STAGE_ITEMS.inc(len(chunks), stage="chunk")
+        
         # 检查切分结果
         if not chunks:
             return {
@@ -215,47 +438,441 @@ class FileChunkProcessor:
             }
         
         # 构建结果数据
+        chunk_data = self.build_chunk_data(chunks, token_counts)
+        if sentence_ranges:
+            # 记录每个chunk包含的句子，嵌入阶段据此池化句子向量
+            for record, sentence_range in zip(chunk_data, sentence_ranges):
+                record["sentence_range"] = list(sentence_range)
+        
+        # 逐条写入结果
+        try:
+            if spans is None:
+                spans = self.locate_chunks(content, chunks)
+            output_path = self.save_chunk_artifact(
+                file_data, source_path, chunk_data, spans, method, chunk_size, chunk_overlap, separator,
+                sentence_vectors=sentence_vectors
+            )
+            
+            return {
+                "success": True,
+                "file_id": file_id,
+                "chunks": chunk_data,
+                "chunk_method": method,
+                "chunk_count": len(chunks),
+                "content_length": len(content),
+                "output_path": output_path
+            }
+        except Exception as e:
+            print(f"保存切分结果时出错: {e}")
+            return {
+                "success": False,
+                "error": f"保存切分结果时出错: {str(e)}"
+            }
+    
+    def build_chunk_data(self, chunks, token_counts=None):
+        """
+        构建返回给前端的chunk列表
+        
+        Args:
+            chunks: 切分后的文本列表
+            token_counts: 每个chunk的token数 (可选)
+            
+        Returns:
+            list: 包含id、content (以及token_count) 的字典列表
+        """
         chunk_data = []
         for i, chunk in enumerate(chunks):
             chunk_data.append({
                 "id": i + 1,
                 "content": chunk
             })
+            # 记录 token 数，便于检查 chunk 是否超出嵌入模型的最大输入长度
+            if token_counts:
+                chunk_data[-1]["token_count"] = token_counts[i]
+        return chunk_data
+    
+    def save_chunk_artifact(self, file_data, source_path, chunk_data, spans, method, chunk_size,
+                            chunk_overlap, separator="\n\n", name_suffix="", sentence_vectors=None):
+        """
+        把切分结果写入chunk产物
         
-        # 更新原始文件数据
-        file_data["chunks"] = chunk_data
-        file_data["chunk_method"] = method
-        file_data["chunk_size"] = chunk_size
-        file_data["chunk_overlap"] = chunk_overlap
+        Args:
+            file_data: load文件的数据
+            source_path: load文件路径
+            chunk_data: build_chunk_data 生成的chunk列表
+            spans: 与chunk_data对应的 (start, end) 偏移，无法定位的为 None
+            method: 切分方法
+            chunk_size: 块大小
+            chunk_overlap: 块重叠大小
+            separator: 自定义切分时的分隔符
+            name_suffix: 输出文件名后缀，同一时刻写入多个产物时用于区分
+            sentence_vectors: 语义切分得到的句子向量，保存为产物旁的 .npy 文件
+            
+        Returns:
+            str: 产物文件路径
+        """
+        content = file_data.get(SOURCE_TEXT_KEY, "")
+        
+        # 头记录元数据：原始文件数据 (不含全文) 和切分参数
+        # 全文只保存在 load 产物中，chunk 记录通过 source_path + 偏移引用
+        chunk_meta = {k: v for k, v in file_data.items() if k != SOURCE_TEXT_KEY}
+        chunk_meta["source_path"] = source_path
+        chunk_meta["source_length"] = len(content)
+        chunk_meta["chunk_method"] = method
+        chunk_meta["chunk_size"] = chunk_size
+        chunk_meta["chunk_overlap"] = chunk_overlap
         if method == "custom":
-            file_data["chunk_separator"] = separator
+            chunk_meta["chunk_separator"] = separator
+        if method == "tokens":
+            chunk_meta["chunk_tokenizer"] = HF_MODEL_NAME
+        chunk_meta["切分时间"] = datetime.datetime.now().isoformat()
         
         # 构建输出文件名
         filename = os.path.basename(source_path)
         base_name, _ = os.path.splitext(filename)
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        output_filename = f"{base_name}_chunked_{timestamp}.json"
+        output_filename = f"{base_name}_chunked_{timestamp}{name_suffix}{ARTIFACT_EXTENSION}"
         output_path = os.path.join(self.chunk_folder, output_filename)
         
-        # 保存结果
+        if sentence_vectors is not None:
+            # 句子向量先于产物写入，产物出现时旁路文件一定已经存在
+            vectors_path = f"{output_path}{SENTENCE_VECTORS_SUFFIX}"
+            np.save(vectors_path, sentence_vectors)
+            chunk_meta["sentence_vectors_path"] = vectors_path
+            chunk_meta["sentence_vectors_model"] = HF_MODEL_NAME
+        
+        # 先写临时文件再原子重命名，并发写入时其他读取方不会看到写了一半的产物
+        with ArtifactWriter(output_path, "chunk", chunk_meta, atomic=True) as writer:
+            for record, span in zip(chunk_data, spans):
+                if span is None:
+                    # 切分器改写过文本 (无法在原文中定位)，只能内联保存
+                    writer.write(record)
+                else:
+                    offset_record = {"id": record["id"], "start": span[0], "end": span[1]}
+                    offset_record.update((k, v) for k, v in record.items() if k not in ("id", "content"))
+                    writer.write(offset_record)
+        return output_path
+    
+    def get_load_file_ids(self):
+        """
+        获取load文件夹中所有文件的ID
+        
+        Returns:
+            list: 按文件名排序的文件ID列表
+        """
+        file_ids = []
+        for filename in sorted(os.listdir(self.load_folder)):
+            base_name, ext = os.path.splitext(filename)
+            if ext == ".json":
+                file_ids.append(base_name)
+        return file_ids
+    
+    def chunk_file_summary(self, file_id, method, chunk_size=500, chunk_overlap=50, separator="\n\n"):
+        """
+        切分单个文件并返回不含chunk内容的摘要，供批量切分使用
+        
+        Args:
+            file_id: 文件ID
+            method: 切分方法
+            chunk_size: 块大小
+            chunk_overlap: 块重叠大小
+            separator: 自定义切分时的分隔符
+            
+        Returns:
+            dict: 处理结果摘要 (不含 chunks)
+        """
+        start_time = time.time()
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(file_data, f, ensure_ascii=False, indent=2)
+            result = self.process_chunk(file_id, method, chunk_size, chunk_overlap, separator)
+        except Exception as e:
+            print(f"切分文件 {file_id} 时出错: {e}")
+            result = {"success": False, "error": f"切分文件时出错: {str(e)}"}
+        result.pop("chunks", None)
+        result["file_id"] = file_id
+        result["elapsed_seconds"] = round(time.time() - start_time, 3)
+        return result
+    
+    def process_chunk_batch(self, file_ids, method, chunk_size=500, chunk_overlap=50, separator="\n\n",
+                            max_workers=None):
+        """
+        使用进程池批量切分多个文件
+        
+        所有文件共用同一组切分参数；每个子进程创建一次切分处理器并处理多个文件，
+        产物由子进程直接写入 (临时文件 + 原子重命名)，只把结果摘要传回主进程。
+        子进程使用 spawn 方式启动，避免在多线程的 Web 服务进程中 fork。
+        
+        Args:
+            file_ids: 文件ID列表，为 None 时处理load文件夹中的所有文件
+            method: 切分方法
+            chunk_size: 块大小
+            chunk_overlap: 块重叠大小
+            separator: 自定义切分时的分隔符
+            max_workers: 最大进程数，默认为 CHUNK_BATCH_WORKERS
             
+        Returns:
+            dict: 每个文件的处理结果和整体吞吐量
+        """
+        if method not in CHUNK_METHODS:
             return {
-                "success": True,
-                "file_id": file_id,
-                "chunks": chunk_data,
-                "chunk_method": method,
-                "chunk_count": len(chunks),
-                "output_path": output_path
+                "success": False,
+                "error": f"不支持的切分方法: {method}"
             }
-        except Exception as e:
-            print(f"保存切分结果时出错: {e}")
+        
+        if file_ids is None:
+            file_ids = self.get_load_file_ids()
+        # 去重并保持顺序
+        file_ids = list(dict.fromkeys(file_ids))
+        if not file_ids:
             return {
                 "success": False,
-                "error": f"保存切分结果时出错: {str(e)}"
+                "error": "没有需要切分的文件"
             }
+        
+        workers = max(1, min(max_workers or CHUNK_BATCH_WORKERS, len(file_ids)))
+        start_time = time.time()
+        results = {}
+        args = (method, chunk_size, chunk_overlap, separator)
+        
+        if workers == 1:
+            # 单进程时直接在当前进程处理，省去启动子进程的开销
+            for file_id in file_ids:
+                results[file_id] = self.chunk_file_summary(file_id, *args)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_batch_worker,
+                initargs=(self.load_folder, self.chunk_folder)
+            ) as executor:
+                futures = {executor.submit(_run_batch_chunk, file_id, *args): file_id for file_id in file_ids}
+                for future in as_completed(futures):
+                    file_id = futures[future]
+                    try:
+                        results[file_id] = future.result()
+                    except Exception as e:
+                        # 子进程异常退出等情况
+                        print(f"切分文件 {file_id} 时子进程出错: {e}")
+                        results[file_id] = {"success": False, "file_id": file_id, "error": str(e)}
+        
+        elapsed = time.time() - start_time
+        ordered = [results[file_id] for file_id in file_ids]
+        succeeded = [result for result in ordered if result["success"]]
+        total_chars = sum(result.get("content_length", 0) for result in succeeded)
+        
+        summary = {
+            "success": len(succeeded) > 0,
+            "chunk_method": method,
+            "file_count": len(file_ids),
+            "succeeded_count": len(succeeded),
+            "failed_count": len(file_ids) - len(succeeded),
+            "total_chunk_count": sum(result["chunk_count"] for result in succeeded),
+            "total_characters": total_chars,
+            "workers": workers,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(len(file_ids) / elapsed, 2) if elapsed > 0 else None,
+            "characters_per_second": round(total_chars / elapsed, 1) if elapsed > 0 else None,
+            "results": ordered
+        }
+        if not succeeded:
+            summary["error"] = "所有文件切分均失败"
+        return summary
+    
+    def build_sweep_configs(self, configs=None, grid=None):
+        """
+        规范化参数扫描的配置列表
+        
+        Args:
+            configs: 配置列表，每项包含 method、chunkSize、chunkOverlap (可选 separator)
+            grid: 参数网格 {"methods": [...], "chunkSizes": [...], "chunkOverlaps": [...]}，
+                  展开为笛卡尔积，与 configs 二选一
+            
+        Returns:
+            list: 规范化后的配置字典列表
+        """
+        if grid:
+            configs = [
+                {"method": method, "chunkSize": size, "chunkOverlap": overlap}
+                for method in grid.get("methods", ["native"])
+                for size in grid.get("chunkSizes", [500])
+                for overlap in grid.get("chunkOverlaps", [50])
+            ]
+        if not configs:
+            raise ValueError("未提供扫描配置 (configs 或 grid)")
+        if len(configs) > MAX_SWEEP_CONFIGS:
+            raise ValueError(f"扫描配置过多: {len(configs)} (最多 {MAX_SWEEP_CONFIGS} 个)")
+        
+        normalized = []
+        for config in configs:
+            method = config.get("method", "native")
+            if method not in CHUNK_METHODS:
+                raise ValueError(f"不支持的切分方法: {method}")
+            chunk_size = int(config.get("chunkSize", 500))
+            chunk_overlap = int(config.get("chunkOverlap", 50))
+            if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+                raise ValueError(f"无效的切分参数: chunkSize={chunk_size}, chunkOverlap={chunk_overlap}")
+            normalized.append({
+                "method": method,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "separator": config.get("separator", "\n\n")
+            })
+        return normalized
+    
+    def chunk_length_stats(self, lengths, chunk_size, token_counts=None, bins=10):
+        """
+        计算chunk长度统计和直方图
+        
+        Args:
+            lengths: 每个chunk的字符数
+            chunk_size: 配置的块大小，用于确定直方图范围
+            token_counts: 每个chunk的token数，为 None 时不计算token溢出率
+            bins: 直方图分箱数
+            
+        Returns:
+            dict: chunk数量、长度统计、长度直方图和token溢出率
+        """
+        if not lengths:
+            return {"chunk_count": 0}
+        
+        upper = max(chunk_size, max(lengths))
+        bin_width = max(1, -(-upper // bins))
+        counts = [0] * bins
+        for length in lengths:
+            counts[min(length // bin_width, bins - 1)] += 1
+        
+        stats = {
+            "chunk_count": len(lengths),
+            "min_length": min(lengths),
+            "max_length": max(lengths),
+            "mean_length": round(sum(lengths) / len(lengths), 2),
+            "length_histogram": {
+                "bin_edges": [i * bin_width for i in range(bins + 1)],
+                "counts": counts
+            },
+            "token_overflow_rate": None
+        }
+        if token_counts:
+            # 超过模型输入上限 (去掉 [CLS]/[SEP]) 的 chunk 在嵌入时会被截断
+            overflow = sum(1 for count in token_counts if count > HF_MAX_LENGTH - 2)
+            stats["token_overflow_rate"] = round(overflow / len(token_counts), 4)
+            stats["max_tokens"] = max(token_counts)
+            stats["mean_tokens"] = round(sum(token_counts) / len(token_counts), 2)
+        return stats
+    
+    def sweep_chunk_configs(self, file_id, configs, save_indices=()):
+        """
+        对同一文件批量评估多组切分参数
+        
+        文件只读取一次，句子边界和 token 偏移也只计算一次；native 和 tokens 方法的
+        每组参数都直接在共享的句子边界上打包，其他方法仍需各自运行切分器。
+        默认只返回统计信息，只有 save_indices 中的配置才写入完整的chunk产物。
+        
+        Args:
+            file_id: 文件ID
+            configs: build_sweep_configs 返回的配置列表
+            save_indices: 需要写入产物的配置下标
+            
+        Returns:
+            dict: 包含每组配置统计结果的字典
+        """
+        start_time = time.time()
+        file_data, source_path = self.get_file_content(file_id)
+        if not file_data:
+            return {
+                "success": False,
+                "error": f"未找到ID为 {file_id} 的文件"
+            }
+        content = file_data.get(SOURCE_TEXT_KEY, "")
+        if not content:
+            return {
+                "success": False,
+                "error": "文件内容为空"
+            }
+        
+        # 共享切分：句子边界只计算一次；超长句子按 native 配置中最小的 chunk_size 切开，
+        # 各配置打包时再按自己的 chunk_size 合并或切分
+        max_length = min(
+            [config["chunk_size"] for config in configs if config["method"] == "native"] + [TOKEN_SENTENCE_MAX_CHARS]
+        )
+        sentences = list(iter_sentence_spans(iter_text_pieces(content), max_length=max_length))
+        
+        # 共享分词：全文只分词一次，用于 tokens 方法和所有配置的 token 溢出率
+        token_offsets = None
+        token_error = None
+        try:
+            token_offsets = build_token_offsets(self.get_tokenizer(), content)
+        except Exception as e:
+            token_error = str(e)
+            print(f"加载分词器失败，跳过token统计: {e}")
+        
+        save_indices = set(save_indices or [])
+        results = []
+        for index, config in enumerate(configs):
+            method = config["method"]
+            chunk_size = config["chunk_size"]
+            chunk_overlap = config["chunk_overlap"]
+            entry = {
+                "index": index,
+                "method": method,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "shared_segmentation": method in ("native", "tokens")
+            }
+            
+            try:
+                sentence_ranges = None
+                sentence_vectors = None
+                if method == "native":
+                    spans = list(pack_spans(sentences, chunk_size, chunk_overlap))
+                    chunks = [content[s:e] for s, e in spans]
+                elif method == "tokens":
+                    if token_offsets is None:
+                        raise ValueError(f"分词器不可用: {token_error}")
+                    spans = self.pack_token_spans(sentences, token_offsets, chunk_size, chunk_overlap)
+                    chunks = [content[s:e] for s, e in spans]
+                elif method == "semantic":
+                    spans, sentence_ranges, sentence_vectors = self.chunk_spans_semantic(content, chunk_size)
+                    chunks = [content[s:e] for s, e in spans]
+                else:
+                    if method == "llamaindex":
+                        chunks = self.chunk_document_llama_index(content, chunk_size, chunk_overlap)
+                    elif method == "langchain":
+                        chunks = self.chunk_document_langchain(content, chunk_size, chunk_overlap)
+                    else:
+                        chunks = self.chunk_document_custom(content, config["separator"])
+                    spans = self.locate_chunks(content, chunks)
+                
+                token_counts = None
+                if token_offsets is not None:
+                    token_counts = [token_offsets.count(*span) for span in spans if span is not None]
+                entry.update(self.chunk_length_stats([len(chunk) for chunk in chunks], chunk_size, token_counts))
+                
+                if index in save_indices and chunks:
+                    chunk_data = self.build_chunk_data(
+                        chunks, token_counts if method == "tokens" else None
+                    )
+                    if sentence_ranges:
+                        for record, sentence_range in zip(chunk_data, sentence_ranges):
+                            record["sentence_range"] = list(sentence_range)
+                    entry["output_path"] = self.save_chunk_artifact(
+                        file_data, source_path, chunk_data, spans, method, chunk_size, chunk_overlap,
+                        config["separator"], name_suffix=f"_{method}_{chunk_size}_{chunk_overlap}",
+                        sentence_vectors=sentence_vectors
+                    )
+            except Exception as e:
+                print(f"扫描配置 {index} 时出错: {e}")
+                entry["error"] = str(e)
+            results.append(entry)
+        
+        return {
+            "success": True,
+            "file_id": file_id,
+            "content_length": len(content),
+            "sentence_count": len(sentences),
+            "token_count": len(token_offsets) if token_offsets is not None else None,
+            "results": results,
+            "elapsed_seconds": round(time.time() - start_time, 3)
+        }
     
     def get_chunked_files(self):
         """
@@ -274,19 +891,18 @@ class FileChunkProcessor:
             
             # 遍历目录中的所有文件
             for filename in os.listdir(self.chunk_folder):
-                if filename.endswith('.json'):
+                if is_artifact_file(filename):
                     file_path = os.path.join(self.chunk_folder, filename)
                     
                     try:
-                        # 读取文件以获取元数据
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            file_data = json.load(f)
+                        # 只读取头记录和尾记录获取元数据，不解析所有 chunk
+                        file_data = read_meta(file_path)
                         
                         # 获取文件信息
-                        file_id = os.path.splitext(filename)[0]
+                        file_id = artifact_id(filename)
                         original_filename = file_data.get("文件名称", "未知")
                         chunk_method = file_data.get("chunk_method", "未知")
-                        chunk_count = len(file_data.get("chunks", []))
+                        chunk_count = count_records(file_path)
                         created_time = file_data.get("切分时间", 
                                                   datetime.datetime.fromtimestamp(
                                                       os.path.getctime(file_path)
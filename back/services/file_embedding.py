@@ -7,13 +7,13 @@ import json
 import time
 import datetime
 import logging
-from typing import List, Dict, Any, Optional, Union, Tuple
+import threading
+from typing import List, Dict, Any, Iterator, Optional, Union, Tuple
 
 # OpenAI API
 import openai
 
 # HuggingFace Transformers
-from transformers import AutoTokenizer, AutoModel
 import torch
 import numpy as np
 
@@ -21,17 +21,103 @@ import numpy as np
 from dotenv import load_dotenv
 load_dotenv()
 
+from services.artifact_io import (
+    ARTIFACT_EXTENSION, ArtifactWriter, artifact_id, count_records, is_artifact_file,
+    iter_materialized, load_artifact, read_meta, strip_materialized
+)
+from services.chunk_dedup import DEFAULT_MAX_DISTANCE, ChunkDeduplicator
+from services.logger import ProgressReporter
+from services.metrics import STAGE_ITEMS, STAGE_SECONDS
+from services.model_cache import HF_MODEL_NAME, get_model, get_tokenizer
+
+# 去重索引旁路文件的后缀，与嵌入产物放在同一目录：保存该产物中代表 chunk 的 SimHash 指纹和向量
+DEDUP_INDEX_SUFFIX = ".simhash.npz"
+
+# 已读取的去重索引 (不含向量)：路径 -> (修改时间, 索引)，文件未变化时不重复读取
+_dedup_index_cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+_dedup_index_lock = threading.Lock()
+
+
+def dedup_index_path(embedding_path: str) -> str:
+    """嵌入产物对应的去重索引文件路径"""
+    return embedding_path[:-len(ARTIFACT_EXTENSION)] + DEDUP_INDEX_SUFFIX
+
+
+def save_dedup_index(path: str, model_name: str, dim: int, chunk_ids: List[Any], fingerprints: List[int],
+                     vectors: List[np.ndarray]):
+    """
+    保存嵌入产物的去重索引 (先写临时文件再重命名)
+
+    Args:
+        path: 索引文件路径
+        model_name: 嵌入模型名称，只有同一模型的向量才能复用
+        dim: 向量维度
+        chunk_ids: 代表 chunk ID
+        fingerprints: 代表的 SimHash 指纹
+        vectors: 代表的嵌入向量
+    """
+    dim = int(dim or 0)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.savez(
+            f,
+            model=np.array(model_name),
+            dim=np.array(dim),
+            chunk_ids=np.array(json.dumps(chunk_ids)),
+            fingerprints=np.array(fingerprints, dtype=np.uint64),
+            vectors=np.asarray(vectors, dtype=np.float32).reshape(len(vectors), dim)
+        )
+    os.replace(temp_path, path)
+
+
+def read_dedup_index(path: str) -> Optional[Dict[str, Any]]:
+    """
+    读取去重索引的模型、代表 ID 和指纹 (向量在命中时才读取)
+
+    Args:
+        path: 索引文件路径
+
+    Returns:
+        Optional[Dict]: 包含 model、chunk_ids、fingerprints、dim 的字典，读取失败时返回 None
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with _dedup_index_lock:
+            cached = _dedup_index_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with np.load(path) as data:
+            index = {
+                "model": str(data["model"]),
+                "chunk_ids": json.loads(str(data["chunk_ids"])),
+                "fingerprints": data["fingerprints"],
+                "dim": int(data["dim"])
+            }
+        with _dedup_index_lock:
+            _dedup_index_cache[path] = (mtime, index)
+        return index
+    except (OSError, ValueError, KeyError) as e:
+        logging.warning(f"读取去重索引 {path} 时出错: {e}")
+        return None
+
+
 class EmbeddingClass:
     """向量嵌入处理类，支持多种嵌入模型"""
     
-    def __init__(self, model_type: str = "huggingface"):
+    # 进度日志的记录器，未注入时使用模块日志记录器
+    logger = logging.getLogger(__name__)
+    
+    def __init__(self, model_type: str = "huggingface", logger=None):
         """
         初始化向量嵌入处理器
         
         Args:
             model_type: 模型类型，可选值: "huggingface", "openai"
+            logger: 输出进度日志的记录器 (setup_logger 返回的服务日志记录器)
         """
         self.model_type = model_type
+        if logger is not None:
+            self.logger = logger
         self.chunk_folder = os.path.join('files', 'chunk')
         self.embedding_folder = os.path.join('files', 'embedding')
         self.model_folder = os.path.join('files', 'embedding_models')
@@ -57,26 +143,9 @@ class EmbeddingClass:
     def _init_huggingface_model(self):
         """初始化 HuggingFace 模型""" 
         try:
-            model_name = "BAAI/bge-small-zh-v1.5"
-            model_path = os.path.join(self.model_folder, model_name)
-            
-            # 如果本地模型目录不存在，则从HuggingFace下载并保存
-            if not os.path.exists(model_path):
-                logging.info(f"从HuggingFace下载模型到: {model_path}")
-                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-                self.model = AutoModel.from_pretrained(model_name)
-                
-                # 保存模型和tokenizer到本地
-                self.tokenizer.save_pretrained(model_path)
-                self.model.save_pretrained(model_path)
-                logging.info(f"模型已保存到: {model_path}")
-            else:
-                logging.info(f"从本地加载模型: {model_path}")
-                self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-                self.model = AutoModel.from_pretrained(model_path)
-            
-            self.model.to(self.device)
-            self.model.eval()  # 设置为评估模式
+            # 分词器和模型在进程内共享 (切分阶段的语义切分也使用同一份模型)，本地不存在时自动下载
+            self.tokenizer = get_tokenizer(HF_MODEL_NAME, self.model_folder)
+            self.model = get_model(HF_MODEL_NAME, self.model_folder, self.device)
             self.embedding_dim = self.model.config.hidden_size # Store embedding dimension
             logging.info(f"成功加载模型到设备: {self.device}, 维度: {self.embedding_dim}")
         except Exception as e:
@@ -184,6 +253,9 @@ class EmbeddingClass:
                 raise ValueError(f"不支持的模型类型: {self.model_type}")
             
             processing_time = time.time() - start_time
+            # 每个 chunk 调用一次模型，记录一次
+            STAGE_SECONDS.observe(processing_time, stage="embed")
+            STAGE_ITEMS.inc(stage="embed")
             
             return {
                 "embedding": embedding,
@@ -199,141 +271,308 @@ class EmbeddingClass:
             logging.error(f"获取嵌入向量时出错: {e}")
             raise
     
-    def load_chunks(self, chunk_file_id: str) -> Optional[Dict[str, Any]]:
+    def find_chunk_file(self, chunk_file_id: str) -> Optional[str]:
         """
-        从 chunk 文件夹加载完整的 chunk JSON 数据
+        在 chunk 文件夹中查找 chunk 文件 ID 对应的产物文件
 
         Args:
             chunk_file_id: chunk 文件 ID (不含扩展名)
 
         Returns:
-            Optional[Dict]: 包含完整 chunk 数据的字典，如果找不到文件则返回 None
+            Optional[str]: 产物文件路径，找不到时返回 None
         """
-        # 查找匹配的 .json 文件
-        target_filename = f"{chunk_file_id}.json"
-        potential_files = [f for f in os.listdir(self.chunk_folder) if f.endswith('.json')]
+        potential_files = [f for f in os.listdir(self.chunk_folder) if is_artifact_file(f)]
         
-        found_path = None
         for filename in potential_files:
             # 精确匹配或基于前缀匹配 (去除可能的_chunked_timestamp后缀)
             base_name = filename.split('_chunked_')[0]
-            if filename == target_filename or base_name == chunk_file_id:
+            if artifact_id(filename) == chunk_file_id or base_name == chunk_file_id:
                 found_path = os.path.join(self.chunk_folder, filename)
                 logging.info(f"找到 chunk 文件: {found_path}")
-                break
-        
+                return found_path
+
+        logging.warning(f"未找到 ID 对应的 chunk 文件: {chunk_file_id}")
+        return None
+
+    def load_chunks(self, chunk_file_id: str) -> Optional[Tuple[Iterator[Dict[str, Any]], Dict[str, Any]]]:
+        """
+        打开 chunk 产物，返回逐条读取 chunk 的生成器和元数据
+
+        Args:
+            chunk_file_id: chunk 文件 ID (不含扩展名)
+
+        Returns:
+            Optional[Tuple]: (chunk 生成器, 元数据)，如果找不到文件则返回 None
+        """
+        found_path = self.find_chunk_file(chunk_file_id)
         if not found_path:
-             # 如果精确/前缀匹配失败，尝试只用ID查找 (假设chunk_file_id可能包含后缀)
-            for filename in potential_files:
-                 if filename.split('.')[0] == chunk_file_id:
-                    found_path = os.path.join(self.chunk_folder, filename)
-                    logging.info(f"通过ID找到 chunk 文件: {found_path}")
-                    break
+            return None
+        meta = read_meta(found_path)
+        return iter_materialized(found_path, meta), meta
 
-        if found_path and os.path.exists(found_path):
-            try:
-                with open(found_path, 'r', encoding='utf-8') as f:
-                    chunk_data = json.load(f)
-                    return chunk_data
-            except Exception as e:
-                logging.error(f"读取 chunk 文件 {found_path} 时出错: {e}")
-                raise # Reraise after logging
-        else:
-            logging.warning(f"未找到 ID 对应的 chunk 文件: {chunk_file_id}")
+    def load_sentence_vectors(self, chunk_meta: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        加载语义切分阶段保存的句子向量
+
+        只有句子向量与当前嵌入模型一致时才能复用；以内存映射方式打开，按需读取。
+
+        Args:
+            chunk_meta: chunk 产物的元数据
+
+        Returns:
+            Optional[np.ndarray]: 句子向量数组，不可复用时返回 None
+        """
+        vectors_path = chunk_meta.get("sentence_vectors_path")
+        if (self.model_type != "huggingface" or not vectors_path
+                or chunk_meta.get("sentence_vectors_model") != HF_MODEL_NAME):
+            return None
+        if not os.path.exists(vectors_path):
+            logging.warning(f"句子向量文件不存在，将重新计算嵌入: {vectors_path}")
             return None
+        return np.load(vectors_path, mmap_mode="r")
 
-    def process_embeddings(self, chunk_file_id: str) -> Dict[str, Any]:
+    def load_corpus_dedup_index(self, deduplicator: ChunkDeduplicator, model_name: str, exclude: str) -> int:
+        """
+        把嵌入目录中其他产物的代表 chunk 加入去重器，实现跨文档去重
+
+        只加入同一模型、同一维度且对应的嵌入产物仍然存在的索引。
+
+        Args:
+            deduplicator: 去重器
+            model_name: 当前使用的嵌入模型名称
+            exclude: 不加入的索引文件路径 (当前产物自己的旧索引)
+
+        Returns:
+            int: 加入的产物数
+        """
+        loaded = 0
+        for filename in os.listdir(self.embedding_folder):
+            if not filename.endswith(DEDUP_INDEX_SUFFIX):
+                continue
+            path = os.path.join(self.embedding_folder, filename)
+            source = filename[:-len(DEDUP_INDEX_SUFFIX)] + ARTIFACT_EXTENSION
+            if os.path.abspath(path) == os.path.abspath(exclude) or not os.path.exists(
+                    os.path.join(self.embedding_folder, source)):
+                continue
+            index = read_dedup_index(path)
+            if index is None or index["model"] != model_name or index["dim"] != self.embedding_dim:
+                continue
+            deduplicator.add_existing(source, index["chunk_ids"], index["fingerprints"])
+            loaded += 1
+        return loaded
+
+    def corpus_vector(self, source: str, chunk_id: Any, cache: Dict[str, Dict[Any, np.ndarray]]) -> Optional[List[float]]:
+        """
+        读取其他产物中代表 chunk 的向量
+
+        Args:
+            source: 代表所在的嵌入产物名
+            chunk_id: 代表 chunk ID
+            cache: 本次处理中已读取的 {产物名: {chunk ID: 向量}}
+
+        Returns:
+            Optional[List[float]]: 向量，索引已被删除或损坏时返回 None
+        """
+        vectors = cache.get(source)
+        if vectors is None:
+            path = os.path.join(self.embedding_folder, source[:-len(ARTIFACT_EXTENSION)] + DEDUP_INDEX_SUFFIX)
+            try:
+                with np.load(path) as data:
+                    chunk_ids = json.loads(str(data["chunk_ids"]))
+                    vectors = dict(zip(chunk_ids, data["vectors"]))
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"读取去重索引 {path} 中的向量时出错: {e}")
+                vectors = {}
+            cache[source] = vectors
+        vector = vectors.get(chunk_id)
+        return vector.tolist() if vector is not None else None
+
+    def process_embeddings(
+        self,
+        chunk_file_id: str,
+        include_data: bool = True,
+        dedup: bool = False,
+        dedup_max_distance: int = DEFAULT_MAX_DISTANCE
+    ) -> Dict[str, Any]:
         """
         处理 chunk 文件并生成嵌入向量, 将结果保存到 embedding 文件夹下的新文件中。
-        新文件将保留原始 chunk 文件的结构，并在每个 chunk 中添加嵌入向量，
-        同时在顶层添加嵌入元数据。
+        chunk 逐条读取、嵌入并追加写入 embedding 产物，内存占用只与单个 chunk 相关；
+        头记录保留原始 chunk 文件的元数据，尾记录补充嵌入耗时等统计信息。
+        语义切分得到的 chunk 直接对切分时保存的句子向量取平均，不再调用模型。
+        开启去重时，近似重复的 chunk 不再嵌入，只记录 duplicate_of (所属簇的代表 chunk ID)，
+        入库时复用代表的向量；簇映射和节省的计算量写入尾记录。去重同时查找嵌入目录中其他产物
+        (同样开启去重生成) 的代表：与其重复的 chunk 记录 duplicate_source 并直接复制代表已保存的向量；
+        本文件新的代表的指纹和向量保存到去重索引 (DEDUP_INDEX_SUFFIX)，供之后的文档使用。
 
         Args:
-            chunk_file_id: chunk 文件 ID (通常不包含 .json 后缀)
+            chunk_file_id: chunk 文件 ID (通常不包含扩展名)
+            include_data: 是否在返回结果中附带完整数据 (供前端展示)
+            dedup: 是否跳过近似重复 chunk 的嵌入
+            dedup_max_distance: 判定为近似重复的最大 SimHash 汉明距离
 
         Returns:
             Dict: 包含处理结果的字典
         """
         try:
-            # 加载完整的 chunk 数据
-            chunk_data = self.load_chunks(chunk_file_id)
-
-            if not chunk_data:
+            chunk_path = self.find_chunk_file(chunk_file_id)
+            if not chunk_path:
                 return {
                     "success": False,
                     "error": f"未找到 ID 为 {chunk_file_id} 的 chunk 文件"
                 }
             
-            chunks = chunk_data.get("chunks")
-            if not chunks or not isinstance(chunks, list):
+            total_chunk_count = count_records(chunk_path)
+            if total_chunk_count == 0:
                  return {
                     "success": False,
-                    "error": f"Chunk 文件 {chunk_file_id} 中未找到有效的 'chunks' 列表"
+                    "error": f"Chunk 文件 {chunk_file_id} 中未找到有效的 chunks"
                 }
 
             # 定义嵌入向量的输出文件名和路径
             # 使用原始 chunk_file_id 确保一致性
-            output_filename = f"{chunk_file_id}_embedded.json"
+            output_filename = f"{chunk_file_id}_embedded{ARTIFACT_EXTENSION}"
             output_filepath = os.path.join(self.embedding_folder, output_filename)
-
-            start_time = time.time()
-            processed_chunk_count = 0
-
-            # 为每个 chunk 添加嵌入向量 (直接修改 chunk_data)
-            for idx, chunk in enumerate(chunks):
-                # 从 "content" 字段获取文本 (根据你的示例 JSON)
-                chunk_text = chunk.get("content", "") 
-                if not chunk_text:
-                    logging.warning(f"跳过空的 chunk: index={idx} in {chunk_file_id}")
-                    continue
-
-                logging.info(f"正在处理 chunk {idx+1}/{len(chunks)} for {chunk_file_id}")
-
-                try:
-                    # 获取嵌入向量和元数据
-                    embedding_result = self.get_embedding(chunk_text)
-                    
-                    # 将嵌入向量添加到 chunk 字典中
-                    chunk["embedding"] = embedding_result["embedding"]
-                    # 可选：如果需要，也可以添加单个 chunk 的嵌入元数据
-                    # chunk["embedding_metadata"] = embedding_result["metadata"]
-                    processed_chunk_count += 1
-                except Exception as embed_error:
-                    logging.error(f"为 chunk {idx+1} 生成嵌入时出错 (ID: {chunk_file_id}): {embed_error}")
-                    # 决定是否跳过此 chunk 或中止整个过程
-                    # 这里选择跳过
-                    chunk["embedding"] = None # Mark as failed
-                    chunk["embedding_error"] = str(embed_error)
-                    continue 
-
-            # 计算总处理时间
-            total_time = time.time() - start_time
             model_name_used = "BAAI/bge-small-zh-v1.5" if self.model_type == "huggingface" else "text-embedding-3-small"
 
-            # 在顶层添加嵌入元数据 (直接修改 chunk_data)
-            chunk_data["embedding_metadata"] = {
+            # 头记录：原始 chunk 元数据 (含 source_path) + 写入前即可确定的嵌入元数据
+            chunk_meta = read_meta(chunk_path)
+            embedding_meta = dict(chunk_meta)
+            embedding_meta["embedding_metadata"] = {
                  "chunk_file_id": chunk_file_id, # Add original chunk file id
                  "embedding_model_type": self.model_type,
                  "embedding_model_name": model_name_used,
-                 "embedding_model_dim": self.embedding_dim, # Add embedding dimension
-                 "processed_chunk_count": processed_chunk_count,
-                 "total_chunk_count": len(chunks),
-                 "embedding_time_seconds": round(total_time, 2),
-                 "embedding_timestamp": datetime.datetime.now().isoformat()
-             }
+                 "embedding_model_dim": self.embedding_dim # Add embedding dimension
+            }
+
+            start_time = time.time()
+            processed_chunk_count = 0
+            deduplicator = None
+            index_path = dedup_index_path(output_filepath)
+            corpus_artifact_count = 0
+            if dedup:
+                deduplicator = ChunkDeduplicator(dedup_max_distance)
+                corpus_artifact_count = self.load_corpus_dedup_index(deduplicator, model_name_used, index_path)
+            # 本文件中新的代表: (chunk ID, float32 向量)，写入去重索引
+            representatives = []
+            corpus_vectors = {}
+            sentence_vectors = self.load_sentence_vectors(chunk_meta)
+            pooled_chunk_count = 0
+            skipped_characters = 0
+            # 进度按时间间隔汇总输出，不再每个 chunk 写一条日志
+            progress = ProgressReporter(self.logger, f"嵌入 {chunk_file_id}", total_chunk_count)
+
+            # 先写入临时文件，写完尾记录后再重命名：中途失败时不会留下被列表和入库读取的残缺产物
+            with ArtifactWriter(output_filepath, "embedding", embedding_meta, atomic=True) as writer:
+                # 逐条读取 chunk (按偏移还原文本)，添加嵌入向量后立即写出
+                for idx, chunk in enumerate(iter_materialized(chunk_path, chunk_meta)):
+                    progress.update()
+                    # 从 "content" 字段获取文本 (根据你的示例 JSON)
+                    chunk_text = chunk.get("content", "") 
+                    if not chunk_text:
+                        logging.warning(f"跳过空的 chunk: index={idx} in {chunk_file_id}")
+                        writer.write(strip_materialized(chunk))
+                        continue
+
+                    chunk_id = chunk.get("id", idx + 1)
+                    if deduplicator is not None:
+                        # 其他产物的代表只有在其向量能读取时才算重复：读取失败时该 chunk 照常嵌入并成为新的代表，
+                        # 不计入去重统计
+                        representative = deduplicator.add(
+                            chunk_id, chunk_text,
+                            accept_external=lambda rep: self.corpus_vector(rep[0], rep[1], corpus_vectors) is not None
+                        )
+                        if representative is not None and deduplicator.is_external(representative):
+                            # 与其他产物中的代表重复：直接复制代表已保存的向量
+                            source, representative_id = representative
+                            chunk["duplicate_of"] = representative_id
+                            chunk["duplicate_source"] = source
+                            chunk["embedding"] = self.corpus_vector(source, representative_id, corpus_vectors)
+                            skipped_characters += len(chunk_text)
+                            writer.write(strip_materialized(chunk))
+                            continue
+                        elif representative is not None:
+                            # 近似重复：不嵌入，入库时复用代表 chunk 的向量
+                            chunk["duplicate_of"] = representative
+                            skipped_characters += len(chunk_text)
+                            writer.write(strip_materialized(chunk))
+                            continue
+
+                    if sentence_vectors is not None and "sentence_range" in chunk:
+                        # 复用语义切分时计算的句子向量，平均池化得到 chunk 向量
+                        first, last = chunk["sentence_range"]
+                        chunk["embedding"] = np.asarray(sentence_vectors[first:last]).mean(axis=0).tolist()
+                        processed_chunk_count += 1
+                        pooled_chunk_count += 1
+                        if deduplicator is not None and deduplicator.fingerprint(chunk_id) is not None:
+                            representatives.append((chunk_id, np.asarray(chunk["embedding"], dtype=np.float32)))
+                        writer.write(strip_materialized(chunk))
+                        continue
+
+                    try:
+                        # 获取嵌入向量和元数据
+                        embedding_result = self.get_embedding(chunk_text)
+                        
+                        # 将嵌入向量添加到 chunk 字典中
+                        chunk["embedding"] = embedding_result["embedding"]
+                        processed_chunk_count += 1
+                        if deduplicator is not None and deduplicator.fingerprint(chunk_id) is not None:
+                            representatives.append((chunk_id, np.asarray(chunk["embedding"], dtype=np.float32)))
+                    except Exception as embed_error:
+                        logging.error(f"为 chunk {idx+1} 生成嵌入时出错 (ID: {chunk_file_id}): {embed_error}")
+                        # 决定是否跳过此 chunk 或中止整个过程
+                        # 这里选择跳过
+                        chunk["embedding"] = None # Mark as failed
+                        chunk["embedding_error"] = str(embed_error)
+                    # 有偏移的 chunk 不再重复保存文本
+                    writer.write(strip_materialized(chunk))
 
-            # 保存修改后的完整数据结构到指定文件
-            with open(output_filepath, 'w', encoding='utf-8') as f:
-                json.dump(chunk_data, f, ensure_ascii=False, indent=2)
+                # 计算总处理时间
+                total_time = time.time() - start_time
+                progress.close()
+
+                # 尾记录：写入完成后才能确定的嵌入元数据
+                footer_metadata = {
+                    "processed_chunk_count": processed_chunk_count,
+                    "total_chunk_count": total_chunk_count,
+                    "pooled_chunk_count": pooled_chunk_count,
+                    "embedding_time_seconds": round(total_time, 2),
+                    "embedding_timestamp": datetime.datetime.now().isoformat()
+                }
+                if deduplicator is not None:
+                    dedup_stats = deduplicator.stats()
+                    # 按已嵌入 chunk 的平均耗时估算跳过的嵌入节省的时间
+                    seconds_per_chunk = total_time / processed_chunk_count if processed_chunk_count else 0.0
+                    dedup_stats["embeddings_saved"] = dedup_stats["duplicate_chunk_count"]
+                    dedup_stats["characters_saved"] = skipped_characters
+                    dedup_stats["estimated_seconds_saved"] = round(seconds_per_chunk * dedup_stats["embeddings_saved"], 2)
+                    dedup_stats["corpus_artifact_count"] = corpus_artifact_count
+                    footer_metadata["dedup"] = dedup_stats
+                writer.close({"embedding_metadata": footer_metadata})
+
+            if deduplicator is not None:
+                # 产物写完后再保存索引：其他文档只会引用已经完整保存的向量
+                representatives = [(chunk_id, vector) for chunk_id, vector in representatives
+                                   if len(vector) == self.embedding_dim]
+                save_dedup_index(
+                    index_path, model_name_used, self.embedding_dim,
+                    [chunk_id for chunk_id, _ in representatives],
+                    [deduplicator.fingerprint(chunk_id) for chunk_id, _ in representatives],
+                    [vector for _, vector in representatives]
+                )
 
             logging.info(f"嵌入结果已保存到: {output_filepath}")
 
-            return {
+            result = {
                 "success": True,
-                "message": f"成功处理 {processed_chunk_count}/{len(chunks)} 个 chunks 并生成嵌入向量",
-                "embedding_file": output_filepath, 
-                "data": chunk_data # Return the full data including embeddings
+                "message": f"成功处理 {processed_chunk_count}/{total_chunk_count} 个 chunks 并生成嵌入向量",
+                "embedding_file": output_filepath
             }
+            if deduplicator is not None:
+                result["dedup"] = footer_metadata["dedup"]
+                result["message"] += f"，跳过 {deduplicator.duplicate_count} 个近似重复的 chunks"
+            if include_data:
+                result["data"] = load_artifact(output_filepath) # Return the full data including embeddings
+            return result
 
         except Exception as e:
             logging.error(f"处理嵌入向量时出错 (chunk_file_id: {chunk_file_id}): {e}", exc_info=True)
@@ -342,95 +581,89 @@ class EmbeddingClass:
                 "error": f"处理嵌入向量时发生意外错误: {str(e)}"
             }
 
+    def find_embedding_file(self, embedding_file_id: str) -> Optional[str]:
+        """
+        查找嵌入向量文件，兼容完整文件名、不带扩展名的 ID 以及旧的 .json 文件
+
+        Args:
+            embedding_file_id: 嵌入文件名或 ID
+
+        Returns:
+            Optional[str]: 文件路径，找不到时返回 None
+        """
+        name_part = artifact_id(embedding_file_id) if is_artifact_file(embedding_file_id) else embedding_file_id
+        if not name_part.endswith("_embedded"):
+            name_part = f"{name_part}_embedded"
+
+        candidates = [
+            embedding_file_id,
+            f"{name_part}{ARTIFACT_EXTENSION}",
+            f"{name_part}.json"
+        ]
+        for filename in candidates:
+            filepath = os.path.join(self.embedding_folder, filename)
+            if os.path.isfile(filepath):
+                return filepath
+
+        logging.warning(f"未找到嵌入向量文件: {embedding_file_id}")
+        return None
+
     def get_embedding_stats(self, embedding_file_id: str) -> Dict[str, Any]:
         """
         获取指定嵌入向量文件的统计信息
         
         Args:
-            embedding_file_id: 嵌入文件 ID (this is expected to be the full filename.json 
+            embedding_file_id: 嵌入文件 ID (this is expected to be the full filename 
                                from the frontend, obtained from /api/vector/stats)
 
         Returns:
             Dict: 包含统计信息的字典
         """
+        embedding_filepath = None
         try:
-            # embedding_file_id is the full filename like "some_file_embedded.json"
-            # as passed from the frontend.
-            embedding_filename = embedding_file_id 
-            embedding_filepath = os.path.join(self.embedding_folder, embedding_filename)
-
-            if not os.path.exists(embedding_filepath):
-                logging.warning(f"Requested embedding file not found directly: {embedding_filepath}")
-                # Simple fallback: if embedding_file_id was a base ID without "_embedded.json"
-                # (e.g., "mychunkfile" instead of "mychunkfile_embedded.json")
-                # This scenario is less likely given the current frontend flow but can be a safeguard.
-                
-                # Attempt to construct the expected pattern if the direct name failed.
-                # Remove .json if it exists, then add _embedded.json
-                name_part = embedding_file_id
-                if name_part.endswith(".json"): # Remove .json suffix if present
-                    name_part = name_part[:-5]
-                
-                # If it already ends with _embedded, then the direct check should have worked or file is missing.
-                # If not, try adding _embedded.json
-                if not name_part.endswith("_embedded"):
-                    fallback_filename = f"{name_part}_embedded.json"
-                    fallback_filepath = os.path.join(self.embedding_folder, fallback_filename)
-                    if os.path.exists(fallback_filepath):
-                        embedding_filename = fallback_filename
-                        embedding_filepath = fallback_filepath
-                        logging.info(f"Found embedding file using fallback construction: {embedding_filename}")
-                    else:
-                        logging.warning(f"Fallback construction also failed to find: {fallback_filepath}")
-                        return {
-                            "exists": False,
-                            "message": f"嵌入向量文件 {embedding_file_id} (或推测的 {fallback_filename}) 不存在"
-                        }
-                else: # It ended with _embedded (after stripping .json) but wasn't found directly.
-                    return {
-                        "exists": False,
-                        "message": f"嵌入向量文件 {embedding_file_id} (应为 {embedding_filename}) 不存在"
-                    }
+            embedding_filepath = self.find_embedding_file(embedding_file_id)
+            if not embedding_filepath:
+                return {
+                    "exists": False,
+                    "message": f"嵌入向量文件 {embedding_file_id} 不存在"
+                }
             
-            # If we are here, embedding_filepath is valid
             logging.info(f"Accessing embedding file: {embedding_filepath}")
 
-            with open(embedding_filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+            meta = read_meta(embedding_filepath)
             # Get metadata added during embedding
-            embedding_metadata = data.get("embedding_metadata", {})
-            # Get original chunking metadata if present (all top-level keys except chunks and embedding_metadata)
-            original_metadata = {k: v for k, v in data.items() if k not in ["chunks", "embedding_metadata"]}
+            embedding_metadata = meta.get("embedding_metadata", {})
 
-            chunks = data.get("chunks", [])
-            
             # Calculate stats
-            total_chunk_count = len(chunks)
+            total_chunk_count = count_records(embedding_filepath)
             processed_chunk_count = embedding_metadata.get("processed_chunk_count", total_chunk_count)
             embedding_dimensions = 0
             example_chunk_content = ""
             example_vector = []
-            # Find the first successfully embedded chunk for example
-            first_successful_chunk = next((chunk for chunk in chunks if chunk.get("embedding") is not None), None)
+            # Find the first successfully embedded chunk for example (stops reading at the first hit)
+            first_chunk = None
+            first_successful_chunk = None
+            for chunk in iter_materialized(embedding_filepath):
+                if first_chunk is None:
+                    first_chunk = chunk
+                if chunk.get("embedding") is not None:
+                    first_successful_chunk = chunk
+                    break
 
             if first_successful_chunk:
                  embedding_dimensions = len(first_successful_chunk["embedding"])
                  example_vector = first_successful_chunk["embedding"] # Get first valid chunk's embedding
                  example_chunk_content = first_successful_chunk.get("content", "") # Get first valid chunk's content
-            elif chunks: # If no successful chunks, but chunks exist, try getting dimension from metadata
-                 embedding_dimensions = embedding_metadata.get("dimension", 0) # Might not be present
-                 example_chunk_content = chunks[0].get("content", "(无成功嵌入的块)")
+            elif first_chunk: # If no successful chunks, but chunks exist, try getting dimension from metadata
+                 embedding_dimensions = embedding_metadata.get("embedding_model_dim", 0) or 0
+                 example_chunk_content = first_chunk.get("content", "(无成功嵌入的块)")
             
             model_used = embedding_metadata.get("embedding_model_name", embedding_metadata.get("embedding_model_type", "未知"))
 
-            # Combine metadata for easier access on frontend
-            full_metadata = {**original_metadata, **embedding_metadata}
-
             return {
                 "exists": True,
                 "filepath": embedding_filepath,
-                "data": data, # Return the full loaded data
+                "data": load_artifact(embedding_filepath), # Return the full loaded data
                 # Keep existing stats for convenience if needed, but primary data is in 'data'
                 "stats": { 
                     "total_chunk_count": total_chunk_count,
@@ -452,4 +685,4 @@ class EmbeddingClass:
             return {
                 "exists": False,
                 "error": str(e)
-            } 
\ No newline at end of file
+            }
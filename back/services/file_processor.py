@@ -3,18 +3,120 @@
 """
 import os
 import json
+import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 from unstructured.partition.auto import partition
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from services.partition_cache import HashingWriter, PartitionCache, hash_file
+from services.fast_extractors import ExtractionLimitError, get_fast_extractor
+from services.partition_sandbox import PartitionError, PartitionSandbox
+from services.metrics import STAGE_ITEMS, time_stage
+from services.listing_cache import notify_artifact_written
+from services.upload_stream import UploadSink
+from services.archive_ingest import (
+    ArchiveDeadline, ArchiveError, ARCHIVE_TIMEOUT_SECONDS, ARCHIVE_WORKERS, extract_member, member_filename, scan_archive
+)
+from services.pdf_partition import (
+    estimate_seconds_saved, is_pdf, partition_pdf_plan, pdf_strategy_key, plan_pdf_strategy,
+    should_partition_in_parallel, PDF_TEXT_STRATEGY
+)
+
+# unstructured 的解析策略
+PARTITION_STRATEGY = 'auto'
+
+
+def partition_strategy_key(upload_path):
+    """
+    解析缓存键中的策略部分：PDF 为预扫描选择策略所用的设置，其他文件为 PARTITION_STRATEGY
+
+    Args:
+        upload_path: 上传文件路径
+
+    Returns:
+        str: 策略描述
+    """
+    return pdf_strategy_key() if is_pdf(upload_path) else PARTITION_STRATEGY
+
+
+def partition_file(upload_path, max_pdf_workers=None):
+    """
+    解析文件，返回各元素的文本 (模块级函数，可在沙箱工作进程中执行)
+
+    PDF 先预扫描文本层：有文本层的页面使用 fast 策略，只有纯图片页面使用 hi_res (OCR)，
+    混合文档按页范围分别选择策略；页数达到阈值时按页范围在进程池中并行解析后按页序合并。
+    其他文件直接在当前进程中解析。
+
+    Args:
+        upload_path: 上传文件路径
+        max_pdf_workers: PDF 分页并行解析的进程数，默认为 PDF_PARTITION_WORKERS
+
+    Returns:
+        tuple: (元素文本列表, PDF 的解析策略信息；其他文件为 None)
+    """
+    if is_pdf(upload_path):
+        try:
+            plan_info = plan_pdf_strategy(upload_path)
+        except Exception as e:
+            # 页面无法读取时交给 unstructured 自行处理
+            print(f"PDF文本层预扫描失败 {upload_path}: {e}")
+            plan_info = None
+        if plan_info and plan_info["page_count"]:
+            return partition_pdf(upload_path, plan_info, max_pdf_workers)
+
+    elements = partition(filename=upload_path, strategy=PARTITION_STRATEGY)
+    return [str(el) for el in elements], None
+
+
+def partition_pdf(upload_path, plan_info, max_pdf_workers=None):
+    """
+    按预扫描得到的页范围计划解析 PDF
+
+    Args:
+        upload_path: PDF 文件路径
+        plan_info: plan_pdf_strategy 的扫描结果
+        max_pdf_workers: 分页并行解析的进程数，默认为 PDF_PARTITION_WORKERS
+
+    Returns:
+        tuple: (元素文本列表, 解析策略信息)
+    """
+    plan = plan_info["plan"]
+    page_count = plan_info["page_count"]
+    start_time = datetime.datetime.now()
+    parallel = should_partition_in_parallel(page_count, max_workers=max_pdf_workers)
+    if len(plan) == 1 and not parallel:
+        # 整份文档使用同一策略且页数不多：直接解析，不拆分
+        strategy = plan[0][2]
+        texts = [str(el) for el in partition(filename=upload_path, strategy=strategy)]
+        seconds_by_strategy = {strategy: (datetime.datetime.now() - start_time).total_seconds()}
+    else:
+        max_workers = (max_pdf_workers or None) if parallel else 1
+        print(f"PDF共 {page_count} 页，按 {len(plan)} 个页范围解析 (策略: {plan_info['strategy']}): {upload_path}")
+        texts, seconds_by_strategy = partition_pdf_plan(upload_path, plan, max_workers=max_workers)
+
+    strategy_info = {key: value for key, value in plan_info.items() if key != "plan"}
+    strategy_info["page_ranges"] = [
+        {"start_page": start + 1, "end_page": end, "strategy": strategy} for start, end, strategy in plan
+    ]
+    strategy_info["partition_seconds"] = round((datetime.datetime.now() - start_time).total_seconds(), 3)
+    strategy_info["estimated_seconds_saved"] = estimate_seconds_saved(
+        plan_info["text_page_count"], seconds_by_strategy.get(PDF_TEXT_STRATEGY, 0.0)
+    )
+    return texts, strategy_info
+
+
 class FileProcessor:
-    def __init__(self, upload_folder, load_folder):
+    def __init__(self, upload_folder, load_folder, partition_cache=None, partition_sandbox=None):
         """
         初始化文件处理器
         
         Args:
             upload_folder: 上传文件存储目录
             load_folder: 处理后文件存储目录
+            partition_cache: 解析结果缓存，默认在 load 目录旁的 partition_cache 目录中创建
+            partition_sandbox: 解析沙箱 (PartitionSandbox)，为 None 时在当前进程中解析
         """
         self.upload_folder = upload_folder
         self.load_folder = load_folder
@@ -22,6 +124,12 @@ class FileProcessor:
         # 确保目录存在
         os.makedirs(self.upload_folder, exist_ok=True)
         os.makedirs(self.load_folder, exist_ok=True)
+        
+        # 相同内容的文件重复上传时复用解析结果
+        if partition_cache is None:
+            partition_cache = PartitionCache(os.path.join(os.path.dirname(self.load_folder), 'partition_cache'))
+        self.partition_cache = partition_cache
+        self.partition_sandbox = partition_sandbox
     
     def allowed_file(self, filename, allowed_extensions):
         """
@@ -36,20 +144,17 @@ class FileProcessor:
         """
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
     
-    def save_upload_file(self, file, file_type):
+    def build_file_info(self, original_filename, file_type):
         """
-        保存上传的文件，保留原始文件名（包括非ASCII字符），并在扩展名前添加时间戳。
+        为上传文件生成保存路径，保留原始文件名（包括非ASCII字符），并在扩展名前添加时间戳。
         
         Args:
-            file: 上传的文件对象
+            original_filename: 用户上传时的原始文件名
             file_type: 文件类型 (来自前端选择)
             
         Returns:
-            dict: 包含文件名和路径信息的字典
+            dict: 包含文件名和路径信息的字典 (不含内容哈希)
         """
-        # 直接获取原始文件名
-        original_filename = file.filename
-
         # 检查原始文件名是否为空或包含路径分隔符 (基础安全检查)
         if not original_filename or '/' in original_filename or '\\' in original_filename or '..' in original_filename:
             raise ValueError(f"检测到不安全或无效的文件名: {original_filename}")
@@ -66,10 +171,6 @@ class FileProcessor:
         # 构建上传路径
         upload_path = os.path.join(self.upload_folder, timestamped_filename)
         
-        # 如果需要处理重名文件，可以在这里添加逻辑
-        # 当前实现会覆盖同名文件 (虽然时间戳基本保证了唯一性)
-        file.save(upload_path)
-        
         # 构建处理后 JSON 文件的路径 (也带时间戳，使用原始基本名称)
         load_filename = f"{filename_base}_{timestamp}.json"
         load_path = os.path.join(self.load_folder, load_filename)
@@ -83,44 +184,161 @@ class FileProcessor:
             "file_type": file_type
         }
     
-    def process_file(self, file_info):
+    def save_upload_file(self, file, file_type):
+        """
+        保存上传的文件，保留原始文件名（包括非ASCII字符），并在扩展名前添加时间戳。
+        
+        Args:
+            file: 上传的文件对象
+            file_type: 文件类型 (来自前端选择)
+            
+        Returns:
+            dict: 包含文件名、路径信息和内容哈希的字典
+        """
+        file_info = self.build_file_info(file.filename, file_type)
+        upload_path = file_info["upload_path"]
+        
+        # 如果需要处理重名文件，可以在这里添加逻辑
+        # 当前实现会覆盖同名文件 (虽然时间戳基本保证了唯一性)
+        if isinstance(file, FileStorage) and isinstance(file.stream, UploadSink):
+            # 解析请求体时已直接写入上传目录并计算了哈希，只需重命名
+            content_hash = file.stream.finalize(upload_path)
+        elif isinstance(file, FileStorage):
+            # 流式写入磁盘的同时计算内容哈希，用于查找解析缓存
+            with open(upload_path, 'wb') as f_out:
+                writer = HashingWriter(f_out)
+                file.save(writer)
+            content_hash = writer.hexdigest()
+        else:
+            file.save(upload_path)
+            content_hash = hash_file(upload_path)
+        
+        file_info["content_hash"] = content_hash
+        return file_info
+    
+    def process_file(self, file_info, max_pdf_workers=None, before_write=None):
         """
-        使用 unstructured 处理文件并保存结果为 JSON
+        提取文件内容并保存结果为 JSON
+        
+        txt/md/xlsx/docx/pptx 优先使用快速提取器，失败或其他格式时使用 unstructured 解析；
+        内容哈希相同的文件 (按相同策略设置、相同 unstructured 版本) 已解析过时直接复用缓存结果。
         
         Args:
             file_info: 文件信息字典，包含上传路径和输出路径
+            max_pdf_workers: PDF 分页并行解析的进程数，默认为 PDF_PARTITION_WORKERS
+            before_write: 可选的回调，写入 load 文件前调用，返回 False 时不写入
             
         Returns:
             dict: 包含处理结果的字典
+            
+        Raises:
+            PartitionError: 解析失败，或 before_write 返回 False (error_type 为 timeout)
         """
         upload_path = file_info["upload_path"]
         load_path = file_info["load_path"]
         
         try:
-            # 使用 unstructured 处理文件
-            elements = partition(filename=upload_path, strategy='auto')
-            processed_content = "\n\n".join([str(el) for el in elements])
+            content_hash = file_info.get("content_hash") or hash_file(upload_path)
+            cache_hit = False
+            parser = "fast"
+            strategy_info = None
+            
+            # 快速提取本身很快，不经过解析缓存
+            processed_content = self.extract_fast(upload_path)
+            if processed_content is None:
+                parser = "unstructured"
+                strategy_key = partition_strategy_key(upload_path)
+                if content_hash:
+                    processed_content, strategy_info = self.partition_cache.get(
+                        content_hash, strategy_key, with_meta=True
+                    )
+                cache_hit = processed_content is not None
+            
+            if processed_content is None:
+                # 使用 unstructured 处理文件
+                texts, strategy_info = self.partition_document(upload_path, max_pdf_workers)
+                processed_content = "\n\n".join(texts)
+                if content_hash:
+                    self.partition_cache.put(content_hash, strategy_key, processed_content, meta=strategy_info)
             
             # 创建JSON数据结构
             json_data = {
                 "文件名称": file_info["filename"], # 使用带时间戳的文件名
                 "文件读取内容": processed_content,
-                "文件读取方式": file_info["file_type"] # 记录前端选择的类型
+                "文件读取方式": file_info["file_type"], # 记录前端选择的类型
+                "文件哈希": content_hash,
+                "解析器": parser
             }
+            if strategy_info is not None:
+                json_data["解析策略"] = strategy_info
+            
+            if before_write is not None and not before_write():
+                raise PartitionError("timeout", "解析完成时已超过时限，结果未保存")
             
             # 保存处理结果为JSON格式
             with open(load_path, 'w', encoding='utf-8') as f_out:
                 json.dump(json_data, f_out, ensure_ascii=False, indent=2)
+            notify_artifact_written(load_path)
             
             return {
                 "processed_content": processed_content,
-                "content_length": len(processed_content)
+                "content_length": len(processed_content),
+                "cache_hit": cache_hit,
+                "parser": parser,
+                "strategy_info": strategy_info
             }
         except Exception as e:
             # 在这里可以添加更详细的日志记录
             print(f"Error processing file {upload_path}: {e}")
             raise # 重新抛出异常，让上层处理 
     
+    def extract_fast(self, upload_path):
+        """
+        使用格式专用的快速提取器提取文本
+        
+        Args:
+            upload_path: 上传文件路径
+            
+        Returns:
+            str: 提取的文本；没有快速提取器或提取失败时返回 None，由 unstructured 处理
+            
+        Raises:
+            PartitionError: 文件解压后超出大小上限 (不再交给 unstructured 解析)
+        """
+        extractor = get_fast_extractor(upload_path)
+        if extractor is None:
+            return None
+        try:
+            with time_stage("extract"):
+                return "\n\n".join(extractor(upload_path))
+        except ExtractionLimitError as e:
+            raise PartitionError("limit", str(e))
+        except Exception as e:
+            print(f"快速提取 {upload_path} 失败，改用 unstructured 解析: {e}")
+            return None
+    
+    def partition_document(self, upload_path, max_pdf_workers=None):
+        """
+        使用 unstructured 解析文件
+        
+        配置了解析沙箱时在沙箱工作进程中解析 (有超时和内存上限)，否则在当前进程中解析。
+        
+        Args:
+            upload_path: 上传文件路径
+            max_pdf_workers: PDF 分页并行解析的进程数，默认为 PDF_PARTITION_WORKERS
+            
+        Returns:
+            tuple: (元素文本列表, PDF 的解析策略信息；其他文件为 None)
+            
+        Raises:
+            PartitionError: 沙箱中解析超时、超出内存或失败
+        """
+        STAGE_ITEMS.inc(stage="partition")
+        with time_stage("partition"):
+            if self.partition_sandbox is not None:
+                return self.partition_sandbox.run(partition_file, upload_path, max_pdf_workers)
+            return partition_file(upload_path, max_pdf_workers)
+    
     def handle_upload_request(self, file, file_type, allowed_extensions, logger=None):
         """
         完整处理上传的文件请求，包括验证、保存和内容处理
@@ -157,7 +375,27 @@ class FileProcessor:
             if logger:
                 logger.info(f"开始处理文件: {file.filename}, 类型: {file_type}")
             file_info = self.save_upload_file(file, file_type)
+        except Exception as e:
+            # 记录错误日志
+            if logger:
+                logger.error(f"处理文件 {file.filename if file else 'unknown'} 时出错: {str(e)}", exc_info=True)
+            return {"success": False, "error": f"处理文件失败: {str(e)}"}, 500
+        
+        return self.process_saved_file(file_info, logger)
+    
+    def process_saved_file(self, file_info, logger=None):
+        """
+        处理已保存到上传目录的文件：提取内容、保存 load 文件并生成响应
+        
+        Args:
+            file_info: build_file_info / save_upload_file 生成的文件信息 (包含内容哈希)
+            logger: 可选的日志记录器
             
+        Returns:
+            tuple: (响应字典, HTTP 状态码)
+        """
+        file_type = file_info["file_type"]
+        try:
             # 处理文件
             if logger:
                 logger.info(f"文件已保存到: {file_info['upload_path']}, 开始提取内容")
@@ -165,7 +403,7 @@ class FileProcessor:
             
             processed_content = result["processed_content"]
             if logger:
-                logger.info(f"内容提取完成，长度: {result['content_length']} 字符")
+                logger.info(f"内容提取完成 ({result['parser']})，长度: {result['content_length']} 字符, 解析缓存{'命中' if result['cache_hit'] else '未命中'}")
                 logger.info(f"处理结果已保存到: {file_info['load_path']}")
             
             # 返回成功结果
@@ -179,18 +417,212 @@ class FileProcessor:
                     "filename": file_info['filename'],
                     "upload_path": file_info['upload_path'],
                     "processed_file_path": file_info['load_path'],
+                    "partition_cache_hit": result['cache_hit'],
+                    "parser": result['parser'],
                     "content_preview": processed_content[:500] + ('... (截断)' if len(processed_content) > 500 else '')
                 }
             }
             
             return result_payload, 200
         
+        except PartitionError as e:
+            # 解析超时、超出内存或失败：文件本身有问题，返回结构化错误，API 进程不受影响
+            if logger:
+                logger.warning(f"解析文件 {file_info['filename']} 失败 ({e.error_type}): {e.message}")
+            return e.to_dict(), 422
         except Exception as e:
             # 记录错误日志
             if logger:
-                logger.error(f"处理文件 {file.filename if file else 'unknown'} 时出错: {str(e)}", exc_info=True)
+                logger.error(f"处理文件 {file_info['filename']} 时出错: {str(e)}", exc_info=True)
             return {"success": False, "error": f"处理文件失败: {str(e)}"}, 500
     
+    def process_archive_member(self, archive_path, member_name, deadline=None):
+        """
+        解压并解析压缩包中的一个成员，生成该成员的 load 文件
+        
+        Args:
+            archive_path: 压缩包路径
+            member_name: 成员路径
+            deadline: 可选的 ArchiveDeadline，时限已到时不再写入 load 文件，并删除已解压的成员
+            
+        Returns:
+            dict: 成员的处理摘要
+        """
+        start_time = time.time()
+        filename = member_filename(member_name)
+        file_info = None
+        try:
+            if deadline is not None and deadline.expired:
+                raise PartitionError("timeout", "压缩包解析已超过时限")
+            file_info = self.build_file_info(filename, os.path.splitext(filename)[1].lstrip('.').lower())
+            file_info["content_hash"] = extract_member(archive_path, member_name, file_info["upload_path"])
+            # 成员之间已经并行，PDF 不再分页并行，避免进程数成倍增加
+            result = self.process_file(
+                file_info, max_pdf_workers=1,
+                before_write=None if deadline is None else lambda: deadline.claim(member_name)
+            )
+            return {
+                "success": True,
+                "member": member_name,
+                "filename": file_info["filename"],
+                "processed_file_path": file_info["load_path"],
+                "content_length": result["content_length"],
+                "parser": result["parser"],
+                "partition_cache_hit": result["cache_hit"],
+                "elapsed_seconds": round(time.time() - start_time, 3)
+            }
+        except PartitionError as e:
+            if deadline is not None and deadline.expired and file_info and os.path.exists(file_info["upload_path"]):
+                # 已报告为超时的成员不留下解压出的文件
+                os.remove(file_info["upload_path"])
+            return {"success": False, "member": member_name, "error": e.message, "error_type": e.error_type}
+        except Exception as e:
+            print(f"处理压缩包成员 {member_name} 时出错: {e}")
+            return {"success": False, "member": member_name, "error": str(e)}
+    
+    def process_archive(self, archive_path, allowed_extensions, max_workers=None, timeout=None):
+        """
+        并行解析压缩包中所有允许的成员
+        
+        成员在处理时才逐个解压，不预先展开整个压缩包；成员数和解压总大小超出限制时不解压任何成员。
+        unstructured 解析经过解析沙箱 (有超时和内存上限)；处理器未配置沙箱时为本次调用创建一个临时沙箱。
+        超过 timeout 秒仍未完成的成员记为超时失败，这些成员之后解析完成时也不再写入 load 文件。
+        
+        Args:
+            archive_path: 压缩包路径
+            allowed_extensions: 允许的扩展名集合
+            max_workers: 同时解析的成员数，默认为 ARCHIVE_WORKERS
+            timeout: 整个压缩包的解析时限 (秒)，默认为 ARCHIVE_TIMEOUT_SECONDS
+            
+        Returns:
+            dict: 每个成员的处理结果、跳过的成员和整体吞吐量
+            
+        Raises:
+            ArchiveError: 压缩包无效或超出限制
+        """
+        members, skipped = scan_archive(archive_path, allowed_extensions)
+        if not members:
+            raise ArchiveError("压缩包中没有可解析的文件")
+        
+        workers = max(1, min(max_workers or ARCHIVE_WORKERS, len(members)))
+        start_time = time.time()
+        results = {}
+        
+        timeout = ARCHIVE_TIMEOUT_SECONDS if timeout is None else timeout
+        
+        processor = self
+        if self.partition_sandbox is None:
+            processor = FileProcessor(
+                self.upload_folder, self.load_folder, self.partition_cache, PartitionSandbox(max_workers=workers)
+            )
+        # 线程只负责解压和调度，解析在沙箱工作进程中执行，并发数同时受沙箱的工作进程数限制
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="archive")
+        deadline = ArchiveDeadline()
+        try:
+            futures = {
+                executor.submit(processor.process_archive_member, archive_path, info.filename, deadline): info.filename
+                for info in members
+            }
+            done, not_done = wait(futures, timeout=timeout)
+            if not_done:
+                # 到时限后未登记的成员不再写入；已登记的成员正在写 load 文件，等它们写完并采用其结果
+                claimed = deadline.expire()
+                finishing = [future for future in not_done if futures[future] in claimed]
+                wait(finishing)
+                done, not_done = done | set(finishing), not_done - set(finishing)
+            for future in done:
+                results[futures[future]] = future.result()
+            for future in not_done:
+                member_name = futures[future]
+                results[member_name] = {
+                    "success": False,
+                    "member": member_name,
+                    "error": f"压缩包解析超过 {timeout:.0f} 秒，该成员未完成",
+                    "error_type": "timeout"
+                }
+        finally:
+            # 未开始的成员直接取消；已在沙箱中解析的成员由沙箱自身的超时终止
+            executor.shutdown(wait=False, cancel_futures=True)
+            if processor is not self:
+                processor.partition_sandbox.close()
+        
+        elapsed = time.time() - start_time
+        ordered = [results[info.filename] for info in members]
+        succeeded = [result for result in ordered if result["success"]]
+        total_bytes = sum(info.file_size for info in members)
+        
+        return {
+            "member_count": len(members),
+            "succeeded_count": len(succeeded),
+            "failed_count": len(members) - len(succeeded),
+            "skipped_count": len(skipped),
+            "total_uncompressed_bytes": total_bytes,
+            "total_characters": sum(result["content_length"] for result in succeeded),
+            "workers": workers,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(len(members) / elapsed, 2) if elapsed > 0 else None,
+            "megabytes_per_second": round(total_bytes / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+            "results": ordered,
+            "failures": [result for result in ordered if not result["success"]],
+            "skipped": skipped
+        }
+    
+    def handle_archive_upload(self, file, allowed_extensions, logger=None, max_workers=None):
+        """
+        处理 zip 压缩包上传：保存压缩包，并行解析其中允许的成员，返回每个压缩包的汇总
+        
+        Args:
+            file: 上传的压缩包文件对象
+            allowed_extensions: 成员允许的扩展名集合
+            logger: 可选的日志记录器
+            max_workers: 最大进程数
+            
+        Returns:
+            tuple: (响应字典, HTTP 状态码)
+        """
+        archive_info = None
+        try:
+            archive_info = self.save_upload_file(file, "zip")
+            if logger:
+                logger.info(f"压缩包已保存到: {archive_info['upload_path']}, 开始解析成员")
+            summary = self.process_archive(archive_info["upload_path"], allowed_extensions, max_workers)
+        except ArchiveError as e:
+            if logger:
+                logger.warning(f"压缩包 {file.filename} 被拒绝: {e.message}")
+            return {"success": False, "error": e.message}, e.status
+        except Exception as e:
+            if logger:
+                logger.error(f"处理压缩包 {file.filename} 时出错: {str(e)}", exc_info=True)
+            return {"success": False, "error": f"处理压缩包失败: {str(e)}"}, 500
+        finally:
+            # 成员已解压到上传目录，压缩包本身不再保留
+            if archive_info and os.path.exists(archive_info["upload_path"]):
+                os.remove(archive_info["upload_path"])
+        
+        if logger:
+            logger.info(
+                f"压缩包 {file.filename} 处理完成: 成功 {summary['succeeded_count']}, 失败 {summary['failed_count']}, "
+                f"跳过 {summary['skipped_count']}, 耗时 {summary['elapsed_seconds']} 秒 ({summary['files_per_second']} 文件/秒)"
+            )
+        preview = "\n".join(
+            f"{'✓' if result['success'] else '✗'} {result['member']}" + ("" if result['success'] else f": {result['error']}")
+            for result in summary["results"]
+        )
+        return {
+            "success": summary["succeeded_count"] > 0,
+            "message": f"压缩包 '{file.filename}' 处理完毕: {summary['succeeded_count']}/{summary['member_count']} 个文件成功。",
+            "data": {
+                "processed": True,
+                "timestamp": datetime.datetime.now().isoformat(),
+                "original_filename": file.filename,
+                "filename": archive_info["filename"],
+                "upload_path": self.upload_folder,
+                "processed_file_path": self.load_folder,
+                "content_preview": preview[:500] + ('... (截断)' if len(preview) > 500 else ''),
+                "archive": summary
+            }
+        }, 200 if summary["succeeded_count"] else 422
+    
     def get_loaded_files(self):
         """
         获取load文件夹下的所有文件列表
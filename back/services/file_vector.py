@@ -2,11 +2,18 @@ import os
 import json
 import logging
 import datetime
+import threading
 from typing import Dict, Any, List, Optional
 
 # Milvus Lite imports
 from pymilvus import connections, utility, Collection, CollectionSchema, FieldSchema, DataType
 
+from services.metrics import STAGE_ITEMS, time_stage
+from services.artifact_io import artifact_id, count_records, is_artifact_file, iter_materialized, iter_records, read_meta
+
+# Serializes collection/index creation: concurrent store workers usually target the same collection
+_DDL_LOCK = threading.Lock()
+
 class VectorFileProcessor:
     """
     Service for managing and retrieving statistics about vector embedding files
@@ -19,22 +26,31 @@ class VectorFileProcessor:
         os.makedirs(self.db_folder, exist_ok=True) # Ensure db folder exists
         self.logger = logging.getLogger(__name__)
         self.milvus_lite_uri = os.path.join(self.db_folder, "milvus_lite.db")
+        self.insert_batch_size = 1000 # Rows per Milvus insert call when streaming an embedding file
+
+    def _connect_milvus_lite(self) -> str:
+        """
+        Establishes a connection to Milvus Lite and returns its alias.
 
-    def _connect_milvus_lite(self):
-        """Establishes connection to Milvus Lite."""
+        Each thread gets its own alias, so concurrent store workers (pipeline store stage,
+        parallel /api/vector/store requests) do not connect and disconnect a shared
+        "default" connection underneath each other.
+        """
+        alias = f"store-{threading.get_ident()}"
         try:
-            self.logger.info(f"Attempting to connect to Milvus Lite at: {self.milvus_lite_uri}")
-            connections.connect(alias="default", uri=self.milvus_lite_uri)
+            self.logger.info(f"Attempting to connect to Milvus Lite at: {self.milvus_lite_uri} (alias {alias})")
+            connections.connect(alias=alias, uri=self.milvus_lite_uri)
             self.logger.info("Successfully connected to Milvus Lite.")
+            return alias
         except Exception as e:
             self.logger.error(f"Failed to connect to Milvus Lite: {e}", exc_info=True)
             raise
 
-    def _disconnect_milvus_lite(self):
-        """Disconnects from Milvus Lite if connected."""
+    def _disconnect_milvus_lite(self, alias: str):
+        """Disconnects the given alias from Milvus Lite if connected."""
         try:
-            if "default" in connections.list_connections():
-                connections.disconnect(alias="default")
+            if alias in connections.list_connections():
+                connections.disconnect(alias=alias)
                 self.logger.info("Successfully disconnected from Milvus Lite.")
         except Exception as e:
             self.logger.error(f"Error disconnecting from Milvus Lite: {e}", exc_info=True)
@@ -58,11 +74,11 @@ class VectorFileProcessor:
 
         try:
             for filename in os.listdir(self.embedding_folder):
-                if filename.endswith(".json"):
+                if is_artifact_file(filename):
                     filepath = os.path.join(self.embedding_folder, filename)
                     try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            file_data = json.load(f)
+                        # Only the header and footer records are read, never the vectors
+                        file_data = read_meta(filepath)
                         
                         metadata = file_data.get("embedding_metadata", {})
                         
@@ -70,10 +86,9 @@ class VectorFileProcessor:
                         original_file_id = metadata.get("chunk_file_id")
                         if not original_file_id:
                              # Attempt to derive from filename if chunk_file_id is missing
-                            if filename.endswith("_embedded.json"):
-                                original_file_id = filename[:-len("_embedded.json")]
-                            else:
-                                original_file_id = filename[:-len(".json")]
+                            original_file_id = artifact_id(filename)
+                            if original_file_id.endswith("_embedded"):
+                                original_file_id = original_file_id[:-len("_embedded")]
 
 
                         file_stat = {
@@ -120,6 +135,13 @@ class VectorFileProcessor:
                 "files": []
             }
 
+    def _insert_batch(self, collection: Collection, batch: List[Dict[str, Any]]) -> int:
+        """Insert one batch into the collection and record its latency; returns the inserted count."""
+        with time_stage("milvus_insert"):
+            inserted = len(collection.insert(batch).primary_keys)
+        STAGE_ITEMS.inc(inserted, stage="milvus_insert")
+        return inserted
+
     def store_vectors_to_milvus_lite(
         self, 
         embedding_file_id: str, 
@@ -130,7 +152,7 @@ class VectorFileProcessor:
         Loads vectors from an embedding file and stores them into Milvus Lite.
 
         Args:
-            embedding_file_id: The name of the _embedded.json file.
+            embedding_file_id: The name of the _embedded.jsonl (or legacy _embedded.json) file.
             collection_name: The name for the Milvus collection.
             dimension: The embedding dimension. If None, tries to infer from the first chunk.
 
@@ -145,34 +167,36 @@ class VectorFileProcessor:
             return {"success": False, "error": f"Embedding file '{embedding_file_id}' not found."}
 
         try:
-            with open(embedding_filepath, 'r', encoding='utf-8') as f:
-                embedding_data = json.load(f)
+            file_metadata = read_meta(embedding_filepath).get("embedding_metadata", {})
+            total_chunks = count_records(embedding_filepath)
         except Exception as e:
             self.logger.error(f"Failed to read or parse embedding file {embedding_filepath}: {e}", exc_info=True)
             return {"success": False, "error": f"Error reading embedding file: {str(e)}"}
-
-        chunks = embedding_data.get("chunks", [])
-        file_metadata = embedding_data.get("embedding_metadata", {})
         
-        if not chunks:
+        if total_chunks == 0:
             self.logger.warning(f"No chunks found in {embedding_file_id}")
             return {"success": False, "error": "No chunks found in the embedding file."}
 
-        # Infer dimension if not provided
+        # Infer dimension if not provided: header metadata first, then the first embedded chunk
         if dimension is None:
-            if chunks[0].get("embedding"):
-                dimension = len(chunks[0]["embedding"])
+            dimension = file_metadata.get("embedding_model_dim")
+            if not dimension:
+                first_chunk = next(iter_records(embedding_filepath), {})
+                if first_chunk.get("embedding"):
+                    dimension = len(first_chunk["embedding"])
+            if dimension:
                 self.logger.info(f"Inferred embedding dimension: {dimension}")
             else:
-                self.logger.error("Dimension not provided and could not be inferred from the first chunk.")
+                self.logger.error("Dimension not provided and could not be inferred from the file.")
                 return {"success": False, "error": "Embedding dimension is required and could not be inferred."}
         
         if not isinstance(dimension, int) or dimension <= 0:
             self.logger.error(f"Invalid dimension provided or inferred: {dimension}")
             return {"success": False, "error": f"Invalid embedding dimension: {dimension}"}
 
+        alias = None
         try:
-            self._connect_milvus_lite()
+            alias = self._connect_milvus_lite()
 
             # Define schema
             # Use VARCHAR for chunk_id to allow for more flexible IDs from the source
@@ -189,78 +213,102 @@ class VectorFileProcessor:
                 enable_dynamic_field=False # Set to True if you want to add other metadata ad-hoc
             )
 
-            if utility.has_collection(collection_name, using='default'):
-                self.logger.info(f"Collection '{collection_name}' already exists. Using existing collection.")
-                collection = Collection(collection_name, using='default')
-                # Consider checking if schema matches, or if it needs to be dropped and recreated
-                # For simplicity, we'll assume it's compatible or the user manages this.
-            else:
-                self.logger.info(f"Creating new collection: '{collection_name}'")
-                collection = Collection(collection_name, schema=schema, using='default', consistency_level="Strong") # Bounded for Lite
-                self.logger.info(f"Collection '{collection_name}' created successfully.")
-
-            # Prepare data for insertion
-            data_to_insert = []
-            for idx, chunk in enumerate(chunks):
+            with _DDL_LOCK:
+                if utility.has_collection(collection_name, using=alias):
+                    self.logger.info(f"Collection '{collection_name}' already exists. Using existing collection.")
+                    collection = Collection(collection_name, using=alias)
+                    # Consider checking if schema matches, or if it needs to be dropped and recreated
+                    # For simplicity, we'll assume it's compatible or the user manages this.
+                else:
+                    self.logger.info(f"Creating new collection: '{collection_name}'")
+                    collection = Collection(collection_name, schema=schema, using=alias, consistency_level="Strong") # Bounded for Lite
+                    self.logger.info(f"Collection '{collection_name}' created successfully.")
+
+            # Stream chunks from the file and insert them in fixed-size batches,
+            # so memory is bounded by the batch size instead of the document size
+            vectors_inserted = 0
+            vectors_reused = 0
+            batch = []
+            # Near-duplicate chunks were not embedded (see ChunkDeduplicator); they reuse the vector
+            # of their cluster representative, which always precedes them in the file. Only the
+            # representatives that actually have duplicates are kept in memory.
+            clusters = file_metadata.get("dedup", {}).get("clusters", {})
+            representative_vectors = {}
+            # Chunk text is materialized from the load artifact via the stored offsets
+            for idx, chunk in enumerate(iter_materialized(embedding_filepath)):
                 embedding_vector = chunk.get("embedding")
                 content = chunk.get("content", "")
                 
+                if not embedding_vector and chunk.get("duplicate_of") is not None:
+                    embedding_vector = representative_vectors.get(str(chunk["duplicate_of"]))
+                    if embedding_vector:
+                        vectors_reused += 1
+                elif embedding_vector and str(chunk.get("id")) in clusters:
+                    representative_vectors[str(chunk["id"])] = embedding_vector
+                
                 if not embedding_vector or len(embedding_vector) != dimension:
                     self.logger.warning(f"Skipping chunk {idx} due to missing or mismatched dimension embedding.")
                     continue
                 
-                data_to_insert.append({
+                batch.append({
                     "embedding": embedding_vector,
                     "text_content": content[:65534], # Ensure it fits VARCHAR
                     "original_doc_id": file_metadata.get("chunk_file_id", "N/A"),
                     "chunk_seq_num": chunk.get("chunk_id", idx) # Use chunk_id if present, else sequence
                 })
+                if len(batch) >= self.insert_batch_size:
+                    vectors_inserted += self._insert_batch(collection, batch)
+                    batch = []
+
+            if batch:
+                vectors_inserted += self._insert_batch(collection, batch)
 
-            if not data_to_insert:
+            if vectors_inserted == 0:
                 self.logger.warning("No valid data prepared for insertion.")
                 return {"success": False, "error": "No valid chunks with embeddings found for insertion."}
 
-            insert_result = collection.insert(data_to_insert)
             collection.flush() # Ensure data is written
-            self.logger.info(f"Successfully inserted {len(insert_result.primary_keys)} vectors into '{collection_name}'.")
+            self.logger.info(f"Successfully inserted {vectors_inserted} vectors into '{collection_name}'.")
 
             # Create index if it doesn't exist for the embedding field
             # This is crucial for search performance
-            index_exists = False
-            for index in collection.indexes:
-                if index.field_name == "embedding":
-                    index_exists = True
-                    self.logger.info(f"Index on 'embedding' field already exists for collection '{collection_name}'.")
-                    break
-            
-            if not index_exists:
-                self.logger.info(f"Creating index for 'embedding' field in collection '{collection_name}'.")
-                # IVF_FLAT is a common choice, HNSW is another good option.
-                # Adjust nlist based on expected data size. Default 128.
-                index_params = { 
-                    "metric_type": "L2",  # Or "IP" for inner product, depending on embedding model
-                    "index_type": "IVF_FLAT", 
-                    "params": {"nlist": 128}
-                }
-                collection.create_index(field_name="embedding", index_params=index_params)
-                self.logger.info(f"Index created successfully for '{collection_name}'.")
+            with _DDL_LOCK:
+                index_exists = False
+                for index in collection.indexes:
+                    if index.field_name == "embedding":
+                        index_exists = True
+                        self.logger.info(f"Index on 'embedding' field already exists for collection '{collection_name}'.")
+                        break
+                
+                if not index_exists:
+                    self.logger.info(f"Creating index for 'embedding' field in collection '{collection_name}'.")
+                    # IVF_FLAT is a common choice, HNSW is another good option.
+                    # Adjust nlist based on expected data size. Default 128.
+                    index_params = { 
+                        "metric_type": "L2",  # Or "IP" for inner product, depending on embedding model
+                        "index_type": "IVF_FLAT", 
+                        "params": {"nlist": 128}
+                    }
+                    collection.create_index(field_name="embedding", index_params=index_params)
+                    self.logger.info(f"Index created successfully for '{collection_name}'.")
 
             collection.load() # Load collection into memory for searching
 
             milvus_version_str = "N/A"
             try:
-                milvus_version_str = utility.get_server_version()
+                milvus_version_str = utility.get_server_version(using=alias)
             except Exception as ver_exc:
                 self.logger.warning(f"Could not retrieve Milvus server version: {ver_exc}")
                 milvus_version_str = "N/A (RPC GetVersion unimplemented or error)"
 
             return {
                 "success": True,
-                "message": f"Successfully stored {len(insert_result.primary_keys)} vectors into Milvus Lite collection '{collection_name}'.",
+                "message": f"Successfully stored {vectors_inserted} vectors into Milvus Lite collection '{collection_name}'.",
                 "details": {
                     "collection_name": collection_name,
-                    "vectors_inserted": len(insert_result.primary_keys),
-                    "total_chunks_in_file": len(chunks),
+                    "vectors_inserted": vectors_inserted,
+                    "vectors_reused_from_duplicates": vectors_reused,
+                    "total_chunks_in_file": total_chunks,
                     "db_path": self.milvus_lite_uri,
                     "milvus_version": milvus_version_str
                 }
@@ -270,7 +318,8 @@ class VectorFileProcessor:
             self.logger.error(f"Error during Milvus Lite operation: {e}", exc_info=True)
             return {"success": False, "error": f"Milvus Lite operation failed: {str(e)}"}
         finally:
-            self._disconnect_milvus_lite()
+            if alias is not None:
+                self._disconnect_milvus_lite(alias)
 
 if __name__ == '__main__':
     # Basic test for the service
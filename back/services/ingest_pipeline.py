@@ -0,0 +1,329 @@
+"""
+流水线式入库模块：解析 -> 切分 -> 嵌入 -> 入库 各阶段并行运行，阶段之间用有界队列连接。
+
+逐个调用四个接口时，每个文件都要等上一阶段全部完成；流水线中各阶段由各自的线程处理，
+第 N+1 个文件解析的同时第 N 个文件在嵌入、第 N-1 个文件在入库。解析的重活在沙箱进程中，
+嵌入时 torch 释放 GIL，入库以 I/O 为主，因此线程即可让各阶段重叠。
+有界队列提供背压：下游阶段跟不上时上游阻塞，不会把中间结果无限堆积在内存中。
+"""
+import os
+import time
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.artifact_io import artifact_id
+from services.metrics import QUEUE_DEPTH
+
+# 阶段之间队列的默认容量
+DEFAULT_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+_STOP = object()
+
+
+class PipelineStage:
+    """流水线的一个阶段：func 接收上一阶段的输出并返回交给下一阶段的结果，抛出异常时该条目失败"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称
+            func: 处理函数
+            workers: 处理线程数
+        """
+        if workers < 1:
+            raise ValueError(f"阶段 {name} 的线程数必须大于 0: {workers}")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0  # 执行 func 的时间
+        self.blocked_seconds = 0.0  # 等待下游队列空位的时间 (背压)
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def record(self, seconds: float, success: bool, depth: int):
+        with self._lock:
+            self.busy_seconds += seconds
+            if success:
+                self.processed += 1
+            else:
+                self.failed += 1
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def record_blocked(self, seconds: float):
+        with self._lock:
+            self.blocked_seconds += seconds
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        """
+        阶段统计
+
+        Args:
+            elapsed: 流水线总耗时
+
+        Returns:
+            Dict: 处理数、失败数、忙碌时间、利用率、吞吐量和输入队列深度
+        """
+        handled = self.processed + self.failed
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            # 利用率: 线程忙碌时间占 (线程数 x 总耗时) 的比例，最高的阶段即瓶颈
+            "utilization": round(self.busy_seconds / (self.workers * elapsed), 4) if elapsed > 0 else 0.0,
+            "avg_seconds": round(self.busy_seconds / handled, 3) if handled else None,
+            # 该阶段满负荷时的吞吐量 (条/秒)
+            "capacity_per_second": round(handled * self.workers / self.busy_seconds, 3) if self.busy_seconds > 0 else None,
+            "avg_queue_depth": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+            "max_queue_depth": self.max_depth
+        }
+
+
+class StreamingPipeline:
+    """
+    多阶段流水线
+
+    每个阶段有自己的输入队列和处理线程；条目按提交顺序编号，结果按编号返回。
+    某个阶段失败的条目不再进入后续阶段，失败信息记录阶段名称和错误。
+    """
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        初始化流水线
+
+        Args:
+            stages: 按顺序排列的阶段
+            queue_size: 阶段之间队列的容量
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def _put(self, stage_index: int, target: "queue.Queue", item):
+        start_time = time.time()
+        target.put(item)
+        if stage_index >= 0:
+            self.stages[stage_index].record_blocked(time.time() - start_time)
+
+    def _worker(self, index: int, queues: List["queue.Queue"], remaining: List[int], remaining_lock: threading.Lock):
+        stage = self.stages[index]
+        source, target, output_queue = queues[index], queues[index + 1], queues[-1]
+        last_stage = index == len(self.stages) - 1
+        while True:
+            item = source.get()
+            if item is _STOP:
+                break
+            depth = source.qsize()
+            QUEUE_DEPTH.set(depth, queue=f"pipeline_{stage.name}")
+            number, payload = item
+            start_time = time.time()
+            try:
+                output = stage.func(payload)
+            except Exception as e:
+                stage.record(time.time() - start_time, False, depth)
+                # 失败的条目直接进入结果队列，不再经过后续阶段
+                output_queue.put((number, {"success": False, "stage": stage.name, "error": str(e), "input": payload}))
+                continue
+            stage.record(time.time() - start_time, True, depth)
+            if last_stage:
+                output_queue.put((number, {"success": True, "output": output}))
+            else:
+                self._put(index, target, (number, output))
+
+        # 本阶段最后一个退出的线程通知下游阶段结束
+        with remaining_lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            downstream = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(downstream):
+                target.put(_STOP)
+
+    def run(self, items: Iterable[Any],
+            on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        运行流水线直到所有条目处理完毕
+
+        Args:
+            items: 输入条目 (可以是生成器，按需读取)
+            on_result: 每个条目完成 (成功或失败) 时在调用线程中回调，参数为 (编号, 结果)
+
+        Returns:
+            Dict: 按提交顺序排列的 results (成功时为最后一个阶段的输出)，
+                各阶段统计 stages、瓶颈阶段 bottleneck 和整体吞吐量
+        """
+        for stage in self.stages:
+            stage.reset()
+        # 最后一个队列收集成功和失败的结果，不限容量
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages] + [queue.Queue()]
+        results: Dict[int, Dict[str, Any]] = {}
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(index, queues, remaining, remaining_lock),
+                name=f"pipeline-{stage.name}-{worker}", daemon=True
+            )
+            for index, stage in enumerate(self.stages)
+            for worker in range(stage.workers)
+        ]
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+
+        # 输入在单独的线程中提交，调用线程同时收集结果 (输入是生成器时可以边读边处理)
+        submitted = [0]
+        feed_errors = []
+
+        def feed():
+            try:
+                for number, item in enumerate(items):
+                    self._put(-1, queues[0], (number, item))
+                    submitted[0] += 1
+            except Exception as e:
+                # 输入生成器出错时仍要通知各阶段结束，已提交的条目照常处理完
+                feed_errors.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_STOP)
+
+        feeder = threading.Thread(target=feed, name="pipeline-feeder", daemon=True)
+        feeder.start()
+
+        output = queues[-1]
+        while True:
+            item = output.get()
+            if item is _STOP:
+                break
+            number, result = item
+            results[number] = result
+            if on_result is not None:
+                on_result(number, result)
+        feeder.join()
+        count = submitted[0]
+        for thread in threads:
+            thread.join()
+        if feed_errors:
+            raise feed_errors[0]
+        elapsed = time.time() - start_time
+
+        stage_stats = [stage.stats(elapsed) for stage in self.stages]
+        succeeded = sum(1 for result in results.values() if result["success"])
+        serial_seconds = sum(stage.busy_seconds for stage in self.stages)
+        return {
+            "item_count": count,
+            "succeeded_count": succeeded,
+            "failed_count": count - succeeded,
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(count / elapsed, 3) if elapsed > 0 else None,
+            # 各阶段串行执行所需时间与实际耗时之比，反映阶段重叠的收益
+            "serial_seconds": round(serial_seconds, 3),
+            "overlap_speedup": round(serial_seconds / elapsed, 2) if elapsed > 0 else None,
+            "stages": stage_stats,
+            "bottleneck": max(stage_stats, key=lambda stats: stats["utilization"])["name"],
+            "results": [results[number] for number in range(count)]
+        }
+
+
+def build_ingest_stages(
+    file_processor,
+    chunk_processor,
+    embedding_processor,
+    vector_processor=None,
+    method: str = "llamaindex",
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    separator: str = "\n\n",
+    dedup: bool = False,
+    collection_name: Optional[str] = None,
+    dimension: Optional[int] = None,
+    workers: Optional[Dict[str, int]] = None,
+    embed_gate=None
+) -> List[PipelineStage]:
+    """
+    构建 解析 -> 切分 -> 嵌入 -> 入库 四个阶段
+
+    每个阶段接收并返回同一个文档上下文字典，逐步补充 file_id、chunk_file_id、embedding_file 等字段。
+    未指定 collection_name 时不包含入库阶段。
+
+    Args:
+        file_processor: FileProcessor，输入为 save_upload_file 生成的文件信息
+        chunk_processor: FileChunkProcessor
+        embedding_processor: EmbeddingClass
+        vector_processor: VectorFileProcessor
+        method: 切分方法
+        chunk_size: chunk 大小
+        chunk_overlap: chunk 重叠
+        separator: 分隔符
+        dedup: 是否跳过近似重复 chunk 的嵌入
+        collection_name: Milvus 集合名
+        dimension: 向量维度
+        workers: 各阶段线程数，键为 parse/chunk/embed/store
+        embed_gate: 嵌入每个文件时占用的准入闸门 (AdmissionGate)，与 /api/embedding 共用模型资源；
+            只在嵌入单个文件期间占用名额，排队超时或队列已满时该文件失败
+
+    Returns:
+        List[PipelineStage]: 阶段列表
+    """
+    workers = workers or {}
+
+    def parse(file_info):
+        result = file_processor.process_file(file_info)
+        return {
+            "filename": file_info["filename"],
+            "content_hash": file_info.get("content_hash"),
+            "file_id": os.path.splitext(os.path.basename(file_info["load_path"]))[0],
+            "parser": result["parser"],
+            "content_length": result["content_length"]
+        }
+
+    def chunk(document):
+        result = chunk_processor.process_chunk(document["file_id"], method, chunk_size, chunk_overlap, separator)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        document["chunk_file_id"] = artifact_id(os.path.basename(result["output_path"]))
+        document["chunk_count"] = result["chunk_count"]
+        return document
+
+    def embed(document):
+        with embed_gate.admit() if embed_gate is not None else nullcontext():
+            result = embedding_processor.process_embeddings(document["chunk_file_id"], include_data=False, dedup=dedup)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        document["embedding_file"] = os.path.basename(result["embedding_file"])
+        return document
+
+    def store(document):
+        result = vector_processor.store_vectors_to_milvus_lite(document["embedding_file"], collection_name, dimension)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+        document["collection_name"] = collection_name
+        return document
+
+    stages = [
+        PipelineStage("parse", parse, workers.get("parse", 2)),
+        PipelineStage("chunk", chunk, workers.get("chunk", 1)),
+        # 嵌入模型实例在线程间共享，默认单线程避免争用
+        PipelineStage("embed", embed, workers.get("embed", 1)),
+    ]
+    if collection_name:
+        stages.append(PipelineStage("store", store, workers.get("store", 1)))
+    return stages
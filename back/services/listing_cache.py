@@ -0,0 +1,195 @@
+"""
+列表接口的条件请求和结果缓存模块。
+
+/api/files/load、/api/files/chunk、/api/vector/stats 每次都要读取目录中所有产物的元数据，前端页面会反复轮询。
+这些接口以所列目录的修改时间作为版本号：版本号不变时对带 If-None-Match / If-Modified-Since 的请求返回 304，
+对其他请求直接返回进程内缓存的响应体，不再读取磁盘。
+
+产物在写完之后 (而不是创建时) 才算可见：各阶段写完产物后调用 notify_artifact_written()，
+它会更新目录的修改时间，因此其他工作进程、解析沙箱和命令行工具写入的产物同样会使版本号变化。
+"""
+import os
+import time
+import hashlib
+import datetime
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+from services.metrics import CACHE_LOOKUPS
+
+# 进程内最多缓存的响应数 (按接口和查询参数区分)
+LISTING_CACHE_MAX_ENTRIES = 64
+
+
+def folder_mtime_ns(folder: str) -> int:
+    """目录的修改时间 (纳秒)，目录不存在时为 0"""
+    try:
+        return os.stat(folder).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class ListingCache:
+    """按目录版本号缓存列表接口的响应体"""
+
+    def __init__(self, max_entries: int = LISTING_CACHE_MAX_ENTRIES):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的响应数
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[str, Any]]" = OrderedDict()
+
+    def version(self, folders: Iterable[str]) -> Tuple[str, Optional[datetime.datetime]]:
+        """
+        计算目录的版本号
+
+        Args:
+            folders: 目录列表
+
+        Returns:
+            Tuple: (ETag 值, 最近修改时间)；目录都不存在时修改时间为 None
+        """
+        mtimes = [folder_mtime_ns(folder) for folder in folders]
+        token = ":".join(f"{os.path.abspath(folder)}={mtime}" for folder, mtime in zip(folders, mtimes))
+        etag = hashlib.sha1(token.encode("utf-8")).hexdigest()[:20]
+        latest = max(mtimes, default=0)
+        last_modified = datetime.datetime.fromtimestamp(latest / 1e9, tz=datetime.timezone.utc) if latest else None
+        return etag, last_modified
+
+    def get(self, key: Any, etag: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            etag: 当前版本号
+
+        Returns:
+            Optional[Any]: 版本号一致时返回缓存值，否则返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Any, etag: str, value: Any):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            etag: 计算结果时的版本号
+            value: 缓存值
+        """
+        with self._lock:
+            self._entries[key] = (etag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+LISTING_CACHE = ListingCache()
+
+
+def notify_artifact_written(path: str):
+    """
+    产物写完后更新所在目录的修改时间，使依赖该目录的列表版本号变化
+
+    覆盖写入已有文件或在文件创建后追加内容都不会改变目录的修改时间，因此需要显式更新；
+    新的修改时间至少比原来晚 1 纳秒，同一时刻的两次写入也能区分。
+
+    Args:
+        path: 产物文件路径
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    try:
+        stat = os.stat(folder)
+        os.utime(folder, ns=(stat.st_atime_ns, max(time.time_ns(), stat.st_mtime_ns + 1)))
+    except OSError as e:
+        print(f"更新目录 {folder} 的修改时间时出错: {e}")
+
+
+def is_not_modified(request, etag: str, last_modified: Optional[datetime.datetime]) -> bool:
+    """
+    判断条件请求是否可以返回 304
+
+    带 If-None-Match 时只比较 ETag (忽略 If-Modified-Since)。If-Modified-Since 只精确到秒，
+    同一秒内的后续写入不会改变 Last-Modified，因此只有目录的修改时间早于该秒时才视为未变化。
+
+    Args:
+        request: Flask 请求
+        etag: 当前版本号
+        last_modified: 当前最近修改时间 (精确到微秒)
+
+    Returns:
+        bool: 客户端的副本仍然有效
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if_modified_since = request.if_modified_since
+    if if_modified_since is None or last_modified is None:
+        return False
+    return last_modified < if_modified_since
+
+
+def conditional_listing(*folders: str, cache: Optional[ListingCache] = None):
+    """
+    列表接口的装饰器：设置 ETag / Last-Modified，未变化时返回 304，否则优先返回缓存的响应体
+
+    只缓存状态码为 200 的响应。
+
+    Args:
+        *folders: 接口结果所依赖的目录
+        cache: 使用的缓存，默认为 LISTING_CACHE
+
+    Returns:
+        装饰器
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import Response, make_response, request
+
+            listing_cache = cache if cache is not None else LISTING_CACHE
+            etag, last_modified = listing_cache.version(folders)
+
+            def with_validators(response):
+                response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                # 浏览器每次都带上 ETag 重新验证，不直接使用本地缓存
+                response.cache_control.no_cache = True
+                return response
+
+            if is_not_modified(request, etag, last_modified):
+                CACHE_LOOKUPS.inc(cache="listing", result="not_modified")
+                return with_validators(Response(status=304))
+
+            key = (request.endpoint, request.query_string)
+            cached = listing_cache.get(key, etag)
+            if cached is None:
+                CACHE_LOOKUPS.inc(cache="listing", result="miss")
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # 版本号在计算之前取得：计算期间有新的写入时，下次请求的版本号不同，不会返回过期结果
+                cached = (response.get_data(), response.mimetype)
+                listing_cache.put(key, etag, cached)
+            else:
+                CACHE_LOOKUPS.inc(cache="listing", result="hit")
+            return with_validators(Response(cached[0], mimetype=cached[1]))
+        return wrapper
+    return decorator
@@ -1,9 +1,128 @@
 """
 日志配置模块，负责设置日志记录格式和输出。
+
+文件处理器挂在后台监听线程上：请求线程只把日志记录放入队列 (QueueHandler)，
+由 QueueListener 线程写文件和轮转，请求线程不再等待磁盘写入和文件锁。
 """
 import os
+import time
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 已启动的 (队列处理器, 监听器)，进程退出时停止监听器并写完队列中的日志
+_listeners = []
+
+# 进度日志的默认最小间隔 (秒)
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("LOG_PROGRESS_INTERVAL", "5"))
+
+
+def _start_listener(handlers):
+    """
+    创建日志队列和监听线程
+
+    Args:
+        handlers: 由监听线程调用的处理器
+
+    Returns:
+        QueueHandler: 挂在日志记录器上的队列处理器
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append((queue_handler, listener))
+    return queue_handler
+
+
+def stop_listeners():
+    """停止所有监听线程 (写完队列中剩余的日志)"""
+    while _listeners:
+        _, listener = _listeners.pop()
+        listener.stop()
+
+
+def stop_listener(queue_handler):
+    """
+    停止一个队列处理器对应的监听线程 (写完队列中剩余的日志)，其他监听线程不受影响
+
+    Args:
+        queue_handler: setup_logger 挂在日志记录器上的 QueueHandler
+    """
+    for index, (handler, listener) in enumerate(_listeners):
+        if handler is queue_handler:
+            del _listeners[index]
+            listener.stop()
+            return
+
+
+def _restart_listeners_after_fork():
+    # 监听线程不会被 fork 复制 (gunicorn preload 时日志在主进程中配置)，子进程换用新的队列和监听线程
+    restarted = []
+    for queue_handler, listener in _listeners:
+        log_queue = queue.SimpleQueue()
+        queue_handler.queue = log_queue
+        new_listener = QueueListener(log_queue, *listener.handlers, respect_handler_level=True)
+        new_listener.start()
+        restarted.append((queue_handler, new_listener))
+    _listeners[:] = restarted
+
+
+atexit.register(stop_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
+class ProgressReporter:
+    """
+    限频的进度日志
+
+    循环中每处理一项调用一次 update()，最多每 interval 秒输出一条包含完成数、速率和预计剩余时间的日志，
+    代替逐项输出；结束时 close() 输出一条汇总。update() 只做计数和一次时间比较。
+    """
+
+    def __init__(self, logger, label: str, total: int = None, interval: float = PROGRESS_INTERVAL_SECONDS,
+                 level: int = logging.INFO):
+        """
+        初始化进度日志
+
+        Args:
+            logger: 日志记录器 (或 logging 模块)
+            label: 任务描述，作为每条日志的前缀
+            total: 总数 (未知时为 None)
+            interval: 两条进度日志之间的最小间隔 (秒)
+            level: 日志级别
+        """
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.level = level
+        self.count = 0
+        self.start_time = time.monotonic()
+        self._next_report = self.start_time + interval
+
+    def update(self, amount: int = 1):
+        """记录完成 amount 项，距离上一条进度日志超过间隔时输出一条"""
+        self.count += amount
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self._report(now)
+
+    def _report(self, now: float, finished: bool = False):
+        elapsed = now - self.start_time
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        progress = f"{self.count}/{self.total}" if self.total else str(self.count)
+        message = f"{self.label}: {'完成' if finished else '已处理'} {progress}，{rate:.1f} 项/秒，耗时 {elapsed:.1f} 秒"
+        if not finished and self.total and rate > 0:
+            message += f"，预计剩余 {(self.total - self.count) / rate:.1f} 秒"
+        self.logger.log(self.level, message)
+
+    def close(self):
+        """输出汇总日志"""
+        self._report(time.monotonic(), finished=True)
 
 def setup_logger(app, log_folder='log'):
     """
@@ -44,13 +163,15 @@ def setup_logger(app, log_folder='log'):
     error_file_handler.setFormatter(log_formatter)
     error_file_handler.setLevel(logging.ERROR)
     
+    # 文件写入在监听线程中进行
+    queue_handler = _start_listener([file_handler, error_file_handler])
+    
     # 决定是创建新的日志记录器还是使用Flask应用的记录器
     if isinstance(app, str):
         # 如果提供的是名称字符串，创建新的日志记录器
         logger = logging.getLogger(app)
         logger.handlers = []  # 清除已有的处理器
-        logger.addHandler(file_handler)
-        logger.addHandler(error_file_handler)
+        logger.addHandler(queue_handler)
         logger.setLevel(logging.INFO)
         
         # 添加控制台处理器
@@ -61,8 +182,7 @@ def setup_logger(app, log_folder='log'):
     else:
         # 否则，假设是Flask应用
         logger = app.logger
-        logger.addHandler(file_handler)
-        logger.addHandler(error_file_handler)
+        logger.addHandler(queue_handler)
         logger.setLevel(logging.INFO)
         
         # 在开发环境中保留控制台输出
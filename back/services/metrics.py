@@ -0,0 +1,450 @@
+"""
+指标模块，以 Prometheus 文本格式导出请求延迟、各阶段耗时、队列深度、缓存命中和进程内存。
+
+服务类通过模块级的指标对象记录数据 (例如 STAGE_SECONDS.time(stage="chunk"))，记录一次只是在锁内更新几个数字，
+不依赖 prometheus_client。指标保存在进程内。
+
+设置 METRICS_MULTIPROC_DIR 后进入多进程模式 (与 prometheus_client 的 multiprocess 模式类似)：每个进程
+(gunicorn 工作进程、解析沙箱和进程池的子进程) 每隔 METRICS_FLUSH_INTERVAL 秒、以及退出时把自己的数据写入
+该目录下的一个文件，抓取时汇总目录中的所有文件：计数器和分桶统计跨进程求和 (已退出进程的数据保留，计数不会回退)，
+gauge 按 pid 标签分别输出 (只输出仍在运行的进程)。目录应在服务启动前清空 (gunicorn.conf.py 会自动清空)。
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+import multiprocessing.util
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认的延迟分桶 (秒)，覆盖从毫秒级的请求到分钟级的大文件解析
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 多进程模式的共享目录，未设置时只导出当前进程的数据
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+# 多进程模式下各进程写出数据的间隔 (秒)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    """指标基类：按标签值保存各序列的数据"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _current(self) -> Dict[Tuple[str, ...], Any]:
+        """当前进程各序列的数据"""
+        with self._lock:
+            return dict(self._series)
+
+    def _series_samples(self, labelnames: Tuple[str, ...], items) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        return [(self.name, labelnames, key, value) for key, value in items]
+
+    @staticmethod
+    def _merge(total, value):
+        """合并两个进程中同一序列的数据"""
+        return total + value
+
+    def reset(self):
+        """清空记录的数据 (fork 出的子进程不重复计入父进程的数据)，回调取值保留"""
+        with self._lock:
+            self._series.clear()
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """返回 (样本名, 标签名, 标签值, 数值) 列表"""
+        return self._series_samples(self.labelnames, sorted(self._current().items()))
+
+    def snapshot(self) -> List[list]:
+        """当前进程各序列的数据 (可序列化为 JSON)，多进程模式下写入共享目录"""
+        return [[list(key), value] for key, value in self._current().items()]
+
+    def merged_samples(self, snapshots: Dict[str, List[list]]) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """
+        汇总多个进程的数据
+
+        Args:
+            snapshots: pid 到该进程 snapshot() 结果的映射
+
+        Returns:
+            List: 与 samples() 相同格式的样本
+        """
+        totals = {}
+        for series in snapshots.values():
+            for key, value in series:
+                key = tuple(key)
+                totals[key] = self._merge(totals[key], value) if key in totals else value
+        return self._series_samples(self.labelnames, sorted(totals.items()))
+
+    def render(self, snapshots: Optional[Dict[str, List[list]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        samples = self.samples() if snapshots is None else self.merged_samples(snapshots)
+        for sample_name, names, values, value in samples:
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可增可减的数值；也可以注册回调，在抓取时读取当前值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._functions: Dict[Tuple[str, ...], Callable[[], Optional[float]]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], Optional[float]], **labels):
+        """抓取时调用 func 取值，返回 None 时不输出该序列"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            func = self._functions.get(key)
+            if func is None:
+                return self._series.get(key, 0)
+        return func()
+
+    def _current(self):
+        with self._lock:
+            values = dict(self._series)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            value = func()
+            if value is not None:
+                values[key] = value
+        return values
+
+    def merged_samples(self, snapshots):
+        # 各进程的当前值不能相加 (例如内存)，按 pid 标签分别输出
+        items = sorted(
+            (tuple(key) + (pid,), value) for pid, series in snapshots.items() for key, value in series
+        )
+        return self._series_samples(self.labelnames + ("pid",), items)
+
+
+class Histogram(_Metric):
+    """分桶统计的耗时分布，输出 _bucket (累计)、_sum 和 _count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # 各桶 (不累计) 的计数、最后一个为 +Inf 桶；以及总和
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """记录 with 语句块的耗时 (出现异常时同样记录)"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def _current(self):
+        with self._lock:
+            return {key: [list(series[0]), series[1]] for key, series in self._series.items()}
+
+    @staticmethod
+    def _merge(total, value):
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1]]
+
+    def _series_samples(self, labelnames, items):
+        result = []
+        bucket_names = labelnames + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                result.append((f"{self.name}_bucket", bucket_names, key + (_format_value(bound),), cumulative))
+            result.append((f"{self.name}_sum", labelnames, key, total))
+            result.append((f"{self.name}_count", labelnames, key, cumulative))
+        return result
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # Windows 上 os.kill 会结束目标进程，不做检查
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self, multiproc_dir: Optional[str] = None):
+        """
+        初始化注册表
+
+        Args:
+            multiproc_dir: 多进程模式的共享目录，为 None 时只导出当前进程的数据
+        """
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self.multiproc_dir = multiproc_dir
+        self._process_file = None
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def _metric_list(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def flush(self):
+        """多进程模式下把当前进程的数据写入共享目录 (先写临时文件再替换，读取方不会读到写了一半的文件)"""
+        if not self.multiproc_dir:
+            return
+        pid = os.getpid()
+        if self._process_file is None or self._process_file[0] != pid:
+            # 文件名包含启动时间，pid 被复用时不会覆盖已退出进程的数据
+            self._process_file = (pid, os.path.join(self.multiproc_dir, f"metrics_{pid}_{time.time_ns()}.json"))
+        path = self._process_file[1]
+        data = {"pid": pid, "metrics": {metric.name: metric.snapshot() for metric in self._metric_list()}}
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"写入指标文件 {path} 时出错: {e}")
+
+    def collect(self) -> Tuple[Dict[str, Dict[str, List[list]]], Dict[str, Dict[str, List[list]]]]:
+        """
+        读取共享目录中所有进程的数据
+
+        Returns:
+            Tuple: (指标名 -> pid -> 数据 的全部进程数据, 同样格式但只含仍在运行的进程)
+        """
+        merged: Dict[str, Dict[str, List[list]]] = {}
+        alive: Dict[str, Dict[str, List[list]]] = {}
+        for filename in sorted(os.listdir(self.multiproc_dir)):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = str(data["pid"])
+            is_alive = _pid_alive(data["pid"])
+            for name, series in data["metrics"].items():
+                merged.setdefault(name, {})[pid] = merged.get(name, {}).get(pid, []) + series
+                if is_alive:
+                    alive.setdefault(name, {})[pid] = series
+        return merged, alive
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式
+
+        多进程模式下先写出当前进程的数据，再汇总共享目录中所有进程的数据。
+
+        Returns:
+            str: 所有指标的文本
+        """
+        metrics = self._metric_list()
+        lines = []
+        if self.multiproc_dir:
+            self.flush()
+            merged, alive = self.collect()
+            for metric in metrics:
+                # gauge 只输出仍在运行的进程，计数器和分桶统计保留已退出进程的数据
+                snapshots = alive if isinstance(metric, Gauge) else merged
+                lines.extend(metric.render(snapshots.get(metric.name, {})))
+        else:
+            for metric in metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _flush_loop(self):
+        while not self._stop_flusher.wait(METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def start_flusher(self):
+        """多进程模式下启动定期写出数据的后台线程，并在进程退出时再写出一次"""
+        if not self.multiproc_dir:
+            return
+        self._stop_flusher = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+        self._flusher.start()
+
+    def _after_fork(self):
+        # fork 出的子进程从零开始记录 (父进程的数据在父进程的文件中)，并换用自己的文件和写出线程
+        for metric in self._metric_list():
+            metric.reset()
+        self._process_file = None
+        self.start_flusher()
+
+
+REGISTRY = Registry(METRICS_MULTIPROC_DIR)
+
+
+def process_rss_bytes() -> Optional[float]:
+    """当前进程的常驻内存 (字节)，不支持 /proc 的平台返回 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# 服务使用的指标
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时 (按路由模板)", ("method", "route", "status")
+)
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "处理阶段耗时: extract、partition、chunk (每个文件)、embed (每个 chunk)、sentence_embed (语义切分的每批句子)、milvus_insert (每批)",
+    ("stage",)
+)
+STAGE_ITEMS = Counter("rag_stage_items_total", "各阶段处理的条目数 (文件、chunk、向量)", ("stage",))
+QUEUE_DEPTH = Gauge("rag_queue_depth", "队列中等待的任务数", ("queue",))
+CACHE_LOOKUPS = Counter("rag_cache_lookups_total", "缓存查找次数", ("cache", "result"))
+MODEL_LOADS = Counter("rag_model_loads_total", "模型从磁盘或网络加载的次数 (命中进程内缓存不计)", ("model",))
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "进程常驻内存 (字节)")
+PROCESS_RSS.set_function(process_rss_bytes)
+
+if REGISTRY.multiproc_dir:
+    REGISTRY.start_flusher()
+    atexit.register(REGISTRY.flush)
+    # multiprocessing 的子进程退出时不执行 atexit，由 multiprocessing 的退出回调写出
+    multiprocessing.util.Finalize(None, REGISTRY.flush, exitpriority=10)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+
+def time_stage(stage: str):
+    """
+    记录一个处理阶段的耗时
+
+    Args:
+        stage: 阶段名称
+
+    Returns:
+        上下文管理器
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def init_app(app):
+    """
+    为 Flask 应用记录每个请求的耗时
+
+    路由标签使用路由模板 (例如 /api/upload/resumable/<upload_id>)，不随请求参数增加序列；
+    未匹配任何路由的请求记为 "unmatched"。
+
+    Args:
+        app: Flask 应用
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start_time = time.perf_counter()
+
+    @app.teardown_request
+    def _observe_request(exception=None):
+        start_time = g.pop("metrics_start_time", None)
+        if start_time is None:
+            return
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        status = getattr(g, "metrics_status", 500 if exception is not None else 200)
+        REQUEST_SECONDS.observe(time.perf_counter() - start_time, method=request.method, route=rule, status=str(status))
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
@@ -0,0 +1,176 @@
+"""
+模型缓存模块，在进程内共享 HuggingFace 分词器和模型，避免每次请求重复加载。
+"""
+import os
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from services.metrics import MODEL_LOADS, STAGE_ITEMS, time_stage
+
+HF_MODEL_NAME = "BAAI/bge-small-zh-v1.5"
+# bge-small-zh 的最大输入长度 (包含 [CLS] 和 [SEP])
+HF_MAX_LENGTH = 512
+DEFAULT_MODEL_FOLDER = os.path.join('files', 'embedding_models')
+
+_lock = threading.Lock()
+_tokenizers = {}
+_models = {}
+
+
+def get_tokenizer(model_name: str = HF_MODEL_NAME, model_folder: str = DEFAULT_MODEL_FOLDER):
+    """
+    获取 (并缓存) 模型的快速分词器
+
+    本地模型目录不存在时从 HuggingFace 下载并保存，与 EmbeddingClass 使用同一目录。
+
+    Args:
+        model_name: HuggingFace 模型名称
+        model_folder: 本地模型存储目录
+
+    Returns:
+        PreTrainedTokenizerFast: 支持 offset_mapping 的快速分词器
+    """
+    with _lock:
+        tokenizer = _tokenizers.get(model_name)
+        if tokenizer is not None:
+            return tokenizer
+
+        model_path = os.path.join(model_folder, model_name)
+        if os.path.exists(os.path.join(model_path, "tokenizer_config.json")):
+            logging.info(f"从本地加载分词器: {model_path}")
+            tokenizer = AutoTokenizer.from_pretrained(model_path, use_fast=True)
+        else:
+            logging.info(f"从HuggingFace下载分词器: {model_name}")
+            tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            tokenizer.save_pretrained(model_path)
+
+        MODEL_LOADS.inc(model=f"{model_name}:tokenizer")
+        if not tokenizer.is_fast:
+            raise ValueError(f"模型 {model_name} 没有可用的快速分词器，无法获取 token 偏移")
+
+        _tokenizers[model_name] = tokenizer
+        return tokenizer
+
+
+def get_model(model_name: str = HF_MODEL_NAME, model_folder: str = DEFAULT_MODEL_FOLDER, device: Optional[str] = None):
+    """
+    获取 (并缓存) 处于评估模式的 HuggingFace 模型
+
+    同一进程内的切分和嵌入共用一份模型权重；本地模型目录中没有模型时从 HuggingFace 下载并保存。
+
+    Args:
+        model_name: HuggingFace 模型名称
+        model_folder: 本地模型存储目录
+        device: 运行设备，默认有 GPU 时使用 cuda
+
+    Returns:
+        PreTrainedModel: 已加载到指定设备的模型
+    """
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    with _lock:
+        model = _models.get((model_name, device))
+        if model is not None:
+            return model
+
+        model_path = os.path.join(model_folder, model_name)
+        if os.path.exists(os.path.join(model_path, "config.json")):
+            logging.info(f"从本地加载模型: {model_path}")
+            model = AutoModel.from_pretrained(model_path)
+        else:
+            logging.info(f"从HuggingFace下载模型到: {model_path}")
+            model = AutoModel.from_pretrained(model_name)
+            model.save_pretrained(model_path)
+
+        MODEL_LOADS.inc(model=model_name)
+        model.to(device)
+        model.eval()
+        _models[(model_name, device)] = model
+        return model
+
+
+def configure_torch_threads(num_threads: Optional[int] = None) -> int:
+    """
+    设置 torch 算子内线程数
+
+    Args:
+        num_threads: 线程数，默认取 TORCH_NUM_THREADS 环境变量，未设置时保持 torch 的默认值
+
+    Returns:
+        int: 生效的线程数
+    """
+    num_threads = num_threads or int(os.getenv("TORCH_NUM_THREADS", "0"))
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    return torch.get_num_threads()
+
+
+def warmup_models(model_name: str = HF_MODEL_NAME, model_folder: str = DEFAULT_MODEL_FOLDER) -> bool:
+    """
+    预加载 CPU 上的分词器和模型
+
+    在 WSGI 主进程 fork 工作进程之前调用，模型权重由所有工作进程以写时复制方式共享，
+    不再每个进程各自加载一份。只加载权重不做推理，主进程中不创建 torch 线程池。
+    有 GPU 时 CUDA 上下文不能跨 fork 使用，跳过预加载，由各工作进程按需加载。
+
+    Args:
+        model_name: HuggingFace 模型名称
+        model_folder: 本地模型存储目录
+
+    Returns:
+        bool: 是否已预加载
+    """
+    if torch.cuda.is_available():
+        logging.info("检测到 GPU，跳过 fork 前的模型预加载")
+        return False
+    try:
+        get_tokenizer(model_name, model_folder)
+        get_model(model_name, model_folder, device="cpu")
+    except Exception as e:
+        # 模型不可用时服务仍可启动，嵌入请求再报错
+        logging.warning(f"模型预加载失败: {e}")
+        return False
+    return True
+
+
+def embed_texts(texts: List[str], batch_size: int = 64, model_name: str = HF_MODEL_NAME,
+                device: Optional[str] = None) -> np.ndarray:
+    """
+    批量计算文本的 [CLS] 向量 (与 EmbeddingClass 的 HuggingFace 嵌入方式一致)
+
+    文本按长度排序后分批，同一批内长度接近，减少 padding 带来的无效计算。
+
+    Args:
+        texts: 文本列表
+        batch_size: 每批文本数
+        model_name: HuggingFace 模型名称
+        device: 运行设备
+
+    Returns:
+        np.ndarray: 形状为 (len(texts), hidden_size) 的 float32 数组，顺序与输入一致
+    """
+    tokenizer = get_tokenizer(model_name)
+    model = get_model(model_name, device=device)
+    vectors = np.zeros((len(texts), model.config.hidden_size), dtype=np.float32)
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.inference_mode():
+        for batch_start in range(0, len(order), batch_size):
+            indices = order[batch_start:batch_start + batch_size]
+            encoded = tokenizer(
+                [texts[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=HF_MAX_LENGTH,
+                return_tensors='pt'
+            ).to(model.device)
+            # 与 EmbeddingClass 的逐 chunk 嵌入分开记录，每个标签的耗时粒度一致
+            with time_stage("sentence_embed"):
+                output = model(**encoded)
+            STAGE_ITEMS.inc(len(indices), stage="sentence_embed")
+            vectors[indices] = output.last_hidden_state[:, 0, :].float().cpu().numpy()
+    return vectors
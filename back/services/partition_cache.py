@@ -0,0 +1,263 @@
+"""
+解析结果缓存模块，按文件内容哈希复用 unstructured 的解析结果。
+
+同一文件重复上传时内容哈希相同，直接复用缓存的文本，跳过最慢的 partition 阶段。
+缓存键包含解析策略和 unstructured 版本，升级解析库后旧结果自然失效。
+缓存目录是唯一的事实来源：多个工作进程共用同一目录，查找直接读取条目文件，
+容量统计和淘汰在目录文件锁内按目录扫描结果进行。
+"""
+import os
+import json
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁
+    fcntl = None
+
+from services.metrics import CACHE_LOOKUPS
+from unstructured.__version__ import __version__ as UNSTRUCTURED_VERSION
+
+# 默认缓存容量上限
+DEFAULT_MAX_BYTES = int(os.getenv("PARTITION_CACHE_MAX_MB", "1024")) * 1024 * 1024
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+CACHE_EXTENSION = ".json"
+# 目录锁文件，多个进程写入和淘汰时互斥
+LOCK_FILENAME = ".lock"
+
+
+class HashingWriter:
+    """
+    边写入边计算 SHA-256 的文件包装器
+
+    上传文件流式写入磁盘的同时完成哈希计算，不需要再读一遍文件。
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+def hash_file(path: str) -> Optional[str]:
+    """
+    计算磁盘文件的 SHA-256
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Optional[str]: 十六进制哈希，文件不存在时返回 None
+    """
+    if not os.path.isfile(path):
+        return None
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class PartitionCache:
+    """
+    基于磁盘的解析结果缓存，容量有上限，按最近使用时间 (LRU) 淘汰
+
+    每个条目是缓存目录下的一个 JSON 文件；命中时更新文件修改时间，LRU 顺序即修改时间顺序。
+    其他进程写入的条目同样能命中；写入后在目录锁内重新扫描目录，总大小超过上限时删除修改时间最早的条目，
+    因此容量上限对共用目录的所有进程整体生效。命中率统计只在当前进程内累计。
+    """
+
+    def __init__(self, cache_folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化解析结果缓存
+
+        Args:
+            cache_folder: 缓存目录
+            max_bytes: 缓存总大小上限 (字节)
+        """
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(self.cache_folder, LOCK_FILENAME)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # 最近一次扫描的 缓存键 -> 文件大小，按最近使用排序
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        """扫描缓存目录，按修改时间重建 LRU 顺序 (调用方持有 _lock 或在初始化中)"""
+        entries = []
+        for entry in os.scandir(self.cache_folder):
+            if entry.is_file() and entry.name.endswith(CACHE_EXTENSION):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # 扫描期间被其他进程淘汰
+                    continue
+                entries.append((stat.st_mtime_ns, entry.name[:-len(CACHE_EXTENSION)], stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total_bytes = sum(self._entries.values())
+
+    @contextmanager
+    def _directory_lock(self):
+        """进程内和跨进程的目录锁"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_folder, f"{key}{CACHE_EXTENSION}")
+
+    @staticmethod
+    def make_key(content_hash: str, strategy: str) -> str:
+        """
+        计算缓存键
+
+        Args:
+            content_hash: 文件内容的 SHA-256
+            strategy: 解析策略
+
+        Returns:
+            str: 由 (内容哈希, 解析策略, unstructured 版本) 得到的缓存键
+        """
+        return hashlib.sha256(f"{content_hash}:{strategy}:{UNSTRUCTURED_VERSION}".encode('utf-8')).hexdigest()
+
+    def get(self, content_hash: str, strategy: str, with_meta: bool = False):
+        """
+        查找缓存的解析结果
+
+        Args:
+            content_hash: 文件内容的 SHA-256
+            strategy: 解析策略
+            with_meta: 是否同时返回写入时附带的元数据
+
+        Returns:
+            Optional[str]: 缓存的解析文本，未命中时返回 None；
+                with_meta 为 True 时返回 (文本, 元数据) 元组，未命中时为 (None, None)
+        """
+        key = self.make_key(content_hash, strategy)
+        path = self._path(key)
+        # 直接读取条目文件，其他进程写入的条目同样命中
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            content = entry["content"]
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError, KeyError) as e:
+            # 条目损坏，或读取期间被其他进程淘汰：按未命中处理
+            print(f"读取解析缓存 {path} 时出错: {e}")
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                CACHE_LOOKUPS.inc(cache="partition", result="miss")
+                return (None, None) if with_meta else None
+            # 其他进程写入的条目加入本进程的索引
+            self._total_bytes += size - self._entries.get(key, 0)
+            self._entries[key] = size
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(cache="partition", result="hit")
+        return (content, entry.get("meta")) if with_meta else content
+
+    def put(self, content_hash: str, strategy: str, content: str, meta: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        写入解析结果，超出容量时淘汰最久未使用的条目
+
+        Args:
+            content_hash: 文件内容的 SHA-256
+            strategy: 解析策略
+            content: 解析文本
+            meta: 随条目保存的元数据 (如 PDF 的解析策略)，命中时原样返回
+
+        Returns:
+            bool: 是否写入了缓存 (单个条目超过容量上限时不缓存)
+        """
+        key = self.make_key(content_hash, strategy)
+        data = json.dumps({
+            "content_hash": content_hash,
+            "strategy": strategy,
+            "unstructured_version": UNSTRUCTURED_VERSION,
+            "created": datetime.datetime.now().isoformat(),
+            "meta": meta,
+            "content": content
+        }, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return False
+
+        path = self._path(key)
+        # 临时文件名区分进程和线程，同时写入同一条目时互不覆盖
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+
+        with self._directory_lock():
+            os.replace(temp_path, path)
+            # 按目录扫描结果统计容量，其他进程写入的条目一并计入
+            self._load_index()
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_key, size = self._entries.popitem(last=False)
+                if evicted_key == key:
+                    # 刚写入的条目修改时间可能与旧条目相同，不淘汰它
+                    self._entries[key] = size
+                    continue
+                try:
+                    os.remove(self._path(evicted_key))
+                except OSError:
+                    pass
+                self._total_bytes -= size
+                self.evictions += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计信息
+
+        Returns:
+            Dict: 命中/未命中次数、命中率、淘汰次数、条目数和占用空间
+        """
+        with self._lock:
+            # 条目数和占用空间以目录为准 (包含其他进程写入的条目)
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entry_count": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "unstructured_version": UNSTRUCTURED_VERSION
+            }
@@ -0,0 +1,263 @@
+"""
+解析沙箱模块，在独立的工作进程中运行 unstructured 解析，并限制耗时和内存。
+
+畸形或病态的上传文件可能让 partition 卡死或内存暴涨；放在 API 进程中会拖垮所有请求。
+沙箱中每个任务有墙钟超时和 RSS 上限，超限时直接杀掉工作进程 (连同它创建的子进程)，
+工作进程执行 N 个任务后回收重建，避免解析库的内存泄漏累积。API 进程本身不受影响。
+"""
+import os
+import sys
+import time
+import signal
+import atexit
+import threading
+import traceback
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+
+from services.metrics import QUEUE_DEPTH
+
+# 单个文件的解析超时 (秒)
+PARTITION_TIMEOUT_SECONDS = float(os.getenv("PARTITION_TIMEOUT_SECONDS", "300"))
+# 工作进程 (含其子进程) 的 RSS 上限 (MB)，0 表示不限制
+PARTITION_MAX_RSS_MB = int(os.getenv("PARTITION_MAX_RSS_MB", "4096"))
+# 工作进程执行多少个任务后回收
+PARTITION_WORKER_MAX_JOBS = int(os.getenv("PARTITION_WORKER_MAX_JOBS", "20"))
+# 同时运行的工作进程数
+PARTITION_SANDBOX_WORKERS = int(os.getenv("PARTITION_SANDBOX_WORKERS", "2"))
+# 监控超时和内存的轮询间隔 (秒)
+WATCH_INTERVAL_SECONDS = 0.2
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class PartitionError(Exception):
+    """
+    沙箱中的解析失败
+
+    error_type 取值: timeout (超时)、memory (超出内存上限)、crash (工作进程异常退出)、error (解析抛出异常)、
+    limit (文件解压后超出快速提取的大小上限)
+    """
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"success": False, "error": self.message, "error_type": self.error_type}
+
+
+def _worker_main(conn):
+    """工作进程主循环：逐个接收 (函数, 参数) 并返回结果，收到 None 时退出"""
+    if hasattr(os, "setpgrp"):
+        # 独立进程组，超限时可以连同解析库创建的子进程一起杀掉
+        os.setpgrp()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        func, args = job
+        try:
+            conn.send(("ok", func(*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+
+def process_group_rss(pid: int) -> Optional[int]:
+    """
+    统计进程组的常驻内存 (仅 Linux，读取 /proc)
+
+    Args:
+        pid: 进程组 ID (即工作进程 PID)
+
+    Returns:
+        Optional[int]: RSS 字节数，无法读取时返回 None
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # comm 字段可能含空格，从最后一个右括号之后解析: state ppid pgrp ...
+                fields = f.read().rsplit(b")", 1)[1].split()
+            if int(fields[2]) != pid:
+                continue
+            with open(f"/proc/{entry}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class _SandboxWorker:
+    """一个沙箱工作进程及其任务计数"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        # 非守护进程：PDF 并行解析需要在工作进程中再创建进程池
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=False)
+        self.process.start()
+        child_conn.close()
+        self.job_count = 0
+
+    def kill(self):
+        """杀掉工作进程及其进程组"""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (OSError, ProcessLookupError):
+            pass
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        """通知工作进程正常退出"""
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class PartitionSandbox:
+    """
+    解析沙箱：工作进程池，每个任务有超时和内存上限
+
+    run() 阻塞直到拿到空闲工作进程，在其中执行函数并监控耗时和内存；
+    函数及参数需可被子进程导入和 pickle (工作进程以 spawn 方式启动)。
+    """
+
+    def __init__(self, max_workers: int = PARTITION_SANDBOX_WORKERS,
+                 timeout: float = PARTITION_TIMEOUT_SECONDS,
+                 max_rss_mb: int = PARTITION_MAX_RSS_MB,
+                 max_jobs_per_worker: int = PARTITION_WORKER_MAX_JOBS):
+        """
+        初始化解析沙箱
+
+        Args:
+            max_workers: 同时运行的工作进程数
+            timeout: 单个任务的超时 (秒)
+            max_rss_mb: 工作进程组的 RSS 上限 (MB)，0 表示不限制
+            max_jobs_per_worker: 工作进程执行多少个任务后回收
+        """
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._idle: List[_SandboxWorker] = []
+        self._closed = False
+        self.stats_counts = {"completed": 0, "error": 0, "timeout": 0, "memory": 0, "crash": 0, "recycled": 0}
+        atexit.register(self.close)
+
+    def _acquire_worker(self) -> _SandboxWorker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _SandboxWorker(self._context)
+
+    def _release_worker(self, worker: _SandboxWorker):
+        worker.job_count += 1
+        if worker.job_count >= self.max_jobs_per_worker or self._closed:
+            worker.stop()
+            with self._lock:
+                self.stats_counts["recycled"] += 1
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats_counts[key] += 1
+
+    def run(self, func: Callable, *args) -> Any:
+        """
+        在工作进程中执行 func(*args)
+
+        Args:
+            func: 模块级函数
+            *args: 参数
+
+        Returns:
+            Any: 函数返回值
+
+        Raises:
+            PartitionError: 超时、超出内存、工作进程崩溃或函数抛出异常
+        """
+        # 等待空闲工作进程的任务计入队列深度
+        QUEUE_DEPTH.inc(queue="partition_sandbox")
+        with self._slots:
+            QUEUE_DEPTH.dec(queue="partition_sandbox")
+            worker = self._acquire_worker()
+            try:
+                worker.conn.send((func, args))
+                start_time = time.time()
+                while not worker.conn.poll(WATCH_INTERVAL_SECONDS):
+                    if not worker.process.is_alive():
+                        raise PartitionError("crash", f"解析进程异常退出 (退出码 {worker.process.exitcode})")
+                    elapsed = time.time() - start_time
+                    if elapsed > self.timeout:
+                        raise PartitionError("timeout", f"解析超时 (超过 {self.timeout:.0f} 秒)")
+                    if self.max_rss_bytes:
+                        rss = process_group_rss(worker.process.pid)
+                        if rss is not None and rss > self.max_rss_bytes:
+                            raise PartitionError(
+                                "memory", f"解析内存超出上限 ({rss // (1024 * 1024)} MB > {self.max_rss_bytes // (1024 * 1024)} MB)"
+                            )
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    raise PartitionError("crash", f"解析进程异常退出 (退出码 {worker.process.exitcode})")
+            except PartitionError as e:
+                worker.kill()
+                self._count(e.error_type)
+                raise
+            except BaseException:
+                worker.kill()
+                raise
+
+            self._release_worker(worker)
+            if message[0] == "ok":
+                self._count("completed")
+                return message[1]
+            self._count("error")
+            print(f"沙箱解析出错: {message[2]}", file=sys.stderr)
+            raise PartitionError("error", f"解析失败: {message[1]}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        沙箱统计信息
+
+        Returns:
+            Dict: 各类结果的任务数、回收次数、空闲工作进程数和限制配置
+        """
+        with self._lock:
+            return {
+                **self.stats_counts,
+                "idle_workers": len(self._idle),
+                "timeout_seconds": self.timeout,
+                "max_rss_mb": self.max_rss_bytes // (1024 * 1024),
+                "max_jobs_per_worker": self.max_jobs_per_worker
+            }
+
+    def close(self):
+        """停止所有空闲工作进程"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
@@ -0,0 +1,295 @@
+"""
+PDF 解析模块：文本层预扫描选择解析策略，以及按页范围拆分后在进程池中并行解析。
+
+有文本层的页面直接用 fast 策略提取，只有纯图片页面才走 OCR / hi_res；
+unstructured 对单个 PDF 的解析只能使用一个 CPU 核，大文件拆成若干页范围分别解析，
+再按页序合并结果，墙钟时间随进程数近似线性下降。
+"""
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+# 页数不少于该值的 PDF 才拆分并行解析
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+# 每个解析任务的页数
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "10"))
+# 并行解析的进程数
+PDF_PARTITION_WORKERS = int(os.getenv("PDF_PARTITION_WORKERS", str(os.cpu_count() or 1)))
+
+# 有文本层的页面使用的策略，以及纯图片页面使用的策略 (OCR / 版面分析)
+PDF_TEXT_STRATEGY = "fast"
+PDF_IMAGE_STRATEGY = os.getenv("PDF_IMAGE_STRATEGY", "hi_res")
+# 页面可提取的非空白字符数达到该值才视为有文本层 (排除只有页码、页眉的扫描页)
+PDF_TEXT_MIN_CHARS = 20
+# 预扫描时均匀抽样的页数；抽样结果不一致时再逐页扫描
+PDF_TEXT_SCAN_SAMPLES = 8
+# 估算节省时间用的 hi_res 每页耗时 (秒)
+PDF_HI_RES_SECONDS_PER_PAGE = float(os.getenv("PDF_HI_RES_SECONDS_PER_PAGE", "3.0"))
+
+# 页范围计划: [(起始页下标, 结束页下标 (不含), 解析策略)]
+PagePlan = List[Tuple[int, int, str]]
+
+
+def pdf_strategy_key() -> str:
+    """
+    PDF 解析结果所依赖的策略设置，作为解析缓存键中的策略部分
+
+    页范围计划由文件内容和这些设置共同决定，设置变化后旧的缓存结果不再命中。
+
+    Returns:
+        str: 策略设置的描述
+    """
+    return f"pdf-plan:{PDF_TEXT_STRATEGY}:{PDF_IMAGE_STRATEGY}:{PDF_TEXT_MIN_CHARS}:{PDF_TEXT_SCAN_SAMPLES}"
+
+
+def is_pdf(path: str) -> bool:
+    """根据扩展名判断是否为 PDF 文件"""
+    return path.lower().endswith(".pdf")
+
+
+def count_pdf_pages(path: str) -> int:
+    """
+    获取 PDF 页数 (只读取页面树，不解析页面内容)
+
+    Args:
+        path: PDF 文件路径
+
+    Returns:
+        int: 页数
+    """
+    return len(PdfReader(path).pages)
+
+
+def should_partition_in_parallel(page_count: int, min_pages: Optional[int] = None,
+                                 max_workers: Optional[int] = None) -> bool:
+    """
+    判断是否值得拆分并行解析
+
+    Args:
+        page_count: PDF 页数
+        min_pages: 拆分的最小页数，默认为 PDF_PARALLEL_MIN_PAGES
+        max_workers: 进程数，默认为 PDF_PARTITION_WORKERS
+
+    Returns:
+        bool: 页数达到阈值且可用进程数大于 1 时返回 True
+    """
+    min_pages = PDF_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+    max_workers = PDF_PARTITION_WORKERS if max_workers is None else max_workers
+    return max_workers > 1 and page_count >= min_pages
+
+
+def page_has_text(page) -> bool:
+    """
+    判断页面是否有可提取的文本层
+
+    Args:
+        page: pypdf 页面对象
+
+    Returns:
+        bool: 可提取的非空白字符数达到 PDF_TEXT_MIN_CHARS 时返回 True
+    """
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        return False
+    return sum(1 for ch in text if not ch.isspace()) >= PDF_TEXT_MIN_CHARS
+
+
+def plan_pdf_strategy(path: str, samples: int = PDF_TEXT_SCAN_SAMPLES) -> Dict[str, Any]:
+    """
+    预扫描 PDF 的文本层，为每个页范围选择解析策略
+
+    先均匀抽样若干页：全部有文本层时整份文档使用 fast 策略，全部没有时整份使用 hi_res；
+    结果不一致 (混合文档) 时逐页扫描，连续的同类页面合并为一个页范围。
+
+    Args:
+        path: PDF 文件路径
+        samples: 抽样页数
+
+    Returns:
+        Dict: 扫描结果，其中 plan 为 [(起始页下标, 结束页下标, 策略)]
+    """
+    start_time = time.time()
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    if page_count == 0:
+        return {"page_count": 0, "scanned_page_count": 0, "strategy": PDF_TEXT_STRATEGY,
+                "text_page_count": 0, "image_page_count": 0, "plan": [], "scan_seconds": 0.0}
+
+    sample_indices = sorted({round(i * (page_count - 1) / max(samples - 1, 1)) for i in range(min(samples, page_count))})
+    sampled = {i: page_has_text(reader.pages[i]) for i in sample_indices}
+    if all(sampled.values()):
+        flags = [True] * page_count
+    elif not any(sampled.values()):
+        flags = [False] * page_count
+    else:
+        flags = [sampled[i] if i in sampled else page_has_text(reader.pages[i]) for i in range(page_count)]
+    scanned_page_count = page_count if len(set(sampled.values())) > 1 else len(sample_indices)
+
+    plan = []
+    for index, has_text in enumerate(flags):
+        strategy = PDF_TEXT_STRATEGY if has_text else PDF_IMAGE_STRATEGY
+        if plan and plan[-1][2] == strategy:
+            plan[-1] = (plan[-1][0], index + 1, strategy)
+        else:
+            plan.append((index, index + 1, strategy))
+
+    text_page_count = sum(flags)
+    return {
+        "page_count": page_count,
+        "scanned_page_count": scanned_page_count,
+        "strategy": plan[0][2] if len(plan) == 1 else "mixed",
+        "text_page_count": text_page_count,
+        "image_page_count": page_count - text_page_count,
+        "plan": plan,
+        "scan_seconds": round(time.time() - start_time, 3)
+    }
+
+
+def split_pdf(path: str, output_folder: str, pages_per_task: int,
+              plan: Optional[PagePlan] = None) -> List[Tuple[int, str, str]]:
+    """
+    把 PDF 按页范围拆分为多个文件
+
+    Args:
+        path: PDF 文件路径
+        output_folder: 拆分文件的输出目录
+        pages_per_task: 每个文件的最大页数
+        plan: 页范围计划，每个页范围再按 pages_per_task 拆分；默认整份文档使用 PDF_TEXT_STRATEGY
+
+    Returns:
+        List[Tuple[int, str, str]]: 按页序排列的 (起始页码, 文件路径, 解析策略) 列表，页码从 1 开始
+    """
+    reader = PdfReader(path)
+    if plan is None:
+        plan = [(0, len(reader.pages), PDF_TEXT_STRATEGY)]
+    parts = []
+    for range_start, range_end, strategy in plan:
+        for start in range(range_start, range_end, pages_per_task):
+            writer = PdfWriter()
+            for page_index in range(start, min(start + pages_per_task, range_end)):
+                writer.add_page(reader.pages[page_index])
+            part_path = os.path.join(output_folder, f"pages_{start + 1:06d}.pdf")
+            with open(part_path, "wb") as f:
+                writer.write(f)
+            parts.append((start + 1, part_path, strategy))
+    return parts
+
+
+def partition_to_texts(path: str, strategy: str) -> List[str]:
+    """
+    使用 unstructured 解析文件，返回各元素的文本
+
+    Args:
+        path: 文件路径
+        strategy: unstructured 解析策略
+
+    Returns:
+        List[str]: 元素文本列表
+    """
+    # 在子进程中按需导入，主进程不必为拆分任务加载 unstructured 的 PDF 依赖
+    from unstructured.partition.auto import partition
+    return [str(element) for element in partition(filename=path, strategy=strategy)]
+
+
+def _run_partition_task(partition_func: Callable[[str, str], List[str]], path: str,
+                        strategy: str) -> Tuple[List[str], float]:
+    """解析一个页范围文件，返回文本和耗时"""
+    start_time = time.time()
+    texts = partition_func(path, strategy)
+    return texts, time.time() - start_time
+
+
+def partition_pdf_plan(
+    path: str,
+    plan: PagePlan,
+    max_workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+    partition_func: Callable[[str, str], List[str]] = partition_to_texts
+) -> Tuple[List[str], Dict[str, float]]:
+    """
+    按页范围计划拆分 PDF，每个页范围使用各自的策略解析，结果按页序合并
+
+    max_workers 大于 1 时在进程池中并行解析 (子进程使用 spawn 方式启动，
+    避免在多线程的 Web 服务进程中 fork)，否则在当前进程中依次解析。
+
+    Args:
+        path: PDF 文件路径
+        plan: 页范围计划 [(起始页下标, 结束页下标, 策略)]
+        max_workers: 进程数，默认为 PDF_PARTITION_WORKERS
+        pages_per_task: 每个解析任务的页数，默认为 PDF_PAGES_PER_TASK
+        partition_func: 解析单个页范围文件的函数 (需可被子进程导入)
+
+    Returns:
+        Tuple[List[str], Dict[str, float]]: 按页序排列的元素文本列表，以及各策略的解析耗时 (秒)
+    """
+    max_workers = max_workers or PDF_PARTITION_WORKERS
+    pages_per_task = pages_per_task or PDF_PAGES_PER_TASK
+
+    temp_folder = tempfile.mkdtemp(prefix="pdf_partition_")
+    try:
+        parts = split_pdf(path, temp_folder, pages_per_task, plan)
+        part_paths = [part_path for _, part_path, _ in parts]
+        strategies = [strategy for _, _, strategy in parts]
+        funcs = [partition_func] * len(parts)
+        if max_workers > 1 and len(parts) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(parts)),
+                mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                # map 按提交顺序返回结果，即按页序合并
+                results = list(executor.map(_run_partition_task, funcs, part_paths, strategies))
+        else:
+            results = list(map(_run_partition_task, funcs, part_paths, strategies))
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+    seconds_by_strategy = {}
+    for strategy, (_, seconds) in zip(strategies, results):
+        seconds_by_strategy[strategy] = seconds_by_strategy.get(strategy, 0.0) + seconds
+    return [text for texts, _ in results for text in texts], seconds_by_strategy
+
+
+def partition_pdf_parallel(
+    path: str,
+    strategy: str,
+    max_workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+    partition_func: Callable[[str, str], List[str]] = partition_to_texts
+) -> List[str]:
+    """
+    整份 PDF 使用同一策略，按页范围拆分后在进程池中并行解析，结果按页序合并
+
+    Args:
+        path: PDF 文件路径
+        strategy: unstructured 解析策略
+        max_workers: 进程数，默认为 PDF_PARTITION_WORKERS
+        pages_per_task: 每个解析任务的页数，默认为 PDF_PAGES_PER_TASK
+        partition_func: 解析单个页范围文件的函数 (需可被子进程导入)
+
+    Returns:
+        List[str]: 按页序排列的元素文本列表
+    """
+    plan = [(0, count_pdf_pages(path), strategy)]
+    texts, _ = partition_pdf_plan(path, plan, max_workers, pages_per_task, partition_func)
+    return texts
+
+
+def estimate_seconds_saved(text_page_count: int, text_seconds: float) -> float:
+    """
+    估算文本层页面改用 fast 策略节省的时间
+
+    Args:
+        text_page_count: 使用 fast 策略的页数
+        text_seconds: 这些页面的实际解析耗时
+
+    Returns:
+        float: 按 PDF_HI_RES_SECONDS_PER_PAGE 估算的 hi_res 耗时减去实际耗时
+    """
+    return round(max(0.0, text_page_count * PDF_HI_RES_SECONDS_PER_PAGE - text_seconds), 2)
@@ -0,0 +1,251 @@
+"""
+请求级性能剖析模块，对带调试请求头或被抽样选中的请求运行 cProfile，并把结果保存到 log/profiles。
+
+未开启时不注册任何请求钩子，对请求没有额外开销。开启后 (REQUEST_PROFILING=1) 带 X-Debug-Profile: 1
+请求头的请求一定剖析，其余请求按 PROFILE_SAMPLE_RATE 抽样。同一时间只剖析一个请求：
+cProfile 的开销会拖慢并发的其他请求，Python 3.12 起也不允许多个线程同时启用 cProfile。
+每份剖析保存为 <id>.prof (pstats 格式，可用 snakeviz 等工具查看) 和 <id>.json (路由、参数、耗时)。
+"""
+import os
+import re
+import json
+import time
+import random
+import pstats
+import cProfile
+import datetime
+import threading
+from io import StringIO
+from typing import Any, Dict, List, Optional
+
+PROFILE_HEADER = "X-Debug-Profile"
+PROFILE_FOLDER = os.path.join('log', 'profiles')
+# 是否开启剖析 (开启后请求头才生效)
+PROFILING_ENABLED = os.getenv("REQUEST_PROFILING", "0") == "1"
+# 没有请求头的请求被抽样剖析的比例
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# 最多保留的剖析份数，超出时删除最旧的
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+# 参数中过长的字符串截断保存
+MAX_PARAM_LENGTH = 200
+# 文本摘要允许的排序字段
+PROFILE_SORT_KEYS = tuple(key.value for key in pstats.SortKey)
+
+_PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{12}_[0-9a-f]{6}_[A-Za-z0-9_.-]+$')
+
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + "..."
+    if isinstance(value, list):
+        return [_truncate(item) for item in value[:20]]
+    if isinstance(value, dict):
+        return {key: _truncate(item) for key, item in list(value.items())[:50]}
+    return value
+
+
+class RequestProfiler:
+    """按请求头或抽样率剖析请求，并管理保存的剖析文件"""
+
+    def __init__(self, folder: str = PROFILE_FOLDER, enabled: bool = PROFILING_ENABLED,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, max_files: int = PROFILE_MAX_FILES):
+        """
+        初始化剖析器
+
+        Args:
+            folder: 剖析文件目录
+            enabled: 是否开启
+            sample_rate: 抽样比例 (0 到 1)
+            max_files: 最多保留的剖析份数
+        """
+        self.folder = folder
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._active = threading.Lock()
+        self.skipped_busy = 0
+
+    def init_app(self, app):
+        """
+        为 Flask 应用注册剖析钩子；未开启时不注册
+
+        Args:
+            app: Flask 应用
+        """
+        if not self.enabled:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        from flask import g, request
+
+        @app.before_request
+        def _start_profile():
+            if not self.should_profile(request.headers.get(PROFILE_HEADER)):
+                return
+            if not self._active.acquire(blocking=False):
+                # 已有请求正在剖析
+                self.skipped_busy += 1
+                return
+            profiler = cProfile.Profile()
+            g.profile = (profiler, time.perf_counter())
+            profiler.enable()
+
+        @app.after_request
+        def _save_profile(response):
+            profile = g.pop("profile", None)
+            if profile is None:
+                return response
+            profiler, start_time = profile
+            profiler.disable()
+            try:
+                profile_id = self.save(profiler, time.perf_counter() - start_time, request, response.status_code)
+                response.headers["X-Profile-Id"] = profile_id
+            finally:
+                self._active.release()
+            return response
+
+        @app.teardown_request
+        def _discard_profile(exception=None):
+            # 请求异常中止、没有经过 after_request 时释放剖析锁
+            profile = g.pop("profile", None)
+            if profile is not None:
+                profile[0].disable()
+                self._active.release()
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        """
+        判断请求是否需要剖析
+
+        Args:
+            header_value: X-Debug-Profile 请求头的值
+
+        Returns:
+            bool: 请求头为 1/true 或被抽样选中时为 True
+        """
+        if header_value is not None and header_value.lower() in ("1", "true", "yes"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, profiler: cProfile.Profile, seconds: float, request, status: int) -> str:
+        """
+        保存剖析结果和请求信息
+
+        Args:
+            profiler: 已停止的 cProfile.Profile
+            seconds: 请求耗时
+            request: Flask 请求
+            status: 响应状态码
+
+        Returns:
+            str: 剖析 ID
+        """
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        route_name = re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or "root"
+        now = datetime.datetime.now()
+        # 以微秒时间开头，按 ID 排序即按时间排序
+        profile_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}_{os.urandom(3).hex()}_{request.method}_{route_name}"
+
+        profiler.dump_stats(os.path.join(self.folder, f"{profile_id}.prof"))
+        body = request.get_json(silent=True) if request.is_json else None
+        info = {
+            "profile_id": profile_id,
+            "time": now.isoformat(),
+            "method": request.method,
+            "route": rule,
+            "path": request.path,
+            "args": _truncate(request.args.to_dict()),
+            "form": _truncate(request.form.to_dict()),
+            "files": [file.filename for file in request.files.values()],
+            "json": _truncate(body) if isinstance(body, dict) else None,
+            "status": status,
+            "duration_seconds": round(seconds, 4),
+            "sampled": request.headers.get(PROFILE_HEADER) is None
+        }
+        with open(os.path.join(self.folder, f"{profile_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        """删除超出保留份数的最旧剖析"""
+        profiles = self.list_profiles()
+        for info in profiles[self.max_files:]:
+            for extension in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.folder, info["profile_id"] + extension))
+                except OSError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """
+        列出保存的剖析，最新的在前
+
+        Returns:
+            List[Dict]: 每份剖析的请求信息
+        """
+        if not os.path.isdir(self.folder):
+            return []
+        profiles = []
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, filename), 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda info: info.get("profile_id", ""), reverse=True)
+
+    def profile_path(self, profile_id: str) -> Optional[str]:
+        """
+        剖析 ID 对应的 .prof 文件路径
+
+        Args:
+            profile_id: 剖析 ID
+
+        Returns:
+            Optional[str]: 文件路径；ID 无效或文件不存在时返回 None
+        """
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.folder, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id: str, sort: str = "cumulative", limit: int = 40) -> Optional[str]:
+        """
+        剖析结果的文本摘要 (pstats 输出)
+
+        Args:
+            profile_id: 剖析 ID
+            sort: 排序字段，取值见 PROFILE_SORT_KEYS (cumulative、time、calls 等)
+            limit: 输出的函数数
+
+        Returns:
+            Optional[str]: 摘要文本；剖析不存在时返回 None
+
+        Raises:
+            ValueError: 排序字段无效
+        """
+        if sort not in PROFILE_SORT_KEYS:
+            raise ValueError(f"无效的排序字段: {sort}，可选值: {', '.join(PROFILE_SORT_KEYS)}")
+        path = self.profile_path(profile_id)
+        if path is None:
+            return None
+        output = StringIO()
+        pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        剖析配置和保存的份数
+
+        Returns:
+            Dict: 是否开启、抽样比例、保存份数和因已有剖析进行中而跳过的请求数
+        """
+        return {
+            "enabled": self.enabled,
+            "header": PROFILE_HEADER,
+            "sample_rate": self.sample_rate,
+            "profile_count": len(self.list_profiles()),
+            "max_files": self.max_files,
+            "skipped_busy": self.skipped_busy
+        }
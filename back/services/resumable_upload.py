@@ -0,0 +1,318 @@
+"""
+可续传分片上传模块，用于在不稳定的网络上上传几百 MB 的扫描 PDF。
+
+协议: 创建上传会话 -> 按编号上传分片 (可并发、可重传) -> 查询已收到的字节范围 -> 完成。
+会话创建时在上传目录中预分配目标文件，每个分片按偏移量直接写入，并用 SHA-256 校验；
+每个已收到的分片记录为会话目录中的一个标记文件，多个进程同时写入同一会话也不会丢失记录。
+完成后文件重命名到上传目录，交给 FileProcessor 的正常解析流程。
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from services.upload_stream import EXTENSION_SIGNATURES, SNIFF_BYTES, sniff_type
+
+# 可续传上传的单文件大小上限
+MAX_RESUMABLE_FILE_BYTES = int(os.getenv("MAX_RESUMABLE_FILE_MB", "2048")) * 1024 * 1024
+# 默认分片大小
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+# 允许的分片大小范围 (分片大小不能超过请求体上限)
+MIN_PART_SIZE = 256 * 1024
+MAX_PART_SIZE = 64 * 1024 * 1024
+# 未完成的会话保留时长 (小时)
+RESUMABLE_UPLOAD_TTL_HOURS = float(os.getenv("RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+# 读取请求体和计算哈希时的块大小
+COPY_BLOCK_SIZE = 1024 * 1024
+
+SESSION_FOLDER_NAME = ".resumable"
+SESSION_FILE = "session.json"
+DATA_FILE = "data"
+PART_PREFIX = "part_"
+
+
+class ResumableUploadError(Exception):
+    """可续传上传的请求错误，status 为对应的 HTTP 状态码"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[List[int]]:
+    """
+    合并相邻或重叠的字节范围
+
+    Args:
+        ranges: [(起始偏移, 结束偏移 (不含))]
+
+    Returns:
+        List[List[int]]: 按起始偏移排序的合并结果
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class ResumableUploadManager:
+    """
+    可续传上传会话管理器
+
+    会话目录: <上传目录>/.resumable/<upload_id>/，包含 session.json、预分配的 data 文件
+    和每个已收到分片的标记文件 part_<编号> (内容为分片的 SHA-256)。
+    """
+
+    def __init__(self, upload_folder: str, ttl_hours: float = RESUMABLE_UPLOAD_TTL_HOURS):
+        """
+        初始化会话管理器
+
+        Args:
+            upload_folder: 上传目录 (完成的文件重命名到这里，会话目录也在其中，保证同一文件系统)
+            ttl_hours: 未完成会话的保留时长
+        """
+        self.upload_folder = upload_folder
+        self.session_folder = os.path.join(upload_folder, SESSION_FOLDER_NAME)
+        self.ttl_seconds = ttl_hours * 3600
+        os.makedirs(self.session_folder, exist_ok=True)
+
+    def _session_dir(self, upload_id: str) -> str:
+        # upload_id 来自 URL，只接受 uuid 十六进制字符串，防止路径穿越
+        if not (len(upload_id) == 32 and all(c in "0123456789abcdef" for c in upload_id)):
+            raise ResumableUploadError(f"无效的上传ID: {upload_id}", 404)
+        session_dir = os.path.join(self.session_folder, upload_id)
+        if not os.path.isdir(session_dir):
+            raise ResumableUploadError(f"上传会话不存在或已过期: {upload_id}", 404)
+        return session_dir
+
+    def _load_session(self, upload_id: str) -> Tuple[str, Dict[str, Any]]:
+        session_dir = self._session_dir(upload_id)
+        with open(os.path.join(session_dir, SESSION_FILE), 'r', encoding='utf-8') as f:
+            return session_dir, json.load(f)
+
+    def _received_parts(self, session_dir: str) -> Dict[int, str]:
+        parts = {}
+        for name in os.listdir(session_dir):
+            if name.startswith(PART_PREFIX):
+                with open(os.path.join(session_dir, name), 'r', encoding='utf-8') as f:
+                    parts[int(name[len(PART_PREFIX):])] = f.read().strip()
+        return parts
+
+    def cleanup_expired(self) -> int:
+        """
+        删除超过保留时长的未完成会话
+
+        Returns:
+            int: 删除的会话数
+        """
+        removed = 0
+        deadline = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.session_folder):
+            if entry.is_dir() and entry.stat().st_mtime < deadline:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def initiate(self, filename: str, total_size: int, file_type: str,
+                 part_size: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        创建上传会话并预分配目标文件
+
+        Args:
+            filename: 原始文件名
+            total_size: 文件总字节数
+            file_type: 文件类型 (来自前端选择)
+            part_size: 分片大小，默认为 DEFAULT_PART_SIZE
+            sha256: 整个文件的 SHA-256 (可选)，完成时校验
+
+        Returns:
+            Dict: 会话信息，包含 upload_id、part_size 和 part_count
+
+        Raises:
+            ResumableUploadError: 参数无效、类型不允许或文件过大
+        """
+        if not filename or '/' in filename or '\\' in filename or '..' in filename:
+            raise ResumableUploadError(f"检测到不安全或无效的文件名: {filename}")
+        if os.path.splitext(filename)[1].lower() not in EXTENSION_SIGNATURES:
+            raise ResumableUploadError(f"不支持的文件类型: {filename}", 415)
+        if not isinstance(total_size, int) or total_size <= 0:
+            raise ResumableUploadError("totalSize 必须是正整数")
+        if total_size > MAX_RESUMABLE_FILE_BYTES:
+            raise ResumableUploadError(
+                f"文件超过大小上限 {MAX_RESUMABLE_FILE_BYTES // (1024 * 1024)} MB", 413
+            )
+        part_size = part_size or DEFAULT_PART_SIZE
+        if not isinstance(part_size, int) or not MIN_PART_SIZE <= part_size <= MAX_PART_SIZE:
+            raise ResumableUploadError(f"partSize 必须在 [{MIN_PART_SIZE}, {MAX_PART_SIZE}] 范围内")
+
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        session_dir = os.path.join(self.session_folder, upload_id)
+        os.makedirs(session_dir)
+
+        data_path = os.path.join(session_dir, DATA_FILE)
+        with open(data_path, 'wb') as f:
+            try:
+                # 预先占用磁盘空间，避免上传到一半时磁盘写满
+                os.posix_fallocate(f.fileno(), 0, total_size)
+            except (AttributeError, OSError):
+                f.truncate(total_size)
+
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "file_type": file_type,
+            "total_size": total_size,
+            "part_size": part_size,
+            "part_count": (total_size + part_size - 1) // part_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "created": datetime.datetime.now().isoformat()
+        }
+        with open(os.path.join(session_dir, SESSION_FILE), 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False, indent=2)
+        return session
+
+    def write_part(self, upload_id: str, index: int, stream: BinaryIO, expected_sha256: str) -> Dict[str, Any]:
+        """
+        把一个分片按偏移量写入预分配的文件
+
+        分片可以重传 (覆盖之前的内容)；长度或 SHA-256 不符时不记录该分片。
+
+        Args:
+            upload_id: 上传ID
+            index: 分片编号 (从 0 开始)
+            stream: 分片数据流 (请求体)
+            expected_sha256: 客户端计算的分片 SHA-256
+
+        Returns:
+            Dict: 分片编号、字节数和 SHA-256
+
+        Raises:
+            ResumableUploadError: 编号越界、长度不符、哈希不符或文件头与扩展名不符
+        """
+        session_dir, session = self._load_session(upload_id)
+        if not 0 <= index < session["part_count"]:
+            raise ResumableUploadError(f"分片编号超出范围: {index} (共 {session['part_count']} 个)")
+        if not expected_sha256:
+            raise ResumableUploadError("缺少分片的 SHA-256 (X-Part-SHA256 请求头)")
+
+        offset = index * session["part_size"]
+        expected_length = min(session["part_size"], session["total_size"] - offset)
+        part_marker = os.path.join(session_dir, f"{PART_PREFIX}{index:06d}")
+        if os.path.exists(part_marker):
+            # 重传：先移除旧记录，写入失败时该分片视为未收到
+            os.remove(part_marker)
+
+        sha256 = hashlib.sha256()
+        length = 0
+        with open(os.path.join(session_dir, DATA_FILE), 'r+b') as f:
+            f.seek(offset)
+            for block in iter(lambda: stream.read(COPY_BLOCK_SIZE), b''):
+                if length == 0 and index == 0:
+                    extension = os.path.splitext(session["filename"])[1].lower()
+                    detected_type = sniff_type(block[:SNIFF_BYTES], extension)
+                    if detected_type not in EXTENSION_SIGNATURES[extension]:
+                        raise ResumableUploadError(
+                            f"文件内容 ({detected_type}) 与扩展名 {extension} 不符: {session['filename']}", 415
+                        )
+                length += len(block)
+                if length > expected_length:
+                    raise ResumableUploadError(f"分片 {index} 超过应有长度 {expected_length}")
+                sha256.update(block)
+                f.write(block)
+
+        if length != expected_length:
+            raise ResumableUploadError(f"分片 {index} 长度不符: 收到 {length}，应为 {expected_length}")
+        digest = sha256.hexdigest()
+        if digest != expected_sha256.lower():
+            raise ResumableUploadError(f"分片 {index} 的 SHA-256 校验失败", 409)
+
+        with open(part_marker, 'w', encoding='utf-8') as f:
+            f.write(digest)
+        return {"index": index, "size": length, "sha256": digest}
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """
+        查询会话已收到的分片和字节范围
+
+        Args:
+            upload_id: 上传ID
+
+        Returns:
+            Dict: 会话信息、received_parts、missing_parts、received_ranges 和 received_bytes
+        """
+        session_dir, session = self._load_session(upload_id)
+        received = self._received_parts(session_dir)
+        part_size, total_size = session["part_size"], session["total_size"]
+        ranges = merge_ranges([
+            (index * part_size, min((index + 1) * part_size, total_size)) for index in received
+        ])
+        return {
+            **session,
+            "received_parts": sorted(received),
+            "missing_parts": [index for index in range(session["part_count"]) if index not in received],
+            "received_ranges": ranges,
+            "received_bytes": sum(end - start for start, end in ranges)
+        }
+
+    def complete(self, upload_id: str, target_path: str) -> str:
+        """
+        校验所有分片已收到，把文件移动到目标路径并删除会话
+
+        Args:
+            upload_id: 上传ID
+            target_path: 目标路径 (上传目录中带时间戳的文件名)
+
+        Returns:
+            str: 整个文件的 SHA-256
+
+        Raises:
+            ResumableUploadError: 仍有分片未收到或整个文件的 SHA-256 不符
+        """
+        session_dir, session = self._load_session(upload_id)
+        received = self._received_parts(session_dir)
+        missing = [index for index in range(session["part_count"]) if index not in received]
+        if missing:
+            raise ResumableUploadError(f"还有 {len(missing)} 个分片未上传: {missing[:20]}", 409)
+
+        data_path = os.path.join(session_dir, DATA_FILE)
+        sha256 = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+        if session["sha256"] and digest != session["sha256"]:
+            raise ResumableUploadError("文件的 SHA-256 校验失败", 409)
+
+        os.replace(data_path, target_path)
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return digest
+
+    def abort(self, upload_id: str):
+        """
+        取消上传并删除会话
+
+        Args:
+            upload_id: 上传ID
+        """
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+    def get_session(self, upload_id: str) -> Dict[str, Any]:
+        """
+        获取会话信息
+
+        Args:
+            upload_id: 上传ID
+
+        Returns:
+            Dict: 创建会话时记录的信息
+        """
+        return self._load_session(upload_id)[1]
@@ -0,0 +1,61 @@
+"""
+生产部署配置模块，计算 WSGI 工作进程数和每个进程的 torch 线程数。
+
+多个工作进程各自用满全部 CPU 核做矩阵运算时线程数远超核数，互相抢占反而更慢；
+每个进程的算子线程数取 CPU 核数 / 工作进程数。线程数必须在导入 torch 之前通过环境变量设置，
+因此本模块不导入 torch，可以在 gunicorn 配置文件中使用。
+"""
+import os
+from typing import Optional
+
+# 限制原生线程池大小的环境变量 (OpenMP、MKL、OpenBLAS 以及 HuggingFace tokenizers)
+NATIVE_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def worker_count(cpu_count: Optional[int] = None) -> int:
+    """
+    WSGI 工作进程数，WEB_WORKERS 环境变量优先
+
+    每个进程持有一份解析沙箱和请求线程，进程数默认取 CPU 核数，最多 4 个。
+
+    Args:
+        cpu_count: CPU 核数，默认取本机核数
+
+    Returns:
+        int: 工作进程数
+    """
+    if os.getenv("WEB_WORKERS"):
+        return max(1, int(os.environ["WEB_WORKERS"]))
+    return max(1, min(4, cpu_count or os.cpu_count() or 1))
+
+
+def torch_threads_per_worker(workers: int, cpu_count: Optional[int] = None) -> int:
+    """
+    每个工作进程的 torch 算子线程数，TORCH_NUM_THREADS 环境变量优先
+
+    Args:
+        workers: 工作进程数
+        cpu_count: CPU 核数，默认取本机核数
+
+    Returns:
+        int: 线程数，至少为 1
+    """
+    if os.getenv("TORCH_NUM_THREADS"):
+        return max(1, int(os.environ["TORCH_NUM_THREADS"]))
+    return max(1, (cpu_count or os.cpu_count() or 1) // max(1, workers))
+
+
+def limit_native_threads(num_threads: int):
+    """
+    通过环境变量限制原生线程池大小，必须在导入 torch/numpy 之前调用
+
+    已经显式设置的环境变量不覆盖。
+
+    Args:
+        num_threads: 线程数
+    """
+    os.environ.setdefault("TORCH_NUM_THREADS", str(num_threads))
+    for name in NATIVE_THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(num_threads))
+    # tokenizers 的 Rust 线程池在 fork 之后不可用，由 torch 线程负责并行
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
@@ -0,0 +1,311 @@
+"""
+原生文本切分模块，对中文及中英混合文本做单遍流式的句子切分和按大小打包。
+
+切分过程不复制文本，只产生 (start, end) 字符偏移，可直接用于 chunk 产物的偏移存储。
+"""
+import re
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 句子边界：中英文句末标点 (可带结尾引号/括号)、后跟空白的英文句点、换行之前的位置；
+# 分组 1 匹配边界后的空白，m.start(1) 为句子结尾，m.end() 为下一句开头。
+# 换行边界只在空白段的第一个位置尝试 (前一个字符不是空白)：否则不含换行的长空白段中
+# 每个位置都要向后扫描整段，耗时随空白段长度平方增长
+SENTENCE_BOUNDARY_RE = re.compile(
+    r'(?:[。！？；!?;…]+[”’」』）)】"\']*'
+    r'|\.(?=\s)'
+    r'|(?<!\s)(?=[^\S\n]*\n))'
+    r'(\s*)'
+)
+_LEADING_SPACE_RE = re.compile(r'\s*')
+
+# 流式读取时每次处理的文本片段大小
+DEFAULT_PIECE_SIZE = 64 * 1024
+
+Span = Tuple[int, int]
+
+
+def iter_text_pieces(text: str, piece_size: int = DEFAULT_PIECE_SIZE) -> Iterator[str]:
+    """
+    把长字符串拆成固定大小的片段，模拟文本流
+
+    Args:
+        text: 文本
+        piece_size: 每个片段的字符数
+
+    Yields:
+        str: 文本片段
+    """
+    for i in range(0, len(text), piece_size):
+        yield text[i:i + piece_size]
+
+
+def iter_sentence_spans(stream: Union[str, Iterable[str]], max_length: Optional[int] = None) -> Iterator[Span]:
+    """
+    单遍扫描文本流，按句子边界产生句子的字符偏移
+
+    片段末尾的边界可能被下一个片段延伸 (如连续标点、结尾引号、空白)，因此只确认
+    不在缓冲区末尾的边界；未结束的句子留到下一个片段一起处理。
+
+    Args:
+        stream: 文本或文本片段的可迭代对象
+        max_length: 句子最大长度，超过时在该位置强制切开，保证缓冲区大小有界
+
+    Yields:
+        Tuple[int, int]: 句子在全文中的 (start, end) 偏移，不含首尾空白
+    """
+    if isinstance(stream, str):
+        stream = [stream]
+
+    def trimmed(start, end):
+        # 强制切开的片段和最后一句可能带首尾空白，只含空白时不产生句子
+        text = buffer[start:end]
+        stripped = text.strip()
+        if not stripped:
+            return None
+        start += len(text) - len(text.lstrip())
+        return buffer_offset + start, buffer_offset + start + len(stripped)
+
+    buffer = ""
+    buffer_offset = 0  # buffer[0] 在全文中的位置
+
+    for piece in stream:
+        buffer += piece
+        sentence_start = _LEADING_SPACE_RE.match(buffer).end()
+        buffer_end = len(buffer)
+        for match in SENTENCE_BOUNDARY_RE.finditer(buffer, sentence_start):
+            next_start = match.end()
+            if next_start == buffer_end:
+                break
+            sentence_end = match.start(1)
+            if sentence_end > sentence_start:
+                yield buffer_offset + sentence_start, buffer_offset + sentence_end
+            sentence_start = next_start
+
+        # 没有边界的超长句子，强制切开
+        if max_length:
+            while buffer_end - sentence_start > max_length:
+                span = trimmed(sentence_start, sentence_start + max_length)
+                if span is not None:
+                    yield span
+                sentence_start += max_length
+
+        buffer = buffer[sentence_start:]
+        buffer_offset += sentence_start
+
+    # 最后一个片段：缓冲区末尾的边界也可以确认
+    sentence_start = _LEADING_SPACE_RE.match(buffer).end()
+    for match in SENTENCE_BOUNDARY_RE.finditer(buffer, sentence_start):
+        sentence_end = match.start(1)
+        if sentence_end > sentence_start:
+            yield buffer_offset + sentence_start, buffer_offset + sentence_end
+        sentence_start = match.end()
+    span = trimmed(sentence_start, len(buffer))
+    if span is not None:
+        yield span
+
+
+def split_span(span: Span, max_size: int) -> Iterator[Span]:
+    """按字符数把过长的句子硬切为不超过 max_size 的片段"""
+    start, end = span
+    while end - start > max_size:
+        yield start, start + max_size
+        start += max_size
+    yield start, end
+
+
+def span_length(start: int, end: int) -> int:
+    """默认的长度度量：字符数"""
+    return end - start
+
+
+def pack_spans(
+    spans: Iterable[Span],
+    chunk_size: int,
+    chunk_overlap: int = 0,
+    measure: Callable[[int, int], int] = span_length,
+    split: Callable[[Span, int], Iterable[Span]] = split_span
+) -> Iterator[Span]:
+    """
+    把连续的句子偏移贪心打包为不超过 chunk_size 的 chunk
+
+    相邻 chunk 之间保留末尾若干完整句子作为重叠，重叠总长度不超过 chunk_overlap；
+    单个句子超过 chunk_size 时由 split 硬切。
+
+    Args:
+        spans: 按顺序排列的句子偏移
+        chunk_size: chunk 最大长度
+        chunk_overlap: 相邻 chunk 最大重叠长度
+        measure: 计算 [start, end) 区间长度的函数，默认按字符数，也可以按 token 数
+        split: 把超长句子切为不超过指定长度的片段的函数
+
+    Yields:
+        Tuple[int, int]: chunk 在全文中的 (start, end) 偏移
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size 必须大于 0: {chunk_size}")
+    if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap 必须在 [0, chunk_size) 范围内: {chunk_overlap}")
+
+    current = deque()  # 当前 chunk 中的句子
+
+    for span in spans:
+        for sentence in split(span, chunk_size):
+            if current and measure(current[0][0], sentence[1]) > chunk_size:
+                yield current[0][0], current[-1][1]
+                # 从末尾保留句子作为重叠，同时保证加入新句子后不超过 chunk_size
+                chunk_end = current[-1][1]
+                while current and (measure(current[0][0], chunk_end) > chunk_overlap
+                                   or measure(current[0][0], sentence[1]) > chunk_size):
+                    current.popleft()
+            current.append(sentence)
+
+    if current:
+        yield current[0][0], current[-1][1]
+
+
+class TokenOffsets:
+    """
+    文档的 token 偏移表
+
+    保存每个 token 在全文中的字符区间，用于按 token 数度量任意字符区间，
+    以及在 token 边界上切分过长的句子。
+    """
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int]):
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def count(self, start: int, end: int) -> int:
+        """区间 [start, end) 内起始的 token 数量"""
+        return bisect_left(self.starts, end) - bisect_left(self.starts, start)
+
+    def split(self, span: Span, max_tokens: int) -> Iterator[Span]:
+        """在 token 边界上把区间切为每段不超过 max_tokens 个 token 的片段"""
+        start, end = span
+        first = bisect_left(self.starts, start)
+        last = bisect_left(self.starts, end)
+        if last - first <= max_tokens:
+            yield start, end
+            return
+        piece_start = start
+        for i in range(first + max_tokens, last, max_tokens):
+            yield piece_start, self.ends[i - 1]
+            piece_start = self.starts[i]
+        yield piece_start, end
+
+
+def build_token_offsets(tokenizer, text: str, piece_chars: int = 2000, batch_size: int = 64) -> TokenOffsets:
+    """
+    用快速分词器对全文做一次分词，得到每个 token 的字符偏移
+
+    全文先在句子边界上拆成不超过 piece_chars 的片段，再按 batch_size 批量送入分词器，
+    片段内的偏移加上片段起点得到全文偏移。
+
+    Args:
+        tokenizer: 支持 return_offsets_mapping 的 HuggingFace 快速分词器
+        text: 全文
+        piece_chars: 每个片段的最大字符数
+        batch_size: 每批分词的片段数
+
+    Returns:
+        TokenOffsets: token 偏移表
+    """
+    starts = array('q')
+    ends = array('q')
+
+    def flush(batch: List[Span]):
+        encoded = tokenizer(
+            [text[s:e] for s, e in batch],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        for (piece_start, _), offsets in zip(batch, encoded["offset_mapping"]):
+            for token_start, token_end in offsets:
+                if token_end > token_start:
+                    starts.append(piece_start + token_start)
+                    ends.append(piece_start + token_end)
+
+    batch = []
+    for piece in pack_spans(iter_sentence_spans(iter_text_pieces(text), max_length=piece_chars), piece_chars):
+        batch.append(piece)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return TokenOffsets(starts, ends)
+
+
+def semantic_groups(
+    spans: Sequence[Span],
+    vectors: np.ndarray,
+    max_size: int,
+    min_size: int = 0,
+    breakpoint_percentile: float = 15.0,
+    measure: Callable[[int, int], int] = span_length
+) -> List[Tuple[int, int]]:
+    """
+    按相邻句子的语义相似度把句子分组为 chunk
+
+    先对句子向量做归一化，一次矩阵运算得到所有相邻句子的余弦相似度；相似度不高于
+    breakpoint_percentile 分位数的位置视为话题转换点。在转换点处且当前 chunk 已达到 min_size
+    时切开；加入下一句会超过 max_size 时无论相似度如何都切开。
+
+    Args:
+        spans: 句子偏移，每个句子都不超过 max_size
+        vectors: 与句子一一对应的向量，形状为 (len(spans), dim)
+        max_size: chunk 最大长度
+        min_size: chunk 最小长度 (文档末尾的 chunk 除外)
+        breakpoint_percentile: 视为转换点的相似度分位数 (0-100)
+        measure: 计算 [start, end) 区间长度的函数
+
+    Returns:
+        List[Tuple[int, int]]: 每个 chunk 包含的句子下标范围 [first, last)
+    """
+    count = len(spans)
+    if count == 0:
+        return []
+    if count == 1:
+        return [(0, 1)]
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized = vectors / np.maximum(norms, 1e-12)
+    similarities = np.einsum('ij,ij->i', normalized[:-1], normalized[1:])
+    threshold = np.percentile(similarities, breakpoint_percentile)
+
+    groups = []
+    first = 0
+    for i in range(count - 1):
+        chunk_start = spans[first][0]
+        if (measure(chunk_start, spans[i + 1][1]) > max_size
+                or (similarities[i] <= threshold and measure(chunk_start, spans[i][1]) >= min_size)):
+            groups.append((first, i + 1))
+            first = i + 1
+    groups.append((first, count))
+    return groups
+
+
+def chunk_spans(stream: Union[str, Iterable[str]], chunk_size: int, chunk_overlap: int = 0) -> Iterator[Span]:
+    """
+    句子切分和打包组合为一次流式处理
+
+    Args:
+        stream: 文本或文本片段的可迭代对象
+        chunk_size: chunk 最大字符数
+        chunk_overlap: 相邻 chunk 最大重叠字符数
+
+    Yields:
+        Tuple[int, int]: chunk 在全文中的 (start, end) 偏移
+    """
+    return pack_spans(iter_sentence_spans(stream, max_length=chunk_size), chunk_size, chunk_overlap)
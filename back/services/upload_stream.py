@@ -0,0 +1,220 @@
+"""
+上传流式写入模块，把 multipart 请求体中的文件按块直接写到上传目录。
+
+werkzeug 默认把上传文件先缓存到内存或临时文件，save() 时再复制一遍；这里替换请求类的文件流工厂，
+请求体解析时每个数据块直接写入上传目录中的临时文件，同时计算 SHA-256、嗅探文件类型并检查大小上限：
+文件头与扩展名不符时在写入任何数据之前返回 415，超出单文件上限时立即返回 413 并删除已写入的部分。
+"""
+import os
+import uuid
+import codecs
+import hashlib
+from typing import Optional
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+from services.fast_extractors import bom_encoding
+
+# 单个上传文件的大小上限
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_MB", "512")) * 1024 * 1024
+# 单个请求 (可能包含多个文件) 的大小上限，设置为 Flask 的 MAX_CONTENT_LENGTH
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_MB", "1024")) * 1024 * 1024
+# 嗅探文件类型前缓存的文件头字节数
+SNIFF_BYTES = 8192
+# 写入中的临时文件后缀
+PARTIAL_SUFFIX = ".uploading"
+
+# 扩展名 -> 允许的文件头类型 (docx/xlsx/pptx 是 zip 包，xls 是 OLE 复合文档；.zip 为批量上传的压缩包)
+EXTENSION_SIGNATURES = {
+    ".pdf": {"pdf"},
+    ".docx": {"zip"},
+    ".xlsx": {"zip"},
+    ".pptx": {"zip"},
+    ".xls": {"ole"},
+    ".txt": {"text"},
+    ".md": {"text"},
+    ".zip": {"zip"},
+}
+# 内容为文本的扩展名
+TEXT_EXTENSIONS = {extension for extension, kinds in EXTENSION_SIGNATURES.items() if "text" in kinds}
+
+
+class UnsupportedUploadType(UnsupportedMediaType):
+    """上传文件的扩展名不允许或文件头与扩展名不符 (与 Flask 自身因请求体不是 JSON 等原因返回的 415 区分)"""
+
+
+def sniff_type(head: bytes, extension: Optional[str] = None) -> str:
+    """
+    根据文件头判断文件类型
+
+    文本按 BOM、UTF-8、GB18030 依次识别；扩展名为文本类型时，其他编码 (Big5、Shift-JIS 等) 的文件头
+    只要不含 NUL 字节也视为文本，避免把非 UTF-8 / GB 编码的文本文件当作二进制拒绝。
+
+    Args:
+        head: 文件开头的字节 (可能在多字节字符中间截断)
+        extension: 可选的扩展名 (含点，小写)，用于文本的宽松判断
+
+    Returns:
+        str: pdf、zip、ole、text 或 binary
+    """
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+        return "zip"
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "ole"
+    encoding = bom_encoding(head)
+    if encoding is not None:
+        # UTF-16 / UTF-32 文本本身包含 NUL 字节，按 BOM 标识的编码检查
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(head)
+            return "text"
+        except UnicodeDecodeError:
+            return "binary"
+    if b"\x00" not in head:
+        for encoding in ("utf-8", "gb18030"):
+            try:
+                # 增量解码器不要求结尾完整，文件头截断在多字节字符中间时也能判断
+                codecs.getincrementaldecoder(encoding)().decode(head)
+                return "text"
+            except UnicodeDecodeError:
+                continue
+        if extension in TEXT_EXTENSIONS:
+            return "text"
+    return "binary"
+
+
+class UploadSink:
+    """
+    上传文件的写入目标，由 werkzeug 在解析请求体时逐块写入
+
+    数据写到上传目录中的临时文件，finalize() 时原子重命名为最终路径，不再复制；
+    请求结束时仍未 finalize 的临时文件 (被拒绝或未被处理的上传) 在 close() 时删除。
+    """
+
+    def __init__(self, folder: str, filename: Optional[str], max_bytes: int = MAX_UPLOAD_FILE_BYTES):
+        """
+        初始化写入目标
+
+        Args:
+            folder: 上传目录
+            filename: 客户端提供的文件名，用于检查扩展名与文件头是否一致
+            max_bytes: 单文件大小上限
+
+        Raises:
+            UnsupportedUploadType: 扩展名不在允许的类型中
+        """
+        self.filename = filename or ""
+        self.extension = os.path.splitext(self.filename)[1].lower()
+        if self.extension not in EXTENSION_SIGNATURES:
+            raise UnsupportedUploadType(f"不支持的文件类型: {self.filename}")
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.detected_type = None
+        self._head = bytearray()
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f".{uuid.uuid4().hex}{PARTIAL_SUFFIX}")
+        self._file = open(self.path, "w+b")
+        self.finalized = False
+
+    def _reject(self, error):
+        self.close()
+        raise error
+
+    def _sniff(self):
+        self.detected_type = sniff_type(bytes(self._head), self.extension)
+        if self.detected_type not in EXTENSION_SIGNATURES[self.extension]:
+            self._reject(UnsupportedUploadType(
+                f"文件内容 ({self.detected_type}) 与扩展名 {self.extension} 不符: {self.filename}"
+            ))
+        self._file.write(self._head)
+        self._head = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self._reject(RequestEntityTooLarge(
+                f"文件 {self.filename} 超过大小上限 {self.max_bytes // (1024 * 1024)} MB"
+            ))
+        self.sha256.update(data)
+        if self.detected_type is None:
+            self._head.extend(data)
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        else:
+            self._file.write(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # werkzeug 在文件部分结束时 seek(0)；不足 SNIFF_BYTES 的小文件在这里完成嗅探
+        if self.detected_type is None:
+            self._sniff()
+        return self._file.seek(offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+    def finalize(self, path: str) -> str:
+        """
+        把已写入的文件移动到最终路径
+
+        Args:
+            path: 最终路径 (与临时文件在同一目录，重命名不复制数据)
+
+        Returns:
+            str: 文件内容的 SHA-256
+        """
+        if self.detected_type is None:
+            self._sniff()
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+        self.finalized = True
+        return self.hexdigest()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.finalized and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def make_upload_request_class(upload_folder: str, max_file_bytes: int = MAX_UPLOAD_FILE_BYTES):
+    """
+    创建把上传文件直接写入上传目录的请求类 (赋值给 app.request_class)
+
+    Args:
+        upload_folder: 上传目录
+        max_file_bytes: 单文件大小上限
+
+    Returns:
+        type: Flask Request 子类
+    """
+
+    class StreamingUploadRequest(Request):
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            if not filename:
+                # 未选择文件的空文件部分，交给 handle_upload_request 返回 400
+                return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+            sink = UploadSink(upload_folder, filename, max_file_bytes)
+            # 请求解析中途被拒绝时，已写完的其他文件不会出现在 request.files 中，需要单独清理
+            self.__dict__.setdefault("_upload_sinks", []).append(sink)
+            return sink
+
+        def close(self):
+            super().close()
+            for sink in self.__dict__.get("_upload_sinks", ()):
+                sink.close()
+
+    return StreamingUploadRequest
@@ -0,0 +1,109 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.admission import ADMISSION_REJECTED, AdmissionGate, AdmissionRejected, admission_controlled, fcntl
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestAdmission(unittest.TestCase):
+    """测试重型接口的准入控制"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "AdmissionTest")
+        self.logger.debug("准备测试Admission")
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("Admission测试完成")
+
+    def test_queue_then_reject(self):
+        """测试超出并发数的请求排队，队列满时立即拒绝并给出 Retry-After"""
+        gate = AdmissionGate("test_embedding", max_concurrent=1, max_queue=1, timeout=5)
+        release = threading.Event()
+        order = []
+
+        def request(name):
+            with gate.admit():
+                order.append(name)
+                release.wait(5)
+
+        first = threading.Thread(target=request, args=("first",))
+        first.start()
+        while gate.active == 0:
+            time.sleep(0.01)
+        second = threading.Thread(target=request, args=("second",))
+        second.start()
+        while gate.waiting == 0:
+            time.sleep(0.01)
+
+        with self.assertRaises(AdmissionRejected) as context:
+            with gate.admit():
+                pass
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+        self.assertEqual(ADMISSION_REJECTED.value(endpoint="test_embedding", reason="queue_full"), 1)
+
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(order, ["first", "second"])
+        stats = gate.stats()
+        self.assertEqual((stats["admitted"], stats["queued"], stats["rejected_queue_full"]), (2, 1, 1))
+        self.assertEqual((stats["active"], stats["waiting"]), (0, 0))
+
+    def test_queue_timeout(self):
+        """测试排队超时的请求被拒绝，名额释放后可以再次进入"""
+        gate = AdmissionGate("test_chunk", max_concurrent=1, max_queue=2, timeout=0.05)
+        with gate.admit():
+            with self.assertRaises(AdmissionRejected):
+                with gate.admit():
+                    pass
+        self.assertEqual(gate.stats()["rejected_timeout"], 1)
+        with gate.admit():
+            self.assertEqual(gate.active, 1)
+
+    def test_shared_gate(self):
+        """测试共用闸门的接口互相占用名额，并在统计中列出"""
+        gate = AdmissionGate("test_shared", max_concurrent=1, max_queue=0)
+
+        @admission_controlled(gate)
+        def chunk_file():
+            return gate.active
+
+        @admission_controlled(gate)
+        def chunk_files_batch():
+            return chunk_file()
+
+        self.assertEqual(chunk_file(), 1)
+        with self.assertRaises(AdmissionRejected):
+            chunk_files_batch()
+        self.assertEqual(gate.stats()["endpoints"], ["chunk_file", "chunk_files_batch"])
+
+    @unittest.skipIf(fcntl is None, "需要 fcntl")
+    def test_lock_dir_shared_between_processes(self):
+        """测试同一锁目录下的闸门 (模拟不同工作进程) 共用并发数和排队数"""
+        lock_dir = tempfile.mkdtemp()
+        try:
+            worker_a = AdmissionGate("test_cross", max_concurrent=1, max_queue=1, timeout=0.05, lock_dir=lock_dir)
+            worker_b = AdmissionGate("test_cross", max_concurrent=1, max_queue=1, timeout=0.05, lock_dir=lock_dir)
+            self.assertTrue(worker_b.stats()["shared"])
+            with worker_a.admit():
+                # 另一个进程的闸门看到名额已被占用，排队后超时
+                with self.assertRaises(AdmissionRejected):
+                    with worker_b.admit():
+                        pass
+            with worker_b.admit():
+                self.assertEqual(worker_b.active, 1)
+            self.assertEqual(worker_b.stats()["rejected_timeout"], 1)
+        finally:
+            shutil.rmtree(lock_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
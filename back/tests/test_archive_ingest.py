@@ -0,0 +1,159 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import zipfile
+import time
+import tempfile
+import warnings
+import threading
+from io import BytesIO
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.datastructures import FileStorage
+
+from services.archive_ingest import ArchiveError, member_filename, scan_archive
+from services.file_processor import FileProcessor
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+ALLOWED_EXTENSIONS = {'txt', 'pdf', 'md', 'xlsx', 'xls', 'docx', 'pptx'}
+
+
+class TestArchiveIngest(unittest.TestCase):
+    """测试压缩包批量上传"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ArchiveIngestTest")
+        self.logger.debug("准备测试ArchiveIngest")
+        self.temp_dir = tempfile.mkdtemp()
+        self.upload_folder = os.path.join(self.temp_dir, "upload")
+        self.load_folder = os.path.join(self.temp_dir, "load")
+        self.processor = FileProcessor(self.upload_folder, self.load_folder)
+        self.archive_path = os.path.join(self.temp_dir, "dump.zip")
+        with zipfile.ZipFile(self.archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("财务/报告.txt", "财务部的报告。")
+            archive.writestr("人事/报告.txt", "人事部的报告。")
+            archive.writestr("说明.md", "# 说明\n\n部门文档汇总。")
+            archive.writestr("tools/setup.exe", b"MZ\x90\x00")
+            archive.writestr("__MACOSX/._说明.md", b"\x00\x05")
+            archive.writestr("空目录/", b"")
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("ArchiveIngest测试完成")
+
+    def upload(self, path, max_workers=1):
+        with open(path, "rb") as f:
+            file = FileStorage(stream=BytesIO(f.read()), filename=os.path.basename(path))
+        return self.processor.handle_archive_upload(file, ALLOWED_EXTENSIONS, max_workers=max_workers)
+
+    def test_scan_archive(self):
+        """测试成员筛选和数量限制"""
+        members, skipped = scan_archive(self.archive_path, ALLOWED_EXTENSIONS)
+        self.assertEqual([info.filename for info in members], ["财务/报告.txt", "人事/报告.txt", "说明.md"])
+        self.assertEqual({item["member"] for item in skipped}, {"tools/setup.exe", "__MACOSX/._说明.md"})
+        self.assertRegex(member_filename("财务/报告.txt"), r"^财务_报告_[0-9a-f]{8}\.txt$")
+        # 展平后同名的成员路径不冲突
+        self.assertNotEqual(member_filename("a/b.pdf"), member_filename("a_b.pdf"))
+
+        with patch("services.archive_ingest.ARCHIVE_MAX_MEMBERS", 2):
+            with self.assertRaises(ArchiveError) as context:
+                scan_archive(self.archive_path, ALLOWED_EXTENSIONS)
+            self.assertEqual(context.exception.status, 413)
+
+    def test_zip_bomb_rejected(self):
+        """测试压缩比异常的压缩包在解压前被拒绝"""
+        bomb_path = os.path.join(self.temp_dir, "bomb.zip")
+        with zipfile.ZipFile(bomb_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("zeros.txt", b"0" * (20 * 1024 * 1024))
+        result, status = self.upload(bomb_path)
+        self.assertEqual(status, 413)
+        self.assertFalse(os.path.exists(self.load_folder) and os.listdir(self.load_folder))
+        self.assertEqual(os.listdir(self.upload_folder), [])
+
+    def test_members_processed_in_parallel(self):
+        """测试每个成员生成自己的 load 文件，并返回压缩包汇总"""
+        result, status = self.upload(self.archive_path, max_workers=2)
+        self.assertEqual(status, 200)
+        summary = result["data"]["archive"]
+        self.assertEqual(summary["member_count"], 3)
+        self.assertEqual(summary["succeeded_count"], 3)
+        self.assertEqual(summary["skipped_count"], 2)
+        self.assertEqual(summary["workers"], 2)
+        self.assertIsNotNone(summary["files_per_second"])
+
+        contents = []
+        for member in summary["results"]:
+            with open(member["processed_file_path"], "r", encoding="utf-8") as f:
+                contents.append(json.load(f)["文件读取内容"])
+        self.assertEqual(contents, ["财务部的报告。", "人事部的报告。", "# 说明\n\n部门文档汇总。"])
+        # 压缩包本身不保留，只保留解压出的成员
+        self.assertEqual(len(os.listdir(self.upload_folder)), 3)
+
+    def test_archive_deadline(self):
+        """测试超过时限仍未完成的成员记为超时失败，其余成员照常返回"""
+        process_member = FileProcessor.process_archive_member
+        release = threading.Event()
+
+        def slow_member(processor, archive_path, member_name, deadline=None):
+            if member_name == "说明.md":
+                release.wait(5)
+                return {"success": False, "member": member_name, "error": "已放弃"}
+            return process_member(processor, archive_path, member_name, deadline)
+
+        with patch.object(FileProcessor, "process_archive_member", slow_member):
+            summary = self.processor.process_archive(self.archive_path, ALLOWED_EXTENSIONS, max_workers=3, timeout=0.5)
+        self.assertEqual(summary["succeeded_count"], 2)
+        self.assertEqual(summary["failed_count"], 1)
+        self.assertEqual(summary["failures"][0]["member"], "说明.md")
+        self.assertEqual(summary["failures"][0]["error_type"], "timeout")
+        release.set()
+
+    def test_timed_out_member_not_written(self):
+        """测试超时的成员在时限之后解析完成时不写入 load 文件，也不留下解压出的文件"""
+        extract_fast = FileProcessor.extract_fast
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow_extract(processor, upload_path):
+            if os.path.basename(upload_path).startswith("说明"):
+                release.wait(5)
+                finished.set()
+            return extract_fast(processor, upload_path)
+
+        with patch.object(FileProcessor, "extract_fast", slow_extract):
+            summary = self.processor.process_archive(self.archive_path, ALLOWED_EXTENSIONS, max_workers=3, timeout=0.5)
+            self.assertEqual(summary["failures"][0]["member"], "说明.md")
+            release.set()
+            self.assertTrue(finished.wait(5))
+            # 等待成员线程收尾
+            for _ in range(100):
+                if len(os.listdir(self.upload_folder)) == 2:
+                    break
+                time.sleep(0.05)
+        written = [result["processed_file_path"] for result in summary["results"] if result["success"]]
+        self.assertEqual(sorted(os.listdir(self.load_folder)), sorted(os.path.basename(path) for path in written))
+        self.assertEqual(len(os.listdir(self.upload_folder)), 2)
+
+    def test_duplicate_member_paths(self):
+        """测试同一路径重复出现的成员只解析一次，不同目录下的同名成员各自生成结果"""
+        duplicate_path = os.path.join(self.temp_dir, "duplicate.zip")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with zipfile.ZipFile(duplicate_path, "w") as archive:
+                archive.writestr("a/报告.txt", "第一份。")
+                archive.writestr("b/报告.txt", "第二份。")
+                archive.writestr("a/报告.txt", "重复的一份。")
+        summary = self.processor.process_archive(duplicate_path, ALLOWED_EXTENSIONS, max_workers=2)
+        self.assertEqual([result["member"] for result in summary["results"]], ["a/报告.txt", "b/报告.txt"])
+        self.assertEqual(summary["skipped"], [{"member": "a/报告.txt", "reason": "重复的成员路径"}])
+        self.assertEqual(len({result["processed_file_path"] for result in summary["results"]}), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
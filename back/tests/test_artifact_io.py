@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+import tempfile
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.artifact_io import (
+    ArtifactWriter, count_records, iter_materialized, iter_records, load_artifact, read_footer,
+    read_header, read_meta, strip_materialized
+)
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestArtifactIO(unittest.TestCase):
+    """测试流式产物读写"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ArtifactIOTest")
+        self.logger.debug("准备测试ArtifactIO")
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "test_chunked.jsonl")
+
+    def tearDown(self):
+        """测试后的清理"""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("ArtifactIO测试完成")
+
+    def test_write_and_read(self):
+        """测试写入头记录、数据记录和尾记录后再逐条读取"""
+        records = [{"id": i + 1, "content": f"第{i + 1}个块"} for i in range(5)]
+        with ArtifactWriter(self.path, "chunk", {"文件名称": "测试.txt"}) as writer:
+            writer.write_many(records)
+            writer.close({"chunk_count": len(records)})
+
+        header = read_header(self.path)
+        self.assertEqual(header["artifact"], "chunk")
+        self.assertEqual(header["meta"]["文件名称"], "测试.txt")
+        self.assertEqual(read_footer(self.path)["record_count"], 5)
+        self.assertEqual(list(iter_records(self.path)), records)
+        self.assertEqual(read_meta(self.path)["chunk_count"], 5)
+        self.assertEqual(count_records(self.path), 5)
+
+    def test_meta_merge(self):
+        """测试头记录和尾记录中的字典元数据合并"""
+        with ArtifactWriter(self.path, "embedding", {"embedding_metadata": {"embedding_model_dim": 384}}) as writer:
+            writer.write({"id": 1, "embedding": [0.1, 0.2]})
+            writer.close({"embedding_metadata": {"processed_chunk_count": 1}})
+
+        meta = read_meta(self.path)
+        self.assertEqual(meta["embedding_metadata"], {"embedding_model_dim": 384, "processed_chunk_count": 1})
+        self.assertEqual(load_artifact(self.path)["chunks"], [{"id": 1, "embedding": [0.1, 0.2]}])
+
+    def test_partial_artifact(self):
+        """测试未写完 (没有尾记录) 的产物仍可读取已写入的记录"""
+        writer = ArtifactWriter(self.path, "chunk")
+        writer.write({"id": 1, "content": "a"})
+        writer.write({"id": 2, "content": "b"})
+        writer.flush()
+
+        self.assertIsNone(read_footer(self.path))
+        self.assertEqual(count_records(self.path), 2)
+        writer.close()
+        self.assertEqual(read_footer(self.path)["record_count"], 2)
+
+    def test_atomic_abort(self):
+        """测试 atomic 模式下出错时不会留下目标文件"""
+        with self.assertRaises(RuntimeError):
+            with ArtifactWriter(self.path, "chunk", atomic=True) as writer:
+                writer.write({"id": 1, "content": "a"})
+                raise RuntimeError("中断")
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_legacy_json(self):
+        """测试兼容旧的整文件 JSON 产物"""
+        legacy_path = os.path.join(self.temp_dir, "old_chunked.json")
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            json.dump({"chunk_method": "custom", "chunks": [{"id": 1, "content": "旧"}]}, f, ensure_ascii=False)
+
+        self.assertEqual(read_meta(legacy_path)["chunk_method"], "custom")
+        self.assertEqual(count_records(legacy_path), 1)
+        self.assertEqual(list(iter_records(legacy_path))[0]["content"], "旧")
+
+    def test_materialize_offsets(self):
+        """测试按 start/end 偏移从源文件还原 chunk 文本"""
+        source_text = "第一句。第二句。第三句。"
+        source_path = os.path.join(self.temp_dir, "source.json")
+        with open(source_path, "w", encoding="utf-8") as f:
+            json.dump({"文件读取内容": source_text}, f, ensure_ascii=False)
+
+        meta = {"source_path": source_path, "source_length": len(source_text)}
+        with ArtifactWriter(self.path, "chunk", meta) as writer:
+            writer.write({"id": 1, "start": 0, "end": 4})
+            writer.write({"id": 2, "start": 4, "end": 8})
+            writer.write({"id": 3, "content": "内联文本"})
+
+        contents = [record["content"] for record in iter_materialized(self.path)]
+        self.assertEqual(contents, ["第一句。", "第二句。", "内联文本"])
+        self.assertEqual(load_artifact(self.path)["chunks"][1]["content"], "第二句。")
+        self.assertNotIn("content", strip_materialized({"id": 1, "start": 0, "end": 4, "content": "第一句。"}))
+
+        # 源文件被修改后偏移失效，应当报错而不是返回错误文本
+        with open(source_path, "w", encoding="utf-8") as f:
+            json.dump({"文件读取内容": "改动后的内容"}, f, ensure_ascii=False)
+        with self.assertRaises(ValueError):
+            list(iter_materialized(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.chunk_dedup import ChunkDeduplicator, hamming_distance, normalize_text, simhash
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestChunkDedup(unittest.TestCase):
+    """测试chunk近似去重"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ChunkDedupTest")
+        self.logger.debug("准备测试ChunkDeduplicator")
+        self.boilerplate = (
+            "本合同自双方签字盖章之日起生效，有效期为一年。合同期满前三十日内，"
+            "任何一方未提出书面异议的，本合同自动续期一年，续期次数不限。"
+        )
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("ChunkDeduplicator测试完成")
+
+    def test_simhash_near_duplicates(self):
+        """测试排版差异得到相同指纹，细微改动得到相近指纹"""
+        self.assertEqual(normalize_text("Hello, 世界！\n"), "hello世界")
+        self.assertEqual(simhash(self.boilerplate), simhash(self.boilerplate.replace("，", ", ") + "\n"))
+
+        edited = self.boilerplate.replace("一年。", "两年。", 1)
+        unrelated = "黑神话悟空是一款以中国神话为背景的动作角色扮演游戏，玩家将扮演一位天命人踏上西游之路。"
+        self.assertLess(hamming_distance(simhash(self.boilerplate), simhash(edited)),
+                        hamming_distance(simhash(self.boilerplate), simhash(unrelated)))
+        self.assertIsNone(simhash("。。。 "))
+
+    def test_deduplicator_clusters(self):
+        """测试每个簇只保留最先出现的代表，并记录重复映射"""
+        deduplicator = ChunkDeduplicator(max_distance=3)
+        texts = [
+            self.boilerplate,
+            "第一条 甲方应当按时支付货款。",
+            self.boilerplate + " ",
+            "第二条 乙方应当按时交付货物。",
+            self.boilerplate.replace("，", ","),
+        ]
+        representatives = [deduplicator.add(i + 1, text) for i, text in enumerate(texts)]
+        self.assertEqual(representatives, [None, None, 1, None, 1])
+
+        stats = deduplicator.stats()
+        self.assertEqual(stats["duplicate_chunk_count"], 2)
+        self.assertEqual(stats["unique_chunk_count"], 3)
+        self.assertEqual(stats["dedup_ratio"], 0.4)
+        self.assertEqual(stats["clusters"], {"1": [3, 5]})
+
+        with self.assertRaises(ValueError):
+            ChunkDeduplicator(max_distance=64)
+
+    def test_existing_representatives(self):
+        """测试其他产物的代表参与查找，但不计入本文件的簇映射"""
+        deduplicator = ChunkDeduplicator(max_distance=3)
+        deduplicator.add_existing("other_embedded.jsonl", [7], [simhash(self.boilerplate)])
+        representative = deduplicator.add(1, self.boilerplate + "\n")
+        self.assertEqual(representative, ("other_embedded.jsonl", 7))
+        self.assertTrue(deduplicator.is_external(representative))
+        self.assertIsNone(deduplicator.add(2, "第一条 甲方应当按时支付货款。"))
+        self.assertIsNotNone(deduplicator.fingerprint(2))
+
+        stats = deduplicator.stats()
+        self.assertEqual(stats["duplicate_chunk_count"], 1)
+        self.assertEqual(stats["clusters"], {})
+        self.assertEqual(stats["corpus_duplicates"], {"other_embedded.jsonl": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
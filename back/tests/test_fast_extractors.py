@@ -0,0 +1,100 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import docx
+import pptx
+from openpyxl import Workbook
+
+from services.fast_extractors import (
+    ExtractionLimitError, extract_docx, extract_pptx, extract_text, extract_xlsx, get_fast_extractor
+)
+from services.file_processor import FileProcessor
+from services.partition_sandbox import PartitionError
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestFastExtractors(unittest.TestCase):
+    """测试格式专用的快速提取器"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "FastExtractorsTest")
+        self.logger.debug("准备测试快速提取器")
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("快速提取器测试完成")
+
+    def test_text_encodings(self):
+        """测试 UTF-8 (含 BOM) 和 GBK 编码的文本"""
+        for name, encoding in (("utf8.txt", "utf-8-sig"), ("gbk.md", "gbk"), ("utf16.txt", "utf-16")):
+            path = os.path.join(self.temp_dir, name)
+            with open(path, "w", encoding=encoding, newline="\r\n") as f:
+                f.write("# 标题\n\n第一段。\n第一段第二行。\n\n\n第二段。")
+            self.assertEqual(extract_text(path), ["# 标题", "第一段。\n第一段第二行。", "第二段。"])
+
+    def test_xlsx(self):
+        """测试只读模式逐行读取工作表"""
+        path = os.path.join(self.temp_dir, "sheet.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "销售"
+        sheet.append(["产品", "数量"])
+        sheet.append(["悟空", 3])
+        sheet.append([None, None])
+        workbook.create_sheet("空表")
+        workbook.save(path)
+        self.assertEqual(extract_xlsx(path), ["销售\n产品\t数量\n悟空\t3"])
+
+    def test_docx_and_pptx(self):
+        """测试从 docx / pptx 的 XML 中提取段落 (含表格和多张幻灯片)"""
+        docx_path = os.path.join(self.temp_dir, "doc.docx")
+        document = docx.Document()
+        document.add_heading("黑神话悟空", level=1)
+        document.add_paragraph("第一段落。")
+        table = document.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "单元格一"
+        table.cell(0, 1).text = "单元格二"
+        document.save(docx_path)
+        self.assertEqual(extract_docx(docx_path), ["黑神话悟空", "第一段落。", "单元格一", "单元格二"])
+
+        pptx_path = os.path.join(self.temp_dir, "slides.pptx")
+        presentation = pptx.Presentation()
+        for i in range(1, 12):
+            slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+            slide.shapes.title.text = f"第{i}页"
+        presentation.save(pptx_path)
+        # slide10 在 slide2 之后：按幻灯片编号排序而不是按文件名排序
+        self.assertEqual(extract_pptx(pptx_path), [f"第{i}页" for i in range(1, 12)])
+
+        self.assertIs(get_fast_extractor("A.DOCX"), extract_docx)
+        self.assertIsNone(get_fast_extractor("a.pdf"))
+
+    def test_uncompressed_size_limit(self):
+        """测试解压后超出大小上限的文件直接拒绝，不再交给 unstructured 解析"""
+        docx_path = os.path.join(self.temp_dir, "large.docx")
+        document = docx.Document()
+        for i in range(200):
+            document.add_paragraph(f"重复的段落内容 {i}。" * 20)
+        document.save(docx_path)
+        self.assertEqual(len(extract_docx(docx_path)), 200)
+
+        with patch("services.fast_extractors.FAST_EXTRACT_MAX_BYTES", 10 * 1024):
+            with self.assertRaises(ExtractionLimitError):
+                extract_docx(docx_path)
+            processor = FileProcessor(os.path.join(self.temp_dir, "upload"), os.path.join(self.temp_dir, "load"))
+            with self.assertRaises(PartitionError) as context:
+                processor.extract_fast(docx_path)
+            self.assertEqual(context.exception.error_type, "limit")
+
+
+if __name__ == "__main__":
+    unittest.main()
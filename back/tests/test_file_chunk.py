@@ -3,12 +3,23 @@ import os
 import sys
 import tempfile
 import json
+import numpy as np
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.file_chunk import FileChunkProcessor as FileChunker
+from services.artifact_io import count_records, iter_materialized, iter_records, read_meta
 from tests.test_logger_utils import test_logger, TestLoggerAdapter
 
 
+class CharTokenizer:
+    """按字符分词的模拟快速分词器 (每个非空白字符一个token)"""
+    def __call__(self, texts, **kwargs):
+        return {"offset_mapping": [
+            [(i, i + 1) for i, ch in enumerate(text) if not ch.isspace()]
+            for text in texts
+        ]}
+
+
 class TestFileChunker(unittest.TestCase):
     """测试文件分块服务"""
     
@@ -138,12 +149,14 @@ class TestFileChunker(unittest.TestCase):
             
             # 读取已保存的文件验证内容
             saved_file_path = os.path.join(self.chunk_folder, files[0])
-            with open(saved_file_path, "r", encoding="utf-8") as f:
-                saved_data = json.load(f)
+            self.assertTrue(saved_file_path.endswith(".jsonl"))
+            saved_meta = read_meta(saved_file_path)
+            saved_chunks = list(iter_records(saved_file_path))
             
-            self.assertIn("chunks", saved_data)
-            self.assertIn("chunk_method", saved_data)
-            self.assertEqual(saved_data["chunk_method"], "langchain")
+            self.assertIn("chunk_method", saved_meta)
+            self.assertEqual(saved_meta["chunk_method"], "langchain")
+            self.assertEqual(len(saved_chunks), len(result["chunks"]))
+            self.assertEqual(count_records(saved_file_path), len(result["chunks"]))
             
             self.logger.debug("验证保存的分块数据结构正确")
             
@@ -153,6 +166,184 @@ class TestFileChunker(unittest.TestCase):
         
         self.logger.debug("保存分块结果功能测试完成")
 
+    def test_chunk_native(self):
+        """测试内置流式切分方法"""
+        self.logger.debug("开始测试内置切分功能")
+        
+        file_id = self.create_test_load_file()
+        result = self.chunker.process_chunk(file_id, "native", chunk_size=40, chunk_overlap=10)
+        
+        self.assertTrue(result["success"])
+        self.assertTrue(len(result["chunks"]) > 1)
+        for chunk in result["chunks"]:
+            self.assertTrue(0 < len(chunk["content"]) <= 40)
+            # 按句子边界切分，每个块以句末标点结束
+            self.assertIn(chunk["content"][-1], "。！？；")
+        
+        self.logger.debug("内置切分功能测试完成")
+    
+    def test_chunk_by_tokens(self):
+        """测试按token数切分并记录每个块的token数"""
+        self.logger.debug("开始测试按token切分功能")
+        
+        self.chunker.tokenizer = CharTokenizer()
+        file_id = self.create_test_load_file()
+        result = self.chunker.process_chunk(file_id, "tokens", chunk_size=30, chunk_overlap=5)
+        
+        self.assertTrue(result["success"])
+        self.assertTrue(len(result["chunks"]) > 1)
+        for chunk in result["chunks"]:
+            expected_tokens = sum(1 for ch in chunk["content"] if not ch.isspace())
+            self.assertEqual(chunk["token_count"], expected_tokens)
+            self.assertLessEqual(chunk["token_count"], 30)
+        
+        # token数同时保存在chunk产物中
+        saved_counts = [record["token_count"] for record in iter_records(result["output_path"])]
+        self.assertEqual(saved_counts, [chunk["token_count"] for chunk in result["chunks"]])
+        
+        self.logger.debug("按token切分功能测试完成")
+    
+    def test_chunk_without_sentence_boundaries(self):
+        """测试没有句子边界的长文本按长度切开，分句不会退化为平方复杂度"""
+        self.logger.debug("开始测试无句子边界文本的切分")
+        
+        content = "无标点长文本" * 5000
+        self.chunker.tokenizer = CharTokenizer()
+        spans, token_counts = self.chunker.chunk_spans_tokens(content, chunk_size=300, chunk_overlap=0)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(content))
+        for (_, end), (next_start, _) in zip(spans, spans[1:]):
+            self.assertEqual(end, next_start)
+        self.assertTrue(all(count <= 300 for count in token_counts))
+        
+        self.chunker.sentence_encoder = lambda texts: np.ones((len(texts), 2))
+        spans, groups, vectors = self.chunker.chunk_spans_semantic(content, chunk_size=500)
+        self.assertEqual(len(vectors), len(content) // 500)
+        self.assertTrue(all(end - start <= 500 for start, end in spans))
+        
+        self.logger.debug("无句子边界文本的切分测试完成")
+    
+    def test_chunk_semantic(self):
+        """测试语义切分保存句子向量和每个chunk的句子范围"""
+        self.logger.debug("开始测试语义切分功能")
+        
+        encoded_batches = []
+        def topic_encoder(texts):
+            """模拟句子编码：含“测试”的句子和其他句子属于两个话题"""
+            encoded_batches.append(len(texts))
+            return np.array([[1.0, 0.1] if "测试" in text else [0.1, 1.0] for text in texts])
+        
+        self.chunker.sentence_encoder = topic_encoder
+        file_id = self.create_test_load_file()
+        result = self.chunker.process_chunk(file_id, "semantic", chunk_size=60)
+        
+        self.assertTrue(result["success"])
+        # 所有句子一次性批量编码
+        self.assertEqual(len(encoded_batches), 1)
+        for chunk in result["chunks"]:
+            self.assertLessEqual(len(chunk["content"]), 60)
+        
+        saved_meta = read_meta(result["output_path"])
+        vectors = np.load(saved_meta["sentence_vectors_path"])
+        self.assertEqual(vectors.shape, (encoded_batches[0], 2))
+        
+        # 各chunk的句子范围首尾相接，覆盖所有句子
+        ranges = [record["sentence_range"] for record in iter_records(result["output_path"])]
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(vectors))
+        for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+        
+        self.logger.debug("语义切分功能测试完成")
+    
+    def test_offset_storage(self):
+        """测试chunk记录只保存偏移，读取时从load文件还原文本"""
+        self.logger.debug("开始测试偏移存储功能")
+        
+        file_id = self.create_test_load_file()
+        result = self.chunker.process_chunk(file_id, "custom", separator="\n\n")
+        self.assertTrue(result["success"])
+        
+        saved_meta = read_meta(result["output_path"])
+        self.assertNotIn("文件读取内容", saved_meta)
+        self.assertTrue(saved_meta["source_path"].endswith(f"{file_id}.json"))
+        
+        # 磁盘上的记录只有偏移，不重复保存文本
+        for record in iter_records(result["output_path"]):
+            self.assertNotIn("content", record)
+            self.assertLess(record["start"], record["end"])
+        
+        # 按偏移还原的文本与返回结果一致
+        materialized = [record["content"] for record in iter_materialized(result["output_path"])]
+        self.assertEqual(materialized, [chunk["content"] for chunk in result["chunks"]])
+        
+        self.logger.debug("偏移存储功能测试完成")
+    
+    def test_sweep_chunk_configs(self):
+        """测试参数扫描共享一次切分，且只为选中的配置写入产物"""
+        self.logger.debug("开始测试切分参数扫描功能")
+        
+        self.chunker.tokenizer = CharTokenizer()
+        file_id = self.create_test_load_file()
+        content = self.chunker.get_file_content(file_id)[0]["文件读取内容"]
+        configs = self.chunker.build_sweep_configs(grid={
+            "methods": ["native"], "chunkSizes": [20, 40], "chunkOverlaps": [0, 10]
+        })
+        self.assertEqual(len(configs), 4)
+        with self.assertRaises(ValueError):
+            self.chunker.build_sweep_configs([{"method": "native", "chunkSize": 10, "chunkOverlap": 10}])
+        
+        result = self.chunker.sweep_chunk_configs(file_id, configs, save_indices=[1])
+        self.assertTrue(result["success"])
+        self.assertEqual(len(result["results"]), 4)
+        
+        # 扫描结果与单独执行切分的结果一致
+        for entry in result["results"]:
+            self.assertTrue(entry["shared_segmentation"])
+            self.assertEqual(sum(entry["length_histogram"]["counts"]), entry["chunk_count"])
+            self.assertLessEqual(entry["max_length"], entry["chunk_size"])
+            self.assertEqual(entry["token_overflow_rate"], 0)
+            expected = self.chunker.chunk_spans_native(content, entry["chunk_size"], entry["chunk_overlap"])
+            self.assertEqual(entry["chunk_count"], len(expected))
+        
+        # 只有选中的配置写入了产物
+        saved = [entry for entry in result["results"] if "output_path" in entry]
+        self.assertEqual([entry["index"] for entry in saved], [1])
+        self.assertEqual(count_records(saved[0]["output_path"]), saved[0]["chunk_count"])
+        self.assertEqual(len(os.listdir(self.chunk_folder)), 1)
+        
+        self.logger.debug("切分参数扫描功能测试完成")
+    
+    def test_process_chunk_batch(self):
+        """测试使用进程池批量切分多个文件"""
+        self.logger.debug("开始测试批量切分功能")
+        
+        file_ids = [self.create_test_load_file(f"batch_{i}") for i in range(3)]
+        result = self.chunker.process_chunk_batch(
+            file_ids + ["missing_file"], "native", chunk_size=40, chunk_overlap=10, max_workers=2
+        )
+        
+        self.assertTrue(result["success"])
+        self.assertEqual(result["file_count"], 4)
+        self.assertEqual(result["succeeded_count"], 3)
+        self.assertEqual(result["failed_count"], 1)
+        self.assertEqual([r["file_id"] for r in result["results"]], file_ids + ["missing_file"])
+        self.assertFalse(result["results"][-1]["success"])
+        
+        # 每个文件的产物都已完整写入 (没有残留的临时文件)，结果中不含chunk内容
+        for file_result in result["results"][:3]:
+            self.assertNotIn("chunks", file_result)
+            self.assertEqual(count_records(file_result["output_path"]), file_result["chunk_count"])
+        self.assertEqual(sorted(os.listdir(self.chunk_folder)), sorted(
+            os.path.basename(r["output_path"]) for r in result["results"][:3]
+        ))
+        self.assertEqual(result["total_chunk_count"], sum(r["chunk_count"] for r in result["results"][:3]))
+        
+        # 未指定文件ID时处理load文件夹中的所有文件
+        self.assertEqual(self.chunker.get_load_file_ids(), file_ids)
+        
+        self.logger.debug("批量切分功能测试完成")
+
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -7,6 +7,8 @@ import numpy as np
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.file_embedding import EmbeddingClass
+from services.artifact_io import ArtifactWriter, iter_records, read_meta
+from services.model_cache import HF_MODEL_NAME
 from tests.test_logger_utils import test_logger, TestLoggerAdapter
 
 
@@ -271,6 +273,179 @@ class TestEmbeddingService(unittest.TestCase):
             self.fail(f"保存嵌入向量测试失败: {e}")
         
         self.logger.debug("保存嵌入向量结果功能测试完成")
+    
+    def test_process_embeddings_dedup(self):
+        """测试开启去重时近似重复的chunk不再嵌入，只记录所属簇的代表"""
+        self.logger.debug("开始测试嵌入去重功能")
+        
+        boilerplate = "本合同自双方签字盖章之日起生效，有效期为一年。任何一方未提出书面异议的，本合同自动续期。"
+        chunk_path = os.path.join(self.chunk_folder, "dedup_doc_chunked_20250429000000.json")
+        with open(chunk_path, "w", encoding="utf-8") as f:
+            json.dump({"chunks": [
+                {"id": 1, "content": boilerplate},
+                {"id": 2, "content": "第一条 甲方应当按时支付货款。"},
+                {"id": 3, "content": boilerplate + "\n"},
+                {"id": 4, "content": boilerplate.replace("，", ", ")}
+            ]}, f, ensure_ascii=False)
+        
+        self.embedding_service.chunk_folder = self.chunk_folder
+        self.embedding_service.embedding_folder = self.embedding_folder
+        self.embedding_service.embedding_dim = 384
+        embedded_texts = []
+        original_get_embedding = self.embedding_service.get_embedding
+        def counting_get_embedding(text):
+            embedded_texts.append(text)
+            return original_get_embedding(text)
+        self.embedding_service.get_embedding = counting_get_embedding
+        
+        result = self.embedding_service.process_embeddings("dedup_doc", include_data=False, dedup=True)
+        self.assertTrue(result["success"])
+        self.assertEqual(len(embedded_texts), 2)
+        self.assertEqual(result["dedup"]["duplicate_chunk_count"], 2)
+        self.assertEqual(result["dedup"]["dedup_ratio"], 0.5)
+        self.assertEqual(result["dedup"]["embeddings_saved"], 2)
+        self.assertEqual(result["dedup"]["clusters"], {"1": [3, 4]})
+        
+        # 重复的chunk保留在产物中，记录代表chunk的ID而不保存向量
+        records = list(iter_records(result["embedding_file"]))
+        self.assertEqual([r.get("duplicate_of") for r in records], [None, None, 1, 1])
+        self.assertIsNone(records[2].get("embedding"))
+        self.assertEqual(read_meta(result["embedding_file"])["embedding_metadata"]["dedup"]["duplicate_chunk_count"], 2)
+        
+        self.logger.debug("嵌入去重功能测试完成")
+    
+    def test_process_embeddings_corpus_dedup(self):
+        """测试与之前文档重复的chunk直接复用已保存的向量，不再嵌入"""
+        self.logger.debug("开始测试跨文档去重功能")
+        
+        boilerplate = "本合同自双方签字盖章之日起生效，有效期为一年。任何一方未提出书面异议的，本合同自动续期。"
+        for name, clause in (("contract_a", "第一条 甲方应当按时支付货款。"), ("contract_b", "第一条 乙方应当按时交付货物。")):
+            with ArtifactWriter(os.path.join(self.chunk_folder, f"{name}_chunked_20250429000000.jsonl"), "chunk") as writer:
+                writer.write({"id": 1, "content": clause})
+                writer.write({"id": 2, "content": boilerplate})
+        
+        self.embedding_service.chunk_folder = self.chunk_folder
+        self.embedding_service.embedding_folder = self.embedding_folder
+        self.embedding_service.embedding_dim = 384
+        embedded_texts = []
+        original_get_embedding = self.embedding_service.get_embedding
+        def counting_get_embedding(text):
+            embedded_texts.append(text)
+            return original_get_embedding(text)
+        self.embedding_service.get_embedding = counting_get_embedding
+        
+        first = self.embedding_service.process_embeddings("contract_a", include_data=False, dedup=True)
+        self.assertTrue(first["success"])
+        self.assertEqual(len(embedded_texts), 2)
+        
+        second = self.embedding_service.process_embeddings("contract_b", include_data=False, dedup=True)
+        self.assertTrue(second["success"])
+        # 第二份文档只嵌入了不重复的条款
+        self.assertEqual(embedded_texts[2:], ["第一条 乙方应当按时交付货物。"])
+        self.assertEqual(second["dedup"]["corpus_duplicates"], {"contract_a_embedded.jsonl": 1})
+        self.assertEqual(second["dedup"]["corpus_artifact_count"], 1)
+        
+        # 重复的chunk记录代表所在产物，向量与代表保存的向量一致
+        first_records = list(iter_records(first["embedding_file"]))
+        second_records = list(iter_records(second["embedding_file"]))
+        self.assertEqual(second_records[1]["duplicate_of"], 2)
+        self.assertEqual(second_records[1]["duplicate_source"], "contract_a_embedded.jsonl")
+        np.testing.assert_allclose(second_records[1]["embedding"], first_records[1]["embedding"], rtol=1e-6)
+        
+        # 重新嵌入同一文档时不会与自己的旧索引重复
+        again = self.embedding_service.process_embeddings("contract_a", include_data=False, dedup=True)
+        self.assertEqual(again["dedup"]["corpus_duplicates"], {})
+        self.assertEqual(len(embedded_texts), 5)
+        
+        self.logger.debug("跨文档去重功能测试完成")
+    
+    def test_corpus_dedup_missing_vector(self):
+        """测试其他产物的代表向量读取失败时照常嵌入，不计入去重，并成为本文件的新代表"""
+        self.logger.debug("开始测试代表向量缺失时的跨文档去重")
+        
+        boilerplate = "本合同自双方签字盖章之日起生效，有效期为一年。任何一方未提出书面异议的，本合同自动续期。"
+        with ArtifactWriter(os.path.join(self.chunk_folder, "contract_a_chunked_20250429000000.jsonl"), "chunk") as writer:
+            writer.write({"id": 1, "content": boilerplate})
+        with ArtifactWriter(os.path.join(self.chunk_folder, "contract_b_chunked_20250429000000.jsonl"), "chunk") as writer:
+            writer.write({"id": 1, "content": boilerplate})
+            writer.write({"id": 2, "content": boilerplate + "。"})
+        
+        self.embedding_service.chunk_folder = self.chunk_folder
+        self.embedding_service.embedding_folder = self.embedding_folder
+        self.embedding_service.embedding_dim = 384
+        first = self.embedding_service.process_embeddings("contract_a", include_data=False, dedup=True)
+        self.assertTrue(first["success"])
+        
+        # 模拟 contract_a 的去重索引中向量已丢失
+        self.embedding_service.corpus_vector = lambda source, chunk_id, cache: None
+        second = self.embedding_service.process_embeddings("contract_b", include_data=False, dedup=True)
+        self.assertTrue(second["success"])
+        self.assertEqual(second["dedup"]["corpus_duplicates"], {})
+        # 第一个 chunk 被嵌入并成为代表，第二个 chunk 与它重复
+        self.assertEqual(second["dedup"]["duplicate_chunk_count"], 1)
+        self.assertEqual(second["dedup"]["embeddings_saved"], 1)
+        records = list(iter_records(second["embedding_file"]))
+        self.assertNotIn("duplicate_source", records[0])
+        self.assertEqual(len(records[0]["embedding"]), 384)
+        self.assertEqual(records[1]["duplicate_of"], 1)
+        
+        self.logger.debug("代表向量缺失时的跨文档去重测试完成")
+    
+    def test_pool_sentence_vectors(self):
+        """测试语义切分的chunk直接池化句子向量，不再调用模型"""
+        self.logger.debug("开始测试句子向量池化功能")
+        
+        vectors_path = os.path.join(self.chunk_folder, "semantic_doc.sentences.npy")
+        sentence_vectors = np.arange(12, dtype=np.float32).reshape(4, 3)
+        np.save(vectors_path, sentence_vectors)
+        meta = {"sentence_vectors_path": vectors_path, "sentence_vectors_model": HF_MODEL_NAME}
+        with ArtifactWriter(os.path.join(self.chunk_folder, "semantic_doc_chunked_20250429000000.jsonl"), "chunk", meta) as writer:
+            writer.write({"id": 1, "content": "第一个话题。", "sentence_range": [0, 3]})
+            writer.write({"id": 2, "content": "第二个话题。", "sentence_range": [3, 4]})
+        
+        self.embedding_service.model_type = "huggingface"
+        self.embedding_service.chunk_folder = self.chunk_folder
+        self.embedding_service.embedding_folder = self.embedding_folder
+        self.embedding_service.embedding_dim = 3
+        def fail_get_embedding(text):
+            raise AssertionError("句子向量可复用时不应调用模型")
+        self.embedding_service.get_embedding = fail_get_embedding
+        
+        result = self.embedding_service.process_embeddings("semantic_doc", include_data=False)
+        self.assertTrue(result["success"])
+        records = list(iter_records(result["embedding_file"]))
+        self.assertEqual(records[0]["embedding"], sentence_vectors[0:3].mean(axis=0).tolist())
+        self.assertEqual(records[1]["embedding"], sentence_vectors[3].tolist())
+        self.assertEqual(read_meta(result["embedding_file"])["embedding_metadata"]["pooled_chunk_count"], 2)
+        
+        self.logger.debug("句子向量池化功能测试完成")
+    
+    def test_interrupted_embedding_leaves_no_artifact(self):
+        """测试嵌入中途中断时不会留下残缺的嵌入产物"""
+        self.logger.debug("开始测试嵌入中断")
+        
+        with ArtifactWriter(os.path.join(self.chunk_folder, "crash_doc_chunked_20250429000000.jsonl"), "chunk") as writer:
+            writer.write({"id": 1, "content": "第一个块。"})
+            writer.write({"id": 2, "content": "第二个块。"})
+        
+        class Interrupted(BaseException):
+            pass
+        calls = []
+        def interrupting_get_embedding(text):
+            calls.append(text)
+            if len(calls) == 2:
+                raise Interrupted()
+            return {"embedding": [0.0, 1.0]}
+        self.embedding_service.chunk_folder = self.chunk_folder
+        self.embedding_service.embedding_folder = self.embedding_folder
+        self.embedding_service.embedding_dim = 2
+        self.embedding_service.get_embedding = interrupting_get_embedding
+        
+        with self.assertRaises(Interrupted):
+            self.embedding_service.process_embeddings("crash_doc", include_data=False)
+        self.assertEqual(os.listdir(self.embedding_folder), [])
+        
+        self.logger.debug("嵌入中断测试完成")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ingest_cli import checkpoint_entry, load_checkpoint, pending_files, walk_files
+from services.partition_cache import hash_file
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestIngestCli(unittest.TestCase):
+    """测试目录批量入库工具的遍历和检查点"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "IngestCliTest")
+        self.logger.debug("准备测试IngestCli")
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("IngestCli测试完成")
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.temp_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_walk_files(self):
+        """测试按路径顺序遍历允许的类型，跳过隐藏文件和目录"""
+        self.write("docs/b.txt", "b")
+        self.write("docs/a.PDF", "a")
+        self.write("docs/sub/c.md", "c")
+        self.write("docs/.git/d.txt", "d")
+        self.write("docs/.e.txt", "e")
+        self.write("docs/f.exe", "f")
+        paths = [os.path.relpath(path, self.temp_dir) for path in walk_files(os.path.join(self.temp_dir, "docs"), {"txt", "pdf", "md"})]
+        self.assertEqual(paths, [os.path.join("docs", "a.PDF"), os.path.join("docs", "b.txt"), os.path.join("docs", "sub", "c.md")])
+
+    def test_checkpoint(self):
+        """测试只有最近一次为完成的记录计入检查点，中断留下的不完整行被忽略"""
+        checkpoint = self.write("checkpoint.jsonl", "\n".join([
+            json.dumps({"content_hash": "a" * 64, "status": "done"}),
+            json.dumps({"content_hash": "b" * 64, "status": "failed", "stage": "embed"}),
+            json.dumps({"content_hash": "d" * 64, "status": "done"}),
+            json.dumps({"content_hash": "d" * 64, "status": "failed", "stage": "store"}),
+            '{"content_hash": "c'
+        ]))
+        self.assertEqual(load_checkpoint(checkpoint), {"a" * 64})
+        self.assertEqual(load_checkpoint(os.path.join(self.temp_dir, "missing.jsonl")), set())
+
+    def test_resume_after_partial_run(self):
+        """测试中断后重新运行只跳过已完成的文件，失败和未处理的文件重新提交"""
+        paths = [self.write(f"docs/{name}.txt", name) for name in ("a", "b", "c")]
+        self.write("docs/copy_of_a.txt", "a")
+        checkpoint_path = os.path.join(self.temp_dir, "checkpoint.jsonl")
+
+        # 第一次运行: a 完成，b 在嵌入阶段失败 (已生成 load 文件)，处理 c 之前中断
+        counts = {}
+        first = list(pending_files(os.path.join(self.temp_dir, "docs"), {"txt"}, load_checkpoint(checkpoint_path), counts))
+        self.assertEqual([path for path, _ in first], paths)
+        self.assertEqual(counts, {"scanned": 4, "skipped": 1})
+        with open(checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(checkpoint_entry(paths[0], {
+                "success": True, "output": {"content_hash": first[0][1], "file_id": "a_1", "chunk_count": 1}
+            })) + "\n")
+            f.write(json.dumps(checkpoint_entry(paths[1], {
+                "success": False, "input": {"content_hash": first[1][1], "file_id": "b_1"},
+                "stage": "embed", "error": "模型加载失败"
+            })) + "\n")
+
+        # 第二次运行: 只跳过 a (及其副本)
+        counts = {}
+        second = list(pending_files(os.path.join(self.temp_dir, "docs"), {"txt"}, load_checkpoint(checkpoint_path), counts))
+        self.assertEqual(second, [(paths[1], hash_file(paths[1])), (paths[2], hash_file(paths[2]))])
+        self.assertEqual(counts, {"scanned": 4, "skipped": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+from io import BytesIO
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.datastructures import FileStorage
+
+from services.file_chunk import FileChunkProcessor
+from services.admission import AdmissionGate
+from services.file_processor import FileProcessor
+from services.ingest_pipeline import PipelineStage, StreamingPipeline, build_ingest_stages
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class RecordingEmbedder:
+    """记录被嵌入的 chunk 文件，代替需要下载模型的 EmbeddingClass"""
+
+    def __init__(self):
+        self.chunk_file_ids = []
+
+    def process_embeddings(self, chunk_file_id, include_data=True, dedup=False):
+        self.chunk_file_ids.append(chunk_file_id)
+        return {"success": True, "embedding_file": f"files/embedding/{chunk_file_id}_embedded.jsonl"}
+
+
+class TestIngestPipeline(unittest.TestCase):
+    """测试流水线式入库"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "IngestPipelineTest")
+        self.logger.debug("准备测试IngestPipeline")
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("IngestPipeline测试完成")
+
+    def test_stages_overlap(self):
+        """测试各阶段重叠执行、结果按提交顺序返回，并找出瓶颈阶段"""
+        def sleeper(seconds):
+            def run(value):
+                time.sleep(seconds)
+                return value + 1
+            return run
+
+        def fail_on_three(value):
+            if value == 3:
+                raise ValueError("无法处理")
+            return value
+
+        stages = [
+            PipelineStage("parse", sleeper(0.02)),
+            PipelineStage("check", fail_on_three),
+            PipelineStage("embed", sleeper(0.06)),
+        ]
+        completed = []
+        summary = StreamingPipeline(stages, queue_size=2).run(
+            (value for value in range(8)), on_result=lambda number, result: completed.append(number)
+        )
+
+        self.assertEqual(summary["item_count"], 8)
+        self.assertEqual(summary["failed_count"], 1)
+        self.assertEqual(summary["results"][2], {"success": False, "stage": "check", "error": "无法处理", "input": 3})
+        self.assertEqual([r["output"] for r in summary["results"] if r["success"]], [2, 3, 5, 6, 7, 8, 9])
+        self.assertEqual(summary["bottleneck"], "embed")
+        # 解析与嵌入重叠执行，总耗时小于各阶段耗时之和
+        self.assertLess(summary["elapsed_seconds"], summary["serial_seconds"])
+        self.assertLessEqual(summary["stages"][2]["max_queue_depth"], 2)
+        # 每个条目 (含失败的) 完成时都回调一次
+        self.assertEqual(sorted(completed), list(range(8)))
+
+    def test_ingest_stages(self):
+        """测试 解析 -> 切分 -> 嵌入 阶段依次补充文档上下文"""
+        file_processor = FileProcessor(os.path.join(self.temp_dir, "upload"), os.path.join(self.temp_dir, "load"))
+        chunk_processor = FileChunkProcessor(os.path.join(self.temp_dir, "load"), os.path.join(self.temp_dir, "chunk"))
+        embedder = RecordingEmbedder()
+        file_infos = [
+            file_processor.save_upload_file(
+                FileStorage(stream=BytesIO(f"第{i}个文档。内容用于测试流水线。".encode("utf-8")), filename=f"doc{i}.txt"), "txt"
+            )
+            for i in range(3)
+        ]
+
+        stages = build_ingest_stages(file_processor, chunk_processor, embedder, method="native", chunk_size=50, chunk_overlap=0)
+        self.assertEqual([stage.name for stage in stages], ["parse", "chunk", "embed"])
+        summary = StreamingPipeline(stages).run(file_infos)
+
+        self.assertEqual(summary["succeeded_count"], 3)
+        documents = [result["output"] for result in summary["results"]]
+        self.assertEqual([document["filename"] for document in documents], [info["filename"] for info in file_infos])
+        self.assertEqual(sorted(embedder.chunk_file_ids), sorted(document["chunk_file_id"] for document in documents))
+        for document in documents:
+            self.assertEqual(document["parser"], "fast")
+            self.assertGreater(document["chunk_count"], 0)
+            self.assertTrue(document["embedding_file"].endswith("_embedded.jsonl"))
+
+    def test_embed_gate_per_file(self):
+        """测试嵌入阶段按文件占用嵌入名额，而不是整个请求期间一直占用"""
+        file_processor = FileProcessor(os.path.join(self.temp_dir, "upload"), os.path.join(self.temp_dir, "load"))
+        chunk_processor = FileChunkProcessor(os.path.join(self.temp_dir, "load"), os.path.join(self.temp_dir, "chunk"))
+        embed_gate = AdmissionGate("test_pipeline_embedding", max_concurrent=1, max_queue=4)
+        file_infos = [
+            file_processor.save_upload_file(
+                FileStorage(stream=BytesIO(f"第{i}个文档。内容用于测试嵌入名额。".encode("utf-8")), filename=f"gate{i}.txt"), "txt"
+            )
+            for i in range(3)
+        ]
+
+        stages = build_ingest_stages(file_processor, chunk_processor, RecordingEmbedder(), method="native",
+                                     chunk_size=50, chunk_overlap=0, embed_gate=embed_gate)
+        summary = StreamingPipeline(stages).run(file_infos)
+
+        self.assertEqual(summary["succeeded_count"], 3)
+        stats = embed_gate.stats()
+        self.assertEqual(stats["admitted"], 3)
+        self.assertEqual(stats["active"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import json
+import gzip
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask, jsonify
+
+from services.json_response import RESPONSE_BYTES, init_app
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestJsonResponse(unittest.TestCase):
+    """测试 JSON 响应编码、流式输出和压缩"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "JsonResponseTest")
+        self.logger.debug("准备测试JsonResponse")
+        app = Flask(__name__)
+        init_app(app)
+        self.chunks = [{"id": i, "content": f"第{i}段内容", "embedding": [0.5, -1.25, i]} for i in range(1500)]
+
+        @app.route('/small')
+        def small():
+            return jsonify({"success": True, "message": "完成", "vector": np.arange(3, dtype=np.float32)})
+
+        @app.route('/large')
+        def large():
+            return jsonify({"success": True, "data": {"chunks": self.chunks, "model": "bge"}}), 200
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("JsonResponse测试完成")
+
+    def test_small_response(self):
+        """测试小响应整体编码、支持 numpy 数组，且低于阈值时不压缩"""
+        response = self.client.get('/small', headers={"Accept-Encoding": "gzip"})
+        self.assertIn("Content-Length", response.headers)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("完成".encode("utf-8"), response.data)
+        self.assertEqual(json.loads(response.data)["vector"], [0.0, 1.0, 2.0])
+
+    def test_large_response_streamed_and_compressed(self):
+        """测试包含长列表的响应流式输出，内容与整体编码一致，并按 Accept-Encoding 压缩"""
+        expected = {"success": True, "data": {"chunks": self.chunks, "model": "bge"}}
+
+        response = self.client.get('/large')
+        # 流式响应没有 Content-Length
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(json.loads(response.get_data()), expected)
+
+        before = RESPONSE_BYTES.value(encoding="gzip", kind="sent")
+        with patch("services.json_response.brotli", None):
+            response = self.client.get('/large', headers={"Accept-Encoding": "br, gzip"})
+            body = response.get_data()
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(body)), expected)
+        self.assertEqual(RESPONSE_BYTES.value(encoding="gzip", kind="sent") - before, len(body))
+
+
+if __name__ == "__main__":
+    unittest.main()
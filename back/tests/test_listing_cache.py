@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from email.utils import formatdate
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify
+
+from services.artifact_io import ArtifactWriter
+from services.listing_cache import ListingCache, conditional_listing
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestListingCache(unittest.TestCase):
+    """测试列表接口的条件请求和结果缓存"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ListingCacheTest")
+        self.logger.debug("准备测试ListingCache")
+        self.temp_dir = tempfile.mkdtemp()
+        self.chunk_folder = os.path.join(self.temp_dir, "chunk")
+        os.makedirs(self.chunk_folder)
+        self.computed = 0
+
+        app = Flask(__name__)
+
+        @app.route('/files')
+        @conditional_listing(self.chunk_folder, cache=ListingCache())
+        def list_files():
+            self.computed += 1
+            return jsonify({"success": True, "files": sorted(os.listdir(self.chunk_folder))}), 200
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("ListingCache测试完成")
+
+    def test_not_modified_and_cached(self):
+        """测试版本号不变时返回 304 或缓存结果，写入新产物后重新计算"""
+        response = self.client.get('/files')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+
+        response = self.client.get('/files', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/files')
+        self.assertEqual(response.json["files"], [])
+        self.assertEqual(self.computed, 1)
+
+        # 产物在写完 (关闭) 时才使版本号变化
+        writer = ArtifactWriter(os.path.join(self.chunk_folder, "doc.jsonl"), "chunk")
+        writer.write({"id": 1})
+        writer.close()
+        response = self.client.get('/files', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.json["files"], ["doc.jsonl"])
+        self.assertEqual(self.computed, 2)
+
+    def test_if_modified_since_granularity(self):
+        """测试 If-Modified-Since 只在目录修改时间早于该秒时返回 304，带 If-None-Match 时只比较 ETag"""
+        mtime = 1_700_000_000
+        os.utime(self.chunk_folder, ns=(mtime * 10**9, mtime * 10**9 + 500_000_000))
+        response = self.client.get('/files')
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        self.assertEqual(last_modified, formatdate(mtime, usegmt=True))
+
+        # 修改发生在 Last-Modified 所在的这一秒内，无法确认客户端的副本包含这次修改
+        response = self.client.get('/files', headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/files', headers={"If-Modified-Since": formatdate(mtime + 1, usegmt=True)})
+        self.assertEqual(response.status_code, 304)
+        # ETag 不一致时忽略 If-Modified-Since
+        response = self.client.get('/files', headers={
+            "If-None-Match": '"stale"', "If-Modified-Since": formatdate(mtime + 1, usegmt=True)
+        })
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/files', headers={"If-None-Match": etag, "If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
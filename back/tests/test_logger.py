@@ -3,9 +3,10 @@ import os
 import sys
 import logging
 import tempfile
+from logging.handlers import QueueHandler
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from services.logger import setup_logger
+from services.logger import ProgressReporter, setup_logger, stop_listener
 from tests.test_logger_utils import test_logger, TestLoggerAdapter
 
 
@@ -130,6 +131,48 @@ class TestLogger(unittest.TestCase):
         
         self.logger_adapter.debug("setup_logger在调试模式功能测试完成")
 
+    def test_file_logging_through_queue(self):
+        """测试文件日志经队列由监听线程写入，停止监听线程时写完"""
+        logger = setup_logger("test_queue_logger", self.temp_log_dir)
+        self.assertFalse(any(isinstance(handler, logging.FileHandler) for handler in logger.handlers))
+        
+        logger.info("队列日志 - 信息")
+        logger.error("队列日志 - 错误")
+        # 只停止本测试创建的监听线程，不影响其他日志记录器
+        queue_handler = next(handler for handler in logger.handlers if isinstance(handler, QueueHandler))
+        stop_listener(queue_handler)
+        logger.removeHandler(queue_handler)
+        
+        with open(os.path.join(self.temp_log_dir, 'app.log'), 'r') as f:
+            app_log = f.read()
+        with open(os.path.join(self.temp_log_dir, 'error.log'), 'r') as f:
+            error_log = f.read()
+        self.assertIn("队列日志 - 信息", app_log)
+        self.assertIn("队列日志 - 错误", app_log)
+        self.assertNotIn("队列日志 - 信息", error_log)
+        self.assertIn("队列日志 - 错误", error_log)
+    
+    def test_progress_reporter(self):
+        """测试进度日志按时间间隔限频，结束时输出汇总"""
+        records = []
+        
+        class Recorder:
+            def log(self, level, message):
+                records.append(message)
+        
+        progress = ProgressReporter(Recorder(), "嵌入 doc", total=1000, interval=3600)
+        for _ in range(1000):
+            progress.update()
+        self.assertEqual(records, [])
+        progress.close()
+        self.assertEqual(len(records), 1)
+        self.assertIn("嵌入 doc: 完成 1000/1000", records[0])
+        
+        progress = ProgressReporter(Recorder(), "嵌入 doc", total=10, interval=0)
+        progress.update()
+        self.assertIn("已处理 1/10", records[-1])
+        self.assertIn("预计剩余", records[-1])
+
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
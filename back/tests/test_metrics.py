@@ -0,0 +1,118 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from services.metrics import Counter, Gauge, Histogram, Registry, REQUEST_SECONDS, init_app
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestMetrics(unittest.TestCase):
+    """测试 Prometheus 格式的指标"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "MetricsTest")
+        self.logger.debug("准备测试Metrics")
+        self.registry = Registry()
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("Metrics测试完成")
+
+    def test_render(self):
+        """测试计数器、回调值和分桶累计的文本格式"""
+        lookups = Counter("lookups_total", "查找次数", ("result",), registry=self.registry)
+        depth = Gauge("depth", "队列深度", registry=self.registry)
+        latency = Histogram("latency_seconds", "耗时", ("stage",), buckets=(0.1, 1.0), registry=self.registry)
+
+        lookups.inc(result="hit")
+        lookups.inc(2, result="miss")
+        depth.set_function(lambda: 3)
+        for seconds in (0.05, 0.1, 0.5, 5.0):
+            latency.observe(seconds, stage="chunk")
+
+        text = self.registry.render()
+        self.assertIn("# TYPE lookups_total counter", text)
+        self.assertIn('lookups_total{result="miss"} 2', text)
+        self.assertIn("depth 3", text)
+        # 桶为累计计数，边界值计入 le 等于该值的桶
+        self.assertIn('latency_seconds_bucket{stage="chunk",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{stage="chunk",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{stage="chunk",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{stage="chunk"} 4', text)
+        self.assertIn('latency_seconds_sum{stage="chunk"} 5.65', text)
+
+        with self.assertRaises(ValueError):
+            lookups.inc(cache="partition")
+
+    def test_request_latency_by_route(self):
+        """测试请求耗时按路由模板记录"""
+        app = Flask(__name__)
+        init_app(app)
+
+        @app.route('/items/<item_id>')
+        def get_item(item_id):
+            return {"id": item_id}
+
+        before = REQUEST_SECONDS.count(method="GET", route="/items/<item_id>", status="200")
+        client = app.test_client()
+        client.get('/items/1')
+        client.get('/items/2')
+        client.get('/missing')
+        self.assertEqual(REQUEST_SECONDS.count(method="GET", route="/items/<item_id>", status="200"), before + 2)
+        self.assertGreaterEqual(REQUEST_SECONDS.count(method="GET", route="unmatched", status="404"), 1)
+
+    def test_multiprocess_aggregation(self):
+        """测试多进程模式下计数器和分桶统计跨进程求和 (含已退出进程)，gauge 按 pid 输出仍在运行的进程"""
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir)
+        registry = Registry(multiproc_dir)
+        lookups = Counter("lookups_total", "查找次数", ("result",), registry=registry)
+        depth = Gauge("depth", "队列深度", registry=registry)
+        latency = Histogram("latency_seconds", "耗时", buckets=(1.0,), registry=registry)
+        lookups.inc(2, result="hit")
+        depth.set(1)
+        latency.observe(0.5)
+
+        # 另一个已退出的进程留下的数据
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        with open(os.path.join(multiproc_dir, f"metrics_{exited.pid}_1.json"), "w", encoding="utf-8") as f:
+            json.dump({"pid": exited.pid, "metrics": {
+                "lookups_total": [[["hit"], 3], [["miss"], 1]],
+                "depth": [[[], 5]],
+                "latency_seconds": [[[], [[0, 1], 2.0]]]
+            }}, f)
+
+        text = registry.render()
+        self.assertIn('lookups_total{result="hit"} 5', text)
+        self.assertIn('lookups_total{result="miss"} 1', text)
+        self.assertIn(f'depth{{pid="{os.getpid()}"}} 1', text)
+        self.assertNotIn(f'pid="{exited.pid}"', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn('latency_seconds_count 2', text)
+        self.assertIn('latency_seconds_sum 2.5', text)
+
+    def test_child_process_flushes_on_exit(self):
+        """测试设置了共享目录的子进程退出时写出自己的数据"""
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir)
+        back_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        subprocess.run(
+            [sys.executable, "-c", "from services.metrics import STAGE_ITEMS; STAGE_ITEMS.inc(3, stage='test_child')"],
+            cwd=back_dir, env={**os.environ, "METRICS_MULTIPROC_DIR": multiproc_dir}, check=True
+        )
+        merged, alive = Registry(multiproc_dir).collect()
+        self.assertEqual(list(merged["rag_stage_items_total"].values()), [[[["test_child"], 3]]])
+        self.assertEqual(alive, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import hashlib
+import json
+from io import BytesIO
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.datastructures import FileStorage
+
+from services.file_processor import FileProcessor
+from services.partition_cache import PartitionCache
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestPartitionCache(unittest.TestCase):
+    """测试解析结果缓存"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "PartitionCacheTest")
+        self.logger.debug("准备测试PartitionCache")
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_folder = os.path.join(self.temp_dir, "partition_cache")
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("PartitionCache测试完成")
+
+    def test_lru_eviction_and_stats(self):
+        """测试容量上限下按最近使用淘汰，以及命中率统计"""
+        cache = PartitionCache(self.cache_folder, max_bytes=1200)
+        content = "解析结果" * 50  # 每个条目约 800 字节以内
+        self.assertTrue(cache.put("a" * 64, "auto", content))
+        self.assertEqual(cache.get("a" * 64, "auto"), content)
+        self.assertIsNone(cache.get("a" * 64, "hi_res"))  # 策略不同视为不同条目
+
+        cache.put("b" * 64, "auto", content)  # 超出容量，淘汰最久未使用的 a
+        self.assertIsNone(cache.get("a" * 64, "auto"))
+        self.assertEqual(cache.get("b" * 64, "auto"), content)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 2, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["entry_count"], 1)
+        self.assertLessEqual(stats["total_bytes"], 1200)
+
+        # 重启后从磁盘重建索引
+        self.assertEqual(PartitionCache(self.cache_folder, max_bytes=1200).stats()["entry_count"], 1)
+        self.assertFalse(cache.put("c" * 64, "auto", "大" * 1000))
+
+    def test_shared_directory_between_processes(self):
+        """测试共用目录的多个缓存实例 (多个工作进程) 互相命中，容量上限对目录整体生效"""
+        content = "解析结果" * 50
+        first = PartitionCache(self.cache_folder, max_bytes=1200)
+        second = PartitionCache(self.cache_folder, max_bytes=1200)
+        first.put("a" * 64, "auto", content)
+        self.assertEqual(second.get("a" * 64, "auto"), content)
+
+        # second 写入的条目使目录超出上限，淘汰 first 写入的 a
+        second.put("b" * 64, "auto", content)
+        self.assertIsNone(first.get("a" * 64, "auto"))
+        self.assertEqual(first.get("b" * 64, "auto"), content)
+        self.assertEqual(first.stats()["entry_count"], 1)
+        self.assertLessEqual(first.stats()["total_bytes"], 1200)
+
+    def test_reupload_reuses_partition(self):
+        """测试重复上传相同内容时跳过解析，直接生成新的load文件"""
+        processor = FileProcessor(os.path.join(self.temp_dir, "upload"), os.path.join(self.temp_dir, "load"))
+        data = "这是一个测试文件。\n\n用于测试解析缓存。".encode("utf-8")
+
+        def upload():
+            # txt 走快速提取，不经过解析缓存；这里用 pdf 扩展名走 unstructured 路径
+            file = FileStorage(stream=BytesIO(data), filename="cached.pdf")
+            return processor.handle_upload_request(file, "pdf", {"pdf"}, logger=self.logger)
+
+        with patch("services.file_processor.partition", return_value=["这是一个测试文件。", "用于测试解析缓存。"]) as mock_partition:
+            first, status = upload()
+            self.assertEqual(status, 200)
+            self.assertFalse(first["data"]["partition_cache_hit"])
+            second, _ = upload()
+            self.assertTrue(second["data"]["partition_cache_hit"])
+            self.assertEqual(mock_partition.call_count, 1)
+            # PDF 策略设置变化后不再复用旧的解析结果
+            with patch("services.pdf_partition.PDF_IMAGE_STRATEGY", "ocr_only"):
+                third, _ = upload()
+            self.assertFalse(third["data"]["partition_cache_hit"])
+            self.assertEqual(mock_partition.call_count, 2)
+
+        # 上传时计算的哈希与文件内容一致
+        self.assertEqual(processor.partition_cache.stats()["hits"], 1)
+        with open(second["data"]["upload_path"], "rb") as f:
+            self.assertEqual(f.read(), data)
+        with open(second["data"]["processed_file_path"], "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["文件哈希"], hashlib.sha256(data).hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
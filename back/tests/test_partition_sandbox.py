@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+from io import BytesIO
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.datastructures import FileStorage
+
+from services.file_processor import FileProcessor
+from services.partition_sandbox import PartitionError, PartitionSandbox
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+# 以下函数在沙箱工作进程中执行，需定义在模块级
+def worker_pid():
+    return os.getpid()
+
+
+def sleep_seconds(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def allocate_mb(mb):
+    data = b"x" * (mb * 1024 * 1024)
+    time.sleep(30)
+    return len(data)
+
+
+def raise_error():
+    raise ValueError("无法解析的文件")
+
+
+def exit_process():
+    os._exit(3)
+
+
+class TestPartitionSandbox(unittest.TestCase):
+    """测试解析沙箱"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "PartitionSandboxTest")
+        self.logger.debug("准备测试PartitionSandbox")
+        self.sandbox = PartitionSandbox(max_workers=1, timeout=2, max_rss_mb=200, max_jobs_per_worker=3)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.sandbox.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("PartitionSandbox测试完成")
+
+    def assert_error_type(self, error_type, func, *args):
+        with self.assertRaises(PartitionError) as context:
+            self.sandbox.run(func, *args)
+        self.assertEqual(context.exception.error_type, error_type)
+        self.assertEqual(context.exception.to_dict()["error_type"], error_type)
+
+    def test_worker_reuse_and_recycle(self):
+        """测试工作进程被复用，执行 max_jobs_per_worker 个任务后回收"""
+        pids = [self.sandbox.run(worker_pid) for _ in range(4)]
+        self.assertNotEqual(pids[0], os.getpid())
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+        self.assertEqual(self.sandbox.stats()["recycled"], 1)
+
+    def test_limits(self):
+        """测试异常、超时、超出内存和进程崩溃都返回结构化错误，沙箱仍可继续使用"""
+        self.assert_error_type("error", raise_error)
+        self.assert_error_type("timeout", sleep_seconds, 30)
+        self.assert_error_type("memory", allocate_mb, 400)
+        self.assert_error_type("crash", exit_process)
+        self.assertEqual(self.sandbox.run(sleep_seconds, 0), 0)
+
+        stats = self.sandbox.stats()
+        for key in ("error", "timeout", "memory", "crash", "completed"):
+            self.assertEqual(stats[key], 1)
+
+    def test_upload_returns_structured_error(self):
+        """测试解析超时时上传请求返回 422 和 error_type"""
+        processor = FileProcessor(
+            os.path.join(self.temp_dir, "upload"), os.path.join(self.temp_dir, "load"), partition_sandbox=self.sandbox
+        )
+        self.sandbox.timeout = 0.01
+        file = FileStorage(stream=BytesIO(b"%PDF-1.4 broken"), filename="broken.pdf")
+        result, status = processor.handle_upload_request(file, "pdf", {"pdf"})
+        self.assertEqual(status, 422)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["error_type"], "timeout")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ContentStream, DictionaryObject, NameObject
+
+from services.pdf_partition import (
+    count_pdf_pages, partition_pdf_parallel, partition_pdf_plan, plan_pdf_strategy, should_partition_in_parallel,
+    split_pdf, PDF_IMAGE_STRATEGY, PDF_TEXT_STRATEGY
+)
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+def page_width_partition(path, strategy):
+    """模拟解析：每页返回页面宽度 (测试文件中第 n 页宽度为 100 + n)"""
+    return [str(int(page.mediabox.width)) for page in PdfReader(path).pages]
+
+
+def strategy_partition(path, strategy):
+    """模拟解析：每页返回 页面宽度:解析策略"""
+    return [f"{int(page.mediabox.width)}:{strategy}" for page in PdfReader(path).pages]
+
+
+def add_text_page(writer, width, text):
+    """添加一个带文本层的页面"""
+    page = writer.add_blank_page(width=width, height=200)
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)})
+    })
+    content = ContentStream(None, writer)
+    content.set_data(f"BT /F1 10 Tf 10 100 Td ({text}) Tj ET".encode("latin-1"))
+    page[NameObject("/Contents")] = writer._add_object(content)
+
+
+class TestPdfPartition(unittest.TestCase):
+    """测试PDF分页并行解析"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "PdfPartitionTest")
+        self.logger.debug("准备测试PdfPartition")
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, "pages.pdf")
+        self.page_count = 23
+        writer = PdfWriter()
+        for page in range(1, self.page_count + 1):
+            writer.add_blank_page(width=100 + page, height=200)
+        with open(self.pdf_path, "wb") as f:
+            writer.write(f)
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("PdfPartition测试完成")
+
+    def test_split_pdf(self):
+        """测试按页范围拆分"""
+        output_folder = os.path.join(self.temp_dir, "parts")
+        os.makedirs(output_folder)
+        parts = split_pdf(self.pdf_path, output_folder, pages_per_task=10)
+        self.assertEqual([start for start, _, _ in parts], [1, 11, 21])
+        self.assertEqual([count_pdf_pages(path) for _, path, _ in parts], [10, 10, 3])
+
+        self.assertTrue(should_partition_in_parallel(self.page_count, min_pages=20, max_workers=2))
+        self.assertFalse(should_partition_in_parallel(self.page_count, min_pages=20, max_workers=1))
+        self.assertFalse(should_partition_in_parallel(self.page_count, min_pages=50, max_workers=4))
+
+    def test_parallel_results_in_page_order(self):
+        """测试并行解析的结果按页序合并"""
+        texts = partition_pdf_parallel(
+            self.pdf_path, "auto", max_workers=2, pages_per_task=4, partition_func=page_width_partition
+        )
+        self.assertEqual(texts, [str(100 + page) for page in range(1, self.page_count + 1)])
+
+
+    def test_plan_pdf_strategy(self):
+        """测试文本层预扫描：纯图片文档整份走 hi_res，混合文档按页范围选择策略"""
+        plan_info = plan_pdf_strategy(self.pdf_path)
+        self.assertEqual(plan_info["strategy"], PDF_IMAGE_STRATEGY)
+        self.assertEqual(plan_info["plan"], [(0, self.page_count, PDF_IMAGE_STRATEGY)])
+
+        # 第 1-3、6 页有文本层，第 4、5 页为空白 (模拟扫描页)
+        mixed_path = os.path.join(self.temp_dir, "mixed.pdf")
+        writer = PdfWriter()
+        for page in range(1, 7):
+            if page in (4, 5):
+                writer.add_blank_page(width=100 + page, height=200)
+            else:
+                add_text_page(writer, 100 + page, f"This page has an extractable text layer {page}")
+        with open(mixed_path, "wb") as f:
+            writer.write(f)
+
+        plan_info = plan_pdf_strategy(mixed_path, samples=4)
+        self.assertEqual(plan_info["strategy"], "mixed")
+        self.assertEqual(plan_info["text_page_count"], 4)
+        self.assertEqual(plan_info["scanned_page_count"], 6)
+        self.assertEqual(plan_info["plan"], [
+            (0, 3, PDF_TEXT_STRATEGY), (3, 5, PDF_IMAGE_STRATEGY), (5, 6, PDF_TEXT_STRATEGY)
+        ])
+
+        texts, seconds = partition_pdf_plan(
+            mixed_path, plan_info["plan"], max_workers=1, pages_per_task=2, partition_func=strategy_partition
+        )
+        self.assertEqual(texts, [
+            f"{100 + page}:{PDF_IMAGE_STRATEGY if page in (4, 5) else PDF_TEXT_STRATEGY}" for page in range(1, 7)
+        ])
+        self.assertEqual(set(seconds), {PDF_TEXT_STRATEGY, PDF_IMAGE_STRATEGY})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, request
+
+from services.profiling import PROFILE_HEADER, RequestProfiler
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestProfiling(unittest.TestCase):
+    """测试请求剖析"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ProfilingTest")
+        self.logger.debug("准备测试Profiling")
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("Profiling测试完成")
+
+    def make_app(self, profiler):
+        app = Flask(__name__)
+        profiler.init_app(app)
+
+        @app.route('/api/embedding', methods=['POST'])
+        def embedding():
+            return {"total": sum(i * i for i in range(10000)), "id": request.json["chunk_file_id"]}
+
+        return app.test_client()
+
+    def test_header_profiles_request(self):
+        """测试带请求头的请求被剖析，保存路由和参数，可以列出并生成摘要"""
+        profiler = RequestProfiler(self.temp_dir, enabled=True, sample_rate=0, max_files=2)
+        client = self.make_app(profiler)
+
+        response = client.post('/api/embedding', json={"chunk_file_id": "doc_1"})
+        self.assertNotIn("X-Profile-Id", response.headers)
+
+        profile_ids = []
+        for _ in range(3):
+            response = client.post('/api/embedding?dedup=1', json={"chunk_file_id": "doc_1"}, headers={PROFILE_HEADER: "1"})
+            self.assertEqual(response.status_code, 200)
+            profile_ids.append(response.headers["X-Profile-Id"])
+
+        profiles = profiler.list_profiles()
+        # 只保留最新的 2 份
+        self.assertEqual([info["profile_id"] for info in profiles], profile_ids[:0:-1])
+        info = profiles[0]
+        self.assertEqual(info["route"], "/api/embedding")
+        self.assertEqual(info["args"], {"dedup": "1"})
+        self.assertEqual(info["json"], {"chunk_file_id": "doc_1"})
+        self.assertFalse(info["sampled"])
+        self.assertIn("function calls", profiler.summary(info["profile_id"]))
+        self.assertIn("function calls", profiler.summary(info["profile_id"], sort="time"))
+        with self.assertRaises(ValueError):
+            profiler.summary(info["profile_id"], sort="bogus")
+        self.assertIsNone(profiler.profile_path("../app"))
+
+    def test_disabled_registers_no_hooks(self):
+        """测试未开启时不注册钩子，请求头无效"""
+        profiler = RequestProfiler(self.temp_dir, enabled=False, sample_rate=1.0)
+        app = Flask(__name__)
+        profiler.init_app(app)
+        self.assertEqual(app.before_request_funcs, {})
+        self.assertEqual(app.after_request_funcs, {})
+        self.assertEqual(profiler.list_profiles(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+from io import BytesIO
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.file_processor import FileProcessor
+from services.resumable_upload import MIN_PART_SIZE, ResumableUploadError, ResumableUploadManager
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestResumableUpload(unittest.TestCase):
+    """测试可续传分片上传"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ResumableUploadTest")
+        self.logger.debug("准备测试ResumableUpload")
+        self.temp_dir = tempfile.mkdtemp()
+        self.upload_folder = os.path.join(self.temp_dir, "upload")
+        self.manager = ResumableUploadManager(self.upload_folder)
+        self.data = ("这是一个可续传上传的测试文件。\n\n" * 20000).encode("utf-8")[:MIN_PART_SIZE * 2 + 1000]
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("ResumableUpload测试完成")
+
+    def part(self, index):
+        data = self.data[index * MIN_PART_SIZE:(index + 1) * MIN_PART_SIZE]
+        return BytesIO(data), hashlib.sha256(data).hexdigest()
+
+    def assert_status(self, status, func, *args):
+        with self.assertRaises(ResumableUploadError) as context:
+            func(*args)
+        self.assertEqual(context.exception.status, status)
+
+    def test_out_of_order_parts_and_retry(self):
+        """测试乱序上传、哈希校验失败重传、查询已收到范围和完成"""
+        session = self.manager.initiate(
+            "scan.txt", len(self.data), "txt", part_size=MIN_PART_SIZE, sha256=hashlib.sha256(self.data).hexdigest()
+        )
+        upload_id = session["upload_id"]
+        self.assertEqual(session["part_count"], 3)
+
+        self.manager.write_part(upload_id, 2, *self.part(2))
+        # 传输中损坏的分片不被记录
+        stream, digest = self.part(0)
+        self.assert_status(409, self.manager.write_part, upload_id, 0, BytesIO(b"x" * MIN_PART_SIZE), digest)
+        status = self.manager.status(upload_id)
+        self.assertEqual(status["missing_parts"], [0, 1])
+        self.assertEqual(status["received_ranges"], [[MIN_PART_SIZE * 2, len(self.data)]])
+        self.assert_status(409, self.manager.complete, upload_id, os.path.join(self.upload_folder, "scan.txt"))
+
+        self.manager.write_part(upload_id, 0, stream, digest)
+        self.manager.write_part(upload_id, 1, *self.part(1))
+        status = self.manager.status(upload_id)
+        self.assertEqual(status["received_ranges"], [[0, len(self.data)]])
+        self.assertEqual(status["received_bytes"], len(self.data))
+
+        processor = FileProcessor(self.upload_folder, os.path.join(self.temp_dir, "load"))
+        file_info = processor.build_file_info(session["filename"], session["file_type"])
+        file_info["content_hash"] = self.manager.complete(upload_id, file_info["upload_path"])
+        self.assertEqual(file_info["content_hash"], hashlib.sha256(self.data).hexdigest())
+        self.assert_status(404, self.manager.status, upload_id)
+
+        result, status_code = processor.process_saved_file(file_info)
+        self.assertEqual(status_code, 200)
+        with open(file_info["load_path"], "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["文件哈希"], file_info["content_hash"])
+
+    def test_rejections(self):
+        """测试无效参数、文件头不符和越界分片"""
+        self.assert_status(415, self.manager.initiate, "program.exe", 100, "exe")
+        self.assert_status(413, self.manager.initiate, "huge.pdf", 10 ** 12, "pdf")
+        self.assert_status(400, self.manager.initiate, "../x.pdf", 100, "pdf")
+        self.assert_status(404, self.manager.status, "../../etc")
+
+        session = self.manager.initiate("fake.pdf", len(self.data), "pdf", part_size=MIN_PART_SIZE)
+        upload_id = session["upload_id"]
+        self.assert_status(415, self.manager.write_part, upload_id, 0, *self.part(0))
+        self.assert_status(400, self.manager.write_part, upload_id, 3, *self.part(0))
+        self.assert_status(400, self.manager.write_part, upload_id, 2, *self.part(0))
+        self.manager.abort(upload_id)
+        self.assertEqual(os.listdir(self.manager.session_folder), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.serving import NATIVE_THREAD_ENV_VARS, limit_native_threads, torch_threads_per_worker, worker_count
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestServing(unittest.TestCase):
+    """测试生产部署的进程数和线程数配置"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "ServingTest")
+        self.logger.debug("准备测试Serving")
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("Serving测试完成")
+
+    def test_threads_split_across_workers(self):
+        """测试 torch 线程数按工作进程数均分 CPU 核，环境变量优先"""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(worker_count(cpu_count=16), 4)
+            self.assertEqual(worker_count(cpu_count=2), 2)
+            self.assertEqual(torch_threads_per_worker(4, cpu_count=16), 4)
+            self.assertEqual(torch_threads_per_worker(4, cpu_count=2), 1)
+        with patch.dict(os.environ, {"WEB_WORKERS": "3", "TORCH_NUM_THREADS": "2"}, clear=True):
+            self.assertEqual(worker_count(cpu_count=16), 3)
+            self.assertEqual(torch_threads_per_worker(3, cpu_count=16), 2)
+
+    def test_limit_native_threads(self):
+        """测试限制原生线程数时不覆盖已显式设置的环境变量"""
+        with patch.dict(os.environ, {"MKL_NUM_THREADS": "8"}, clear=True):
+            limit_native_threads(2)
+            self.assertEqual(os.environ["MKL_NUM_THREADS"], "8")
+            for name in set(NATIVE_THREAD_ENV_VARS) - {"MKL_NUM_THREADS"}:
+                self.assertEqual(os.environ[name], "2")
+            self.assertEqual(os.environ["TORCH_NUM_THREADS"], "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from services.text_segmenter import (
+    TokenOffsets, chunk_spans, iter_sentence_spans, iter_text_pieces, pack_spans, semantic_groups
+)
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestTextSegmenter(unittest.TestCase):
+    """测试原生流式切分器"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "TextSegmenterTest")
+        self.logger.debug("准备测试TextSegmenter")
+        self.text = (
+            "这是第一段落。这是一个测试文档！\n\n"
+            "这是第二段落；我们正在测试“文件分块”功能？\n\n"
+            "Mixed text works too. It has English sentences! And more\n"
+            "这是最后一段。测试结束。"
+        )
+
+    def tearDown(self):
+        """测试后的清理"""
+        self.logger.debug("TextSegmenter测试完成")
+
+    def test_cjk_sentence_boundaries(self):
+        """测试中文标点和英文句点的句子边界识别"""
+        sentences = [self.text[s:e] for s, e in iter_sentence_spans(self.text)]
+        self.assertEqual(sentences[:4], ["这是第一段落。", "这是一个测试文档！", "这是第二段落；", "我们正在测试“文件分块”功能？"])
+        self.assertIn("Mixed text works too.", sentences)
+        self.assertEqual(sentences[-1], "测试结束。")
+
+    def test_streaming_matches_whole_text(self):
+        """测试分片流式输入与整段输入得到相同结果"""
+        whole = list(iter_sentence_spans(self.text))
+        for piece_size in (1, 3, 7, 64):
+            self.assertEqual(list(iter_sentence_spans(iter_text_pieces(self.text, piece_size))), whole)
+
+    def test_long_whitespace_runs(self):
+        """测试不含换行的长空白段按线性时间处理，只含空白的片段不作为句子"""
+        text = ("x" + " " * 50000) * 3
+        start_time = time.perf_counter()
+        spans = list(iter_sentence_spans(text))
+        self.assertLess(time.perf_counter() - start_time, 1.0)
+        self.assertEqual([text[s:e] for s, e in spans], ["x" + " " * 50000 + "x" + " " * 50000 + "x"])
+
+        spans = list(iter_sentence_spans(iter_text_pieces(text, 4096), max_length=1000))
+        self.assertEqual([text[s:e] for s, e in spans], ["x", "x", "x"])
+        self.assertEqual(list(iter_sentence_spans("第一句。   \n\n   ")), [(0, 4)])
+
+    def test_chunk_size_and_overlap(self):
+        """测试 chunk 大小上限和重叠"""
+        chunk_size, chunk_overlap = 30, 10
+        spans = list(chunk_spans(iter_text_pieces(self.text, 16), chunk_size, chunk_overlap))
+        self.assertTrue(len(spans) > 1)
+        for (start, end), (next_start, _) in zip(spans, spans[1:]):
+            self.assertLessEqual(end - start, chunk_size)
+            self.assertLessEqual(max(0, end - next_start), chunk_overlap)
+            self.assertLess(start, next_start)
+
+    def test_long_sentence_hard_split(self):
+        """测试超长句子被强制切开"""
+        spans = list(pack_spans([(0, 95)], chunk_size=40))
+        self.assertEqual(spans, [(0, 40), (40, 80), (80, 95)])
+        with self.assertRaises(ValueError):
+            list(pack_spans([(0, 10)], chunk_size=10, chunk_overlap=10))
+
+    def test_token_offsets(self):
+        """测试按token度量区间以及在token边界上切分"""
+        # 每两个字符一个token: [0,2) [2,4) ... [18,20)
+        offsets = TokenOffsets(list(range(0, 20, 2)), list(range(2, 21, 2)))
+        self.assertEqual(offsets.count(0, 20), 10)
+        self.assertEqual(offsets.count(3, 9), 3)
+        self.assertEqual(list(offsets.split((0, 20), 4)), [(0, 8), (8, 16), (16, 20)])
+
+        spans = list(pack_spans([(0, 6), (6, 12), (12, 20)], 5, 1, measure=offsets.count, split=offsets.split))
+        for start, end in spans:
+            self.assertLessEqual(offsets.count(start, end), 5)
+
+    def test_semantic_groups(self):
+        """测试在相邻句子相似度下降处切开，并遵守最小/最大长度"""
+        spans = [(i * 10, i * 10 + 10) for i in range(6)]
+        # 前三句和后三句分别属于两个话题
+        vectors = np.array([[1, 0.1], [1, 0.0], [1, 0.1], [0, 1], [0.1, 1], [0, 1]], dtype=np.float32)
+        self.assertEqual(semantic_groups(spans, vectors, max_size=100), [(0, 3), (3, 6)])
+        # 最大长度优先于语义
+        self.assertEqual(semantic_groups(spans, vectors, max_size=20), [(0, 2), (2, 3), (3, 5), (5, 6)])
+        # 未达到最小长度时不在转换点切开
+        self.assertEqual(semantic_groups(spans, vectors, max_size=100, min_size=40), [(0, 6)])
+        self.assertEqual(semantic_groups([], np.zeros((0, 2)), max_size=10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+from io import BytesIO
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify, request
+
+from services.file_processor import FileProcessor
+from services.upload_stream import make_upload_request_class, sniff_type, PARTIAL_SUFFIX, UnsupportedUploadType
+from tests.test_logger_utils import test_logger, TestLoggerAdapter
+
+
+class TestUploadStream(unittest.TestCase):
+    """测试上传文件流式写入"""
+
+    def setUp(self):
+        """测试前的设置"""
+        self.logger = TestLoggerAdapter(test_logger, "UploadStreamTest")
+        self.logger.debug("准备测试UploadStream")
+        self.temp_dir = tempfile.mkdtemp()
+        self.upload_folder = os.path.join(self.temp_dir, "upload")
+        processor = FileProcessor(self.upload_folder, os.path.join(self.temp_dir, "load"))
+
+        app = Flask(__name__)
+        app.config['MAX_CONTENT_LENGTH'] = 64 * 1024
+        app.request_class = make_upload_request_class(self.upload_folder, max_file_bytes=32 * 1024)
+
+        @app.route('/upload', methods=['POST'])
+        def upload():
+            file_info = processor.save_upload_file(request.files['file'], request.form.get('type'))
+            return jsonify(file_info)
+
+        @app.route('/json', methods=['POST'])
+        def read_json():
+            return jsonify(request.json)
+
+        @app.errorhandler(UnsupportedUploadType)
+        def upload_rejected(e):
+            return jsonify({"upload_rejected": True}), 415
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """测试后的清理"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.logger.debug("UploadStream测试完成")
+
+    def post(self, data, filename):
+        return self.client.post(
+            '/upload', data={'file': (BytesIO(data), filename), 'type': 'pdf'}, content_type='multipart/form-data'
+        )
+
+    def uploaded_files(self):
+        return sorted(os.listdir(self.upload_folder)) if os.path.exists(self.upload_folder) else []
+
+    def test_sniff_type(self):
+        """测试根据文件头判断类型"""
+        self.assertEqual(sniff_type(b"%PDF-1.7\n..."), "pdf")
+        self.assertEqual(sniff_type(b"PK\x03\x04\x14\x00"), "zip")
+        self.assertEqual(sniff_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1\x00"), "ole")
+        # 在多字节字符中间截断的 UTF-8 文本
+        self.assertEqual(sniff_type("中文文本".encode("utf-8")[:-1]), "text")
+        self.assertEqual(sniff_type("中文文本".encode("gb18030")), "text")
+        self.assertEqual(sniff_type(b"MZ\x90\x00\x03\x00"), "binary")
+        # 带 BOM 的 UTF-16 / UTF-32 文本包含 NUL 字节，仍然识别为文本
+        for encoding in ("utf-16", "utf-16-be", "utf-32"):
+            data = ("\ufeff" if encoding.endswith("be") else "") + "中文 text\n"
+            self.assertEqual(sniff_type(data.encode(encoding)[:15]), "text", encoding)
+        self.assertEqual(sniff_type(b"\xff\xfe\x00\xd8\x00\x00"), "binary")
+        # 其他编码的文本按扩展名宽松判断，含 NUL 字节时仍为二进制
+        shift_jis = "ｱ テストです。".encode("shift_jis")
+        cp1252 = "Prix: 5 €".encode("cp1252")
+        self.assertEqual(sniff_type(shift_jis), "binary")
+        self.assertEqual(sniff_type(shift_jis, ".txt"), "text")
+        self.assertEqual(sniff_type(cp1252, ".md"), "text")
+        self.assertEqual(sniff_type(shift_jis, ".pdf"), "binary")
+        self.assertEqual(sniff_type(b"MZ\x90\x00\x03\x00", ".txt"), "binary")
+
+    def test_streamed_to_final_location(self):
+        """测试上传文件直接写入上传目录，哈希与内容一致且没有残留临时文件"""
+        data = b"%PDF-1.4\n" + b"0123456789" * 2000
+        response = self.post(data, "report.pdf")
+        self.assertEqual(response.status_code, 200)
+        file_info = response.get_json()
+        self.assertEqual(file_info["content_hash"], hashlib.sha256(data).hexdigest())
+        with open(file_info["upload_path"], "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.uploaded_files(), [file_info["filename"]])
+
+    def test_rejects_before_writing(self):
+        """测试类型不符返回 415、超过大小上限返回 413，且都不留下文件"""
+        self.assertEqual(self.post(b"MZ\x90\x00" * 4096, "fake.pdf").status_code, 415)
+        self.assertEqual(self.post(b"hello", "program.exe").status_code, 415)
+        self.assertEqual(self.post(b"%PDF-1.4\n" + b"0" * 40 * 1024, "big.pdf").status_code, 413)
+        self.assertEqual(self.post(b"%PDF-1.4\n" + b"0" * 80 * 1024, "bigger.pdf").status_code, 413)
+        self.assertFalse([name for name in self.uploaded_files() if name.endswith(PARTIAL_SUFFIX)])
+        self.assertEqual(self.uploaded_files(), [])
+
+    def test_non_upload_415_not_upload_rejection(self):
+        """测试上传被拒绝的 415 与 Flask 因请求体不是 JSON 返回的 415 可以区分"""
+        response = self.post(b"hello", "program.exe")
+        self.assertEqual((response.status_code, response.get_json()), (415, {"upload_rejected": True}))
+        response = self.client.post('/json', data="plain", content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+        self.assertIsNone(response.get_json(silent=True))
+
+    def test_non_utf8_text_upload(self):
+        """测试非 UTF-8 / GB 编码的文本文件可以上传"""
+        response = self.post("ｱ テストです。".encode("shift_jis"), "notes.txt")
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
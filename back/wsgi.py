@@ -0,0 +1,34 @@
+"""
+生产环境 WSGI 入口
+
+用法 (在 back 目录下执行):
+    gunicorn -c gunicorn.conf.py
+
+gunicorn 以 preload 方式在主进程中导入本模块：先限制原生线程数，再导入应用并预加载嵌入模型，
+之后 fork 出的工作进程以写时复制方式共享同一份模型权重。
+"""
+import os
+import gc
+import sys
+
+BACK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACK_DIR)
+# app.py 中的 files/、log/ 等目录都是相对于 back 目录的路径
+os.chdir(BACK_DIR)
+
+from services.serving import limit_native_threads, torch_threads_per_worker, worker_count
+
+# 必须在导入 torch 之前设置
+limit_native_threads(torch_threads_per_worker(worker_count()))
+
+from app import app, logger
+from services.model_cache import configure_torch_threads, warmup_models
+
+if os.getenv("WARMUP_MODELS", "1") != "0":
+    logger.info(f"fork 前预加载嵌入模型: {'成功' if warmup_models() else '跳过'}")
+configure_torch_threads()
+
+# 预加载的对象移出垃圾回收跟踪，工作进程中的 GC 不再写这些对象的头部，共享的内存页不会被复制
+gc.freeze()
+
+application = app